@@ -0,0 +1,68 @@
+"""Set-based approval of Attendance rows.
+
+One UPDATE ... RETURNING per call (per 10,000 ids when ids are given) sets
+IsApproved on every matching row that is not approved yet; the returned
+(StudentId, CheckInUtc) pairs drive the AttendanceDaily refresh in the
+same transaction.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional
+from sqlalchemy import or_, select, update
+from Backend.models import Attendance, StudentAssignment
+from Backend.rollups import refresh_days
+
+ID_CHUNK = 10000  # stays well under SQLite's bound-parameter limit
+
+
+def approve_attendance(
+    bind,
+    attendance_ids: Optional[Iterable[int]] = None,
+    student_id: Optional[int] = None,
+    position_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> List[dict]:
+    """
+    Approve every row matching all the given filters. Nothing is committed
+    here. Returns [{"AttendanceId", "StudentId", "CheckInUtc"}] of the rows
+    that changed.
+
+    position_id matches rows of students assigned to the position that were
+    checked in at it (GeoPositionId). Rows without a GeoPositionId (no
+    coordinates, no site nearby, or written before geofencing) cannot be
+    placed, so they go with the assignment: a student assigned to two
+    positions has them approved by either.
+    """
+    criteria = [Attendance.IsApproved.isnot(True)]
+    if student_id is not None:
+        criteria.append(Attendance.StudentId == student_id)
+    if position_id is not None:
+        criteria.append(Attendance.StudentId.in_(
+            select(StudentAssignment.StudentId).where(StudentAssignment.PositionId == position_id)
+        ))
+        criteria.append(or_(Attendance.GeoPositionId == position_id, Attendance.GeoPositionId.is_(None)))
+    if date_from is not None:
+        criteria.append(Attendance.CheckInUtc >= datetime.combine(date_from, time.min))
+    if date_to is not None:
+        criteria.append(Attendance.CheckInUtc < datetime.combine(date_to + timedelta(days=1), time.min))
+
+    stmt = (
+        update(Attendance)
+        .values(IsApproved=True)
+        .returning(Attendance.AttendanceId, Attendance.StudentId, Attendance.CheckInUtc)
+        .execution_options(synchronize_session=False)
+    )
+    if attendance_ids is None:
+        rows = bind.execute(stmt.where(*criteria)).all()
+    else:
+        ids = sorted(set(attendance_ids))
+        rows = []
+        for i in range(0, len(ids), ID_CHUNK):
+            chunk = ids[i:i + ID_CHUNK]
+            rows += bind.execute(stmt.where(Attendance.AttendanceId.in_(chunk), *criteria)).all()
+
+    refresh_days(bind, {(r.StudentId, r.CheckInUtc) for r in rows if r.CheckInUtc is not None})
+    return [
+        {"AttendanceId": r.AttendanceId, "StudentId": r.StudentId, "CheckInUtc": r.CheckInUtc}
+        for r in rows
+    ]
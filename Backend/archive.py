@@ -0,0 +1,268 @@
+"""Hot/cold split of Attendance and StudentLocations.
+
+Closed terms are moved out of the two tables that grow every day into a
+second SQLite file (STUDENT_TRACKER_ARCHIVE_PATH), attached to every
+connection as "archive" and holding tables of the same name and columns.
+The hot tables keep only the current terms, so they and their indexes
+stay small enough to live in the page cache.
+
+The split is by time. The newest copied ArchiveRuns.CutoffUtc is the
+watermark, always a midnight: rows checked in before it are read from the archive,
+rows from it onwards from the hot table, and no day is split between the
+two, so the AttendanceDaily rollup of archived days stays as it is. read_source(db, model, since) gives a route the hot
+table when its range starts at or after the watermark, and otherwise a
+UNION ALL of both sides, each filtered to its half of the timeline, so a
+row is never seen twice.
+
+An archive run (archive_before) works in four steps, each in short
+batches so the API keeps writing meanwhile:
+
+  1. record the run and its cutoff; from here on rows before it are read-only;
+  2. copy the rows before the cutoff into the archive (INSERT OR IGNORE,
+     so a rerun after a crash is harmless);
+  3. mark the run copied, which moves the watermark; reads switch over here;
+  4. delete the copied rows from the hot tables. The row with the highest
+     id is copied but kept, so SQLite never hands out an archived id again.
+
+Archived rows are read-only: the write routes look rows up in the hot
+tables only and call check_writable() before they commit, which refuses
+rows before the newest cutoff, copied or not. A write that got in before
+step 1 is in the copy; one after it is refused, so none is lost with the
+hot row in step 4. Run compact() afterwards (ANALYZE, VACUUM) to give the
+freed pages back.
+"""
+import logging
+from datetime import datetime, time, timedelta
+from typing import Iterable, Optional
+from fastapi import HTTPException
+from sqlalchemy import Column, Index, MetaData, Table, bindparam, exists, func, insert, or_, select, union_all, update
+from Backend.db import ARCHIVE_PATH
+from Backend.models import ArchiveRun, Attendance, Positions, StudentLocation
+from Backend.settings import env
+
+ARCHIVE_BATCH_SIZE = env("ARCHIVE_BATCH_SIZE", 10000)
+# never archive anything younger than this, open sessions included
+ARCHIVE_MIN_AGE_DAYS = env("ARCHIVE_MIN_AGE_DAYS", 30)
+
+logger = logging.getLogger("Backend.archive")
+
+ARCHIVED_MODELS = (Attendance, StudentLocation)
+ROW_COUNT_COLUMNS = {Attendance: "AttendanceRows", StudentLocation: "LocationRows"}
+
+archive_metadata = MetaData(schema="archive")
+
+
+def _cold_table(model) -> Table:
+    """Same columns as the hot table, no foreign keys, indexes for the archive's own reads."""
+    hot = model.__table__
+    cold = Table(
+        hot.name,
+        archive_metadata,
+        *[Column(c.name, c.type, primary_key=c.primary_key, autoincrement=False) for c in hot.columns],
+    )
+    Index(f"IX_Archive_{hot.name}_CheckInUtc", cold.c.CheckInUtc)
+    Index(f"IX_Archive_{hot.name}_StudentId_CheckInUtc", cold.c.StudentId, cold.c.CheckInUtc)
+    if "CheckOutUtc" in cold.c:
+        # hours._earliest_overlap, like IX_Attendance_CheckOutUtc_CheckInUtc
+        Index(f"IX_Archive_{hot.name}_CheckOutUtc_CheckInUtc", cold.c.CheckOutUtc, cold.c.CheckInUtc)
+    return cold
+
+
+COLD = {model: _cold_table(model) for model in ARCHIVED_MODELS}
+
+
+def watermark(bind) -> Optional[datetime]:
+    """Rows checked in before this are in the archive; None when nothing is."""
+    if not ARCHIVE_PATH:
+        return None
+    return bind.execute(select(func.max(ArchiveRun.CutoffUtc)).where(ArchiveRun.CopiedAtUtc.isnot(None))).scalar()
+
+
+def write_cutoff(bind) -> Optional[datetime]:
+    """Rows checked in before this are archived or being copied; None when no run has started."""
+    if not ARCHIVE_PATH:
+        return None
+    return bind.execute(select(func.max(ArchiveRun.CutoffUtc))).scalar()
+
+
+def check_writable(bind, check_ins: Iterable[Optional[datetime]]) -> None:
+    """
+    409 when a row checked in at one of `check_ins` is archived or being
+    archived. Call it after the write and before the commit: the write
+    holds SQLite's write lock then, so no run can record its cutoff in
+    between, and one recorded before is seen here.
+    """
+    cutoff = write_cutoff(bind)
+    if cutoff is not None and any(t is not None and t < cutoff for t in check_ins):
+        raise HTTPException(status_code=409, detail=f"Attendance before {cutoff.date()} is archived and read-only.")
+
+
+def read_source(bind, model, since: Optional[datetime] = None):
+    """
+    FROM clause for reading `model` rows checked in at or after `since`
+    (None: all time). Columns are reached through `.c`, e.g.
+    read_source(db, Attendance, start).c.CheckInUtc.
+    """
+    hot = model.__table__
+    cutoff = watermark(bind)
+    if cutoff is None or (since is not None and since >= cutoff):
+        return hot
+    cold = COLD[model]
+    return union_all(
+        select(*hot.c).where(or_(hot.c.CheckInUtc >= cutoff, hot.c.CheckInUtc.is_(None))),
+        select(*cold.c).where(cold.c.CheckInUtc < cutoff),
+    ).subquery(hot.name)
+
+
+def check_configured(engine) -> None:
+    """Refuse to start without the archive file once rows have been moved there."""
+    if ARCHIVE_PATH:
+        return
+    with engine.connect() as conn:
+        if conn.execute(select(ArchiveRun.RunId).limit(1)).first() is not None:
+            raise RuntimeError(
+                "Attendance has been archived but STUDENT_TRACKER_ARCHIVE_PATH is not set; "
+                "archived rows would be missing from every report."
+            )
+
+
+def closed_terms_cutoff(bind, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Day the oldest term still running (Positions.TermEnd in the future)
+    started: everything before it belongs to closed terms only. With no
+    term running, the day after the last one ended. None without any terms.
+    """
+    now = now or datetime.utcnow()
+    running = bind.execute(select(func.min(Positions.TermStart)).where(Positions.TermEnd >= now)).scalar()
+    if running is not None:
+        return datetime.combine(running.date(), time.min)
+    ended = bind.execute(select(func.max(Positions.TermEnd))).scalar()
+    return datetime.combine(ended.date() + timedelta(days=1), time.min) if ended else None
+
+
+def _tables(model):
+    """(hot table, its id column, archive table, archive id column)."""
+    hot, cold = model.__table__, COLD[model]
+    pk = list(hot.primary_key.columns)[0]
+    return hot, pk, cold, cold.c[pk.name]
+
+
+def _copy(engine, model, cutoff: datetime, run_id: int, batch_size: int, log) -> int:
+    """Step 2: copy the hot rows before `cutoff` to the archive, in id batches, counting them on the run."""
+    hot, pk, cold, _ = _tables(model)
+    counter = ArchiveRun.__table__.c[ROW_COUNT_COLUMNS[model]]
+    page = (
+        select(pk.label("id"))
+        .where(pk > bindparam("after"), hot.c.CheckInUtc < cutoff)
+        .order_by(pk)
+        .limit(bindparam("n"))
+        .subquery()
+    )
+    bound = select(func.max(page.c.id))
+    copied, after = 0, 0
+    while True:
+        with engine.begin() as conn:
+            upto = conn.execute(bound, {"after": after, "n": batch_size}).scalar()
+            if upto is None:
+                break
+            rows = select(*hot.c).where(pk > after, pk <= upto, hot.c.CheckInUtc < cutoff)
+            n = conn.execute(insert(cold).from_select([c.name for c in hot.c], rows).prefix_with("OR IGNORE")).rowcount
+            conn.execute(update(ArchiveRun).where(ArchiveRun.RunId == run_id).values({counter: counter + n}))
+            copied += n
+        after = upto
+        log(f"  {hot.name}: {copied} rows copied to the archive")
+    return copied
+
+
+def _delete(engine, model, cutoff: datetime, batch_size: int, log) -> int:
+    """Step 4: delete the hot rows that are in the archive, except the highest id."""
+    hot, pk, cold, _ = _tables(model)
+    # aliased: both tables are called the same, only the schema differs
+    cold = cold.alias("cold")
+    keep = select(func.max(pk)).scalar_subquery()
+    page = (
+        select(pk)
+        .where(hot.c.CheckInUtc < cutoff, pk < keep, exists().where(cold.c[pk.name] == pk))
+        .limit(batch_size)
+    )
+    deleted = 0
+    while True:
+        with engine.begin() as conn:
+            n = conn.execute(hot.delete().where(pk.in_(page))).rowcount
+        if not n:
+            return deleted
+        deleted += n
+        log(f"  {hot.name}: {deleted} rows deleted from the hot table")
+
+
+def archive_before(engine, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE, log=logger.info) -> dict:
+    """
+    Move Attendance and StudentLocations rows checked in before `cutoff`
+    to the archive. Returns {"CutoffUtc", "AttendanceRows", "LocationRows"}.
+    Called again with the cutoff of an interrupted run, it finishes that
+    run: the copy is redone (rows already there are skipped and not
+    counted again), then the delete, then the run is marked finished.
+    """
+    if not ARCHIVE_PATH:
+        raise RuntimeError("Set STUDENT_TRACKER_ARCHIVE_PATH to the archive database file first.")
+    if cutoff != datetime.combine(cutoff.date(), time.min):
+        raise ValueError(f"Cutoff {cutoff} must be a midnight, days are never split.")
+    youngest = datetime.utcnow() - timedelta(days=ARCHIVE_MIN_AGE_DAYS)
+    if cutoff > youngest:
+        raise ValueError(f"Cutoff {cutoff} is less than {ARCHIVE_MIN_AGE_DAYS} days old (ARCHIVE_MIN_AGE_DAYS).")
+    with engine.connect() as conn:
+        last = conn.execute(
+            select(ArchiveRun).order_by(ArchiveRun.CutoffUtc.desc(), ArchiveRun.RunId.desc()).limit(1)
+        ).first()
+    # an interrupted run with the same cutoff is finished, not refused
+    resume = last is not None and last.FinishedAtUtc is None and last.CutoffUtc == cutoff
+    if last is not None and not resume and cutoff <= last.CutoffUtc:
+        hint = "" if last.FinishedAtUtc else f" Run {last.RunId} was interrupted; run again with that cutoff to finish it."
+        raise ValueError(f"Everything before {last.CutoffUtc} is archived already.{hint}")
+
+    archive_metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA archive.journal_mode = WAL")
+
+    if resume:
+        run_id = last.RunId
+    else:
+        # waits for the write lock, so writes already running commit first
+        # and are copied; later ones see the cutoff in check_writable()
+        with engine.begin() as conn:
+            run_id = conn.execute(
+                insert(ArchiveRun).values(CutoffUtc=cutoff, StartedAtUtc=datetime.utcnow()).returning(ArchiveRun.RunId)
+            ).scalar()
+    # on a resume the copy only picks up what the first attempt did not
+    for model in ARCHIVED_MODELS:
+        _copy(engine, model, cutoff, run_id, batch_size, log)
+    with engine.begin() as conn:
+        conn.execute(
+            update(ArchiveRun)
+            .where(ArchiveRun.RunId == run_id, ArchiveRun.CopiedAtUtc.is_(None))
+            .values(CopiedAtUtc=datetime.utcnow())
+        )
+    for model in ARCHIVED_MODELS:
+        _delete(engine, model, cutoff, batch_size, log)
+    with engine.begin() as conn:
+        conn.execute(update(ArchiveRun).where(ArchiveRun.RunId == run_id).values(FinishedAtUtc=datetime.utcnow()))
+        run = conn.execute(select(ArchiveRun).where(ArchiveRun.RunId == run_id)).one()
+    return {"CutoffUtc": cutoff, **{name: getattr(run, name) for name in ROW_COUNT_COLUMNS.values()}}
+
+
+def compact(engine, vacuum: bool = True, log=logger.info) -> None:
+    """
+    Refresh planner statistics of both files and, with `vacuum`, rewrite
+    the main file without the pages the archive run freed. VACUUM blocks
+    writers while it runs, so it belongs in a quiet hour.
+    """
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE main")
+        if ARCHIVE_PATH:
+            conn.exec_driver_sql("ANALYZE archive")
+        conn.commit()
+        log("  ANALYZE done")
+        if vacuum:
+            conn.exec_driver_sql("VACUUM main")
+            conn.exec_driver_sql("PRAGMA main.wal_checkpoint(TRUNCATE)")
+            log("  VACUUM done")
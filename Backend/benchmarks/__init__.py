@@ -0,0 +1,14 @@
+"""Benchmarks for the backend.
+
+Each module is runnable on its own, e.g.:
+  python -m Backend.benchmarks.export_rss --rows 1000000
+
+Route-level numbers for the whole API come from seed.py (a synthetic
+database at a given scale) and routes.py (p50/p95/p99 and throughput per
+scenario, as JSON that can be compared between runs):
+  python -m Backend.benchmarks.seed --out /tmp/bench.db --attendance 2000000
+  python -m Backend.benchmarks.routes --db /tmp/bench.db > before.json
+
+Benchmarks always work on a throw-away database (STUDENT_TRACKER_DB_PATH is
+pointed at a temp file), never on Backend/student_tracker.db.
+"""
@@ -0,0 +1,77 @@
+"""Concurrent throughput of the hot routes, sync handlers vs. async ones.
+
+Usage:
+  python -m Backend.benchmarks.async_routes [--concurrency 64] [--requests 1000]
+      [seed options, see Backend/benchmarks/seed.py]
+
+Seeds one database, then for each mode copies it and runs
+Backend.benchmarks.routes on the copy in its own subprocess:
+
+  sync    the default: def handlers on FastAPI's thread pool, sqlite3
+  async   STUDENT_TRACKER_DB_ASYNC=true: async handlers, aiosqlite
+          (needs aiosqlite and greenlet installed)
+
+Only the scenarios that have an async handler are run (check-in, map and
+the listings). Prints one JSON object with both runs and the async/sync
+throughput ratio per scenario.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from Backend.benchmarks import seed as seeding
+
+MODES = {"sync": "false", "async": "true"}
+SCENARIOS = ["map", "map_bbox", "students_page", "teacher_students", "positions", "checkin"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    seeding.add_arguments(parser)
+    parser.set_defaults(attendance=200_000, locations=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seeded = os.path.join(tmp, "seeded.db")
+        seeding.seed_from_args(seeded, args)
+
+        runs = {}
+        for mode, flag in MODES.items():
+            db_path = os.path.join(tmp, f"{mode}.db")
+            shutil.copyfile(seeded, db_path)
+            command = [
+                sys.executable, "-m", "Backend.benchmarks.routes", "--db", db_path,
+                "--requests", str(args.requests), "--warmup", str(args.warmup),
+                "--concurrency", str(args.concurrency), "--seed", str(args.seed), "--days", str(args.days),
+            ]
+            for name in SCENARIOS:
+                command += ["--scenario", name]
+            out = subprocess.run(
+                command, check=True, capture_output=True, text=True,
+                env=dict(os.environ, STUDENT_TRACKER_DB_ASYNC=flag),
+            )
+            runs[mode] = json.loads(out.stdout)
+
+    ratio = {
+        name: round(runs["async"]["scenarios"][name]["throughput_rps"] / runs["sync"]["scenarios"][name]["throughput_rps"], 3)
+        for name in SCENARIOS
+    }
+    print(json.dumps({
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "rows": runs["sync"]["meta"]["rows"],
+        "throughput_async_vs_sync": ratio,
+        "sync": runs["sync"]["scenarios"],
+        "async": runs["async"]["scenarios"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Attendance sheet: per-row ORM loop vs. the set-based save_sheet() path.
+
+Usage:
+  python -m Backend.benchmarks.attendance_sheet [--students 2000] [--repeat 5]
+
+Seeds a roster in a temp database, then submits the same sheet --repeat
+times with each implementation:
+
+  loop        what POST /teacher/attendance used to do: one Attendance
+              object per entry, Date re-parsed per entry, no validation
+  set_based   AttendanceSheet validation, one IN query for unknown
+              students, one executemany upsert (Backend/sheets.py)
+
+Both refresh the AttendanceDaily rollup and commit, like the route.
+"first_ms" is the first submission, "resubmit_ms" the median of the
+others; "rows" shows that only the set-based path stays at one row per
+student. Prints one JSON object.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+DATE = "2025-03-03T08:00:00"
+
+
+def loop_save(db, data: dict) -> None:
+    from Backend.models import Attendance
+    from Backend.rollups import refresh_days
+
+    touched = []
+    for record in data.get("students", []):
+        att = Attendance(
+            StudentId=record["StudentId"],
+            Status=record.get("Status", "PRESENT"),
+            CheckInUtc=datetime.fromisoformat(data.get("Date")) if data.get("Date") else datetime.utcnow(),
+        )
+        db.add(att)
+        touched.append(att)
+    db.flush()
+    refresh_days(db, [(att.StudentId, att.CheckInUtc) for att in touched])
+    db.commit()
+
+
+def set_based_save(db, data: dict) -> None:
+    from Backend.models import AttendanceSheet
+    from Backend.rollups import refresh_days
+    from Backend.sheets import save_sheet, unknown_students
+
+    sheet = AttendanceSheet.model_validate(data)
+    statuses = {entry.StudentId: entry.Status for entry in sheet.students}
+    if unknown_students(db, statuses):
+        raise RuntimeError("roster has unknown students")
+    save_sheet(db, statuses, sheet.Date)
+    refresh_days(db, [(student_id, sheet.Date) for student_id in statuses])
+    db.commit()
+
+
+def run(save, sheet: dict, repeat: int) -> dict:
+    from Backend.db import SessionLocal, engine
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM Attendance")
+        conn.exec_driver_sql("DELETE FROM AttendanceDaily")
+
+    samples = []
+    db = SessionLocal()
+    try:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            save(db, sheet)
+            samples.append(time.perf_counter() - t0)
+    finally:
+        db.close()
+
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("SELECT count(*) FROM Attendance").scalar()
+    return {
+        "first_ms": round(samples[0] * 1000, 1),
+        "resubmit_ms": round(statistics.median(samples[1:]) * 1000, 1) if len(samples) > 1 else None,
+        "rows": rows,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ["STUDENT_TRACKER_DB_PATH"] = os.path.join(tmpdir.name, "bench_sheet.db")
+    from Backend.db import engine
+    from Backend.migrations import migrate
+
+    migrate(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?) "
+            "INSERT INTO Students (StudentId, UniversityId, FirstName, LastName, Email, Status) "
+            "SELECT i, 100000 + i, 'F', 'L', 's' || i || '@example.edu', 'Active' FROM n",
+            (args.students,),
+        )
+
+    statuses = ["PRESENT", "PRESENT", "PRESENT", "TARDY", "ABSENT"]
+    sheet = {
+        "Date": DATE,
+        "students": [{"StudentId": i, "Status": statuses[i % len(statuses)]} for i in range(1, args.students + 1)],
+    }
+    result = {
+        "students": args.students,
+        "repeat": args.repeat,
+        "loop": run(loop_save, sheet, args.repeat),
+        "set_based": run(set_based_save, sheet, args.repeat),
+    }
+    engine.dispose()
+    tmpdir.cleanup()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
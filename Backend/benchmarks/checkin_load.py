@@ -0,0 +1,107 @@
+"""Load test for POST /student/checkin/location, direct vs. batched ingestion.
+
+Usage:
+  python -m Backend.benchmarks.checkin_load [--requests 5000] [--concurrency 64]
+
+Each mode runs in its own subprocess against a fresh temp database, driving
+the real app in-process through httpx's ASGI transport. "acked_per_sec" is
+how fast clients got an answer; "durable_per_sec" also waits until every
+accepted check-in is committed. Prints one JSON object.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ["direct", "batched"]
+
+
+async def drive(total: int, concurrency: int, students: int) -> dict:
+    import httpx
+    from Backend.main import app, on_startup, on_shutdown
+
+    on_startup()
+    from Backend.db import engine
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?) "
+            "INSERT INTO Students (StudentId, UniversityId, FirstName, LastName, Email, Status) "
+            "SELECT i, 100000 + i, 'F', 'L', 's' || i || '@example.edu', 'Active' FROM n",
+            (students,),
+        )
+
+    statuses = {}
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one(i: int):
+            async with sem:
+                r = await client.post("/student/checkin/location", json={
+                    "StudentId": i % students + 1,
+                    "Lat": 36.3 + (i % 100) / 1000,
+                    "Lng": -82.36,
+                })
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        acked = time.perf_counter() - started
+
+    on_shutdown()  # drains the batch queue
+    durable = time.perf_counter() - started
+
+    with engine.connect() as conn:
+        written = conn.exec_driver_sql("SELECT count(*) FROM Attendance").scalar()
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "status_codes": statuses,
+        "rows_written": written,
+        "acked_seconds": round(acked, 3),
+        "acked_per_sec": round(total / acked, 1),
+        "durable_per_sec": round(written / durable, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = asyncio.run(drive(args.requests, args.concurrency, args.students))
+        print(json.dumps({"mode": args.child, **result}))
+        return
+
+    results = []
+    for mode in MODES:
+        with tempfile.TemporaryDirectory() as tmp:
+            child_env = dict(
+                os.environ,
+                STUDENT_TRACKER_DB_PATH=os.path.join(tmp, "bench_checkin.db"),
+                STUDENT_TRACKER_CHECKIN_MODE=mode,
+                STUDENT_TRACKER_CHECKIN_OVERFLOW="block",
+                STUDENT_TRACKER_CHECKIN_BLOCK_TIMEOUT_MS="5000",
+            )
+            out = subprocess.run(
+                [sys.executable, "-m", "Backend.benchmarks.checkin_load",
+                 "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+                 "--students", str(args.students), "--child", mode],
+                check=True, capture_output=True, text=True, env=child_env,
+            )
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(json.dumps({"results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
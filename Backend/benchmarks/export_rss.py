@@ -0,0 +1,143 @@
+"""Peak RSS of the streaming attendance export vs. building the full list.
+
+Usage:
+  python -m Backend.benchmarks.export_rss [--rows 1000000] [--db path]
+
+Seeds `--rows` Attendance rows into a temp database (or reuses `--db`),
+then runs each export mode in its own subprocess so the peak RSS numbers
+(ru_maxrss) do not leak into each other. Prints one JSON object.
+"""
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+MODES = ["list", "csv", "ndjson"]
+
+
+def seed(db_path: str, rows: int, students: int = 2000) -> None:
+    os.environ["STUDENT_TRACKER_DB_PATH"] = db_path
+    from Backend.db import engine
+    from Backend.migrations import migrate
+
+    migrate(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(db_path)
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    conn.executemany(
+        "INSERT INTO Students (StudentId, UniversityId, FirstName, LastName, Email, Status) VALUES (?, ?, ?, ?, ?, 'Active')",
+        ((i, 100000 + i, f"First{i}", f"Last{i}", f"s{i}@example.edu") for i in range(1, students + 1)),
+    )
+
+    def attendance():
+        for i in range(rows):
+            check_in = start + timedelta(minutes=i)
+            yield (
+                i % students + 1,
+                check_in.isoformat(" "),
+                (check_in + timedelta(hours=8)).isoformat(" "),
+                i % 3 == 0,
+                "PRESENT",
+                36.30 + (i % 100) / 1000,
+                -82.36 - (i % 100) / 1000,
+                check_in.isoformat(" "),
+            )
+
+    conn.executemany(
+        "INSERT INTO Attendance (StudentId, CheckInUtc, CheckOutUtc, IsApproved, Status, Lat, Lng, CreatedAtUtc) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        attendance(),
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_mode(db_path: str, mode: str) -> dict:
+    """Runs inside the child process."""
+    os.environ["STUDENT_TRACKER_DB_PATH"] = db_path
+    from Backend.db import SessionLocal
+    from Backend.export import stream_attendance
+    from Backend.models import Attendance
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    first_byte = None
+    nbytes = 0
+
+    if mode == "list":
+        # what get_attendance_sheet / get_student_attendance do today
+        db = SessionLocal()
+        rows = db.query(Attendance).all()
+        payload = json.dumps([
+            {
+                "AttendanceId": r.AttendanceId,
+                "StudentId": r.StudentId,
+                "CheckInUtc": r.CheckInUtc.isoformat(),
+                "CheckOutUtc": r.CheckOutUtc.isoformat() if r.CheckOutUtc else None,
+                "IsApproved": r.IsApproved,
+            }
+            for r in rows
+        ])
+        first_byte = time.perf_counter() - started
+        nbytes = len(payload)
+        db.close()
+    else:
+        for chunk in stream_attendance(mode):
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            nbytes += len(chunk)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "mode": mode,
+        "seconds": round(time.perf_counter() - started, 3),
+        "first_byte_seconds": round(first_byte or 0.0, 4),
+        "bytes": nbytes,
+        # ru_maxrss is KiB on Linux
+        "baseline_rss_mib": round(baseline / 1024, 1),
+        "peak_rss_mib": round(peak / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--db", default=None, help="Reuse an already seeded database")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.db, args.child)))
+        return
+
+    tmpdir = None
+    db_path = args.db
+    if db_path is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmpdir.name, "bench_export.db")
+        t0 = time.perf_counter()
+        seed(db_path, args.rows)
+        print(f"seeded {args.rows} rows in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+    results = []
+    for mode in MODES:
+        out = subprocess.run(
+            [sys.executable, "-m", "Backend.benchmarks.export_rss", "--db", db_path, "--child", mode],
+            check=True, capture_output=True, text=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(json.dumps({"rows": args.rows, "results": results}, indent=2))
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
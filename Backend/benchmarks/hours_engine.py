@@ -0,0 +1,143 @@
+"""Hours engine: vectorized NumPy path vs. a per-row Python loop.
+
+Usage:
+  python -m Backend.benchmarks.hours_engine [--sessions 100000] [--students 2000] [--repeat 5]
+
+Builds a synthetic semester of sessions (including overlaps, open punches
+and sessions crossing midnight), checks that both implementations agree,
+then times them. With --db the sessions are also written to a temp
+database and the full hours_for_range() call (fetch + compute) is timed.
+Prints one JSON object.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+RANGE_START = datetime(2025, 1, 6)
+RANGE_END = datetime(2025, 5, 12)
+NOW = datetime(2025, 5, 12)
+
+
+def synthetic_sessions(n: int, students: int, seed: int = 7):
+    from Backend.hours import _to_epoch
+
+    rng = np.random.default_rng(seed)
+    sid = rng.integers(1, students + 1, n)
+    day = rng.integers(0, (RANGE_END - RANGE_START).days, n)
+    start = _to_epoch(RANGE_START) + day * 86400.0 + rng.integers(6 * 3600, 20 * 3600, n)
+    length = rng.integers(30 * 60, 9 * 3600, n).astype(float)
+    end = start + length
+    end[rng.random(n) < 0.02] = np.nan  # forgotten check-outs
+    return sid.astype(np.int64), start.astype(float), end
+
+
+def python_hours(sid, starts, ends, range_start, range_end, now):
+    """Straightforward per-row implementation used as the baseline."""
+    from Backend.hours import OPEN_SESSION_CAP, WEEK, _to_epoch
+
+    lo, hi, now_s = _to_epoch(range_start), _to_epoch(range_end), _to_epoch(now)
+    origin = _to_epoch(datetime.combine(range_start.date() - timedelta(days=range_start.weekday()), datetime.min.time()))
+    per_student = defaultdict(list)
+    for s, st, en in zip(sid.tolist(), starts.tolist(), ends.tolist()):
+        if en != en:  # nan
+            en = min(now_s, st + OPEN_SESSION_CAP)
+        st, en = max(st, lo), min(en, hi)
+        if en > st:
+            per_student[s].append((st, en))
+
+    totals = {}
+    for s, intervals in per_student.items():
+        intervals.sort()
+        weeks = defaultdict(float)
+        cur_s, cur_e = intervals[0]
+        merged = []
+        for st, en in intervals[1:]:
+            if st <= cur_e:
+                cur_e = max(cur_e, en)
+            else:
+                merged.append((cur_s, cur_e))
+                cur_s, cur_e = st, en
+        merged.append((cur_s, cur_e))
+        for st, en in merged:
+            while st < en:
+                week = int((st - origin) // WEEK)
+                boundary = origin + (week + 1) * WEEK
+                piece_end = min(en, boundary)
+                weeks[week] += piece_end - st
+                st = piece_end
+        totals[s] = round(sum(weeks.values()) / 3600, 2)
+    return totals
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        samples.append(time.perf_counter() - t0)
+    return out, round(statistics.median(samples) * 1000, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", action="store_true", help="also time fetch + compute against SQLite")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ["STUDENT_TRACKER_DB_PATH"] = os.path.join(tmpdir.name, "bench_hours.db")
+    from Backend.hours import compute_hours
+
+    sid, starts, ends = synthetic_sessions(args.sessions, args.students)
+
+    vec, vec_ms = timed(lambda: compute_hours(sid, starts, ends, RANGE_START, RANGE_END, now=NOW), args.repeat)
+    loop, loop_ms = timed(lambda: python_hours(sid, starts, ends, RANGE_START, RANGE_END, NOW), args.repeat)
+
+    mismatches = sum(1 for s, h in loop.items() if abs(vec[s]["total_hours"] - h) > 0.011)
+    result = {
+        "sessions": args.sessions,
+        "students": args.students,
+        "numpy_ms": vec_ms,
+        "python_loop_ms": loop_ms,
+        "speedup": round(loop_ms / vec_ms, 1) if vec_ms else None,
+        "mismatched_students": mismatches,
+    }
+
+    if args.db:
+        from Backend.db import SessionLocal, engine
+        from Backend.hours import _from_epoch, hours_for_range
+        from Backend.migrations import migrate
+
+        migrate(engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO Attendance (StudentId, CheckInUtc, CheckOutUtc, IsApproved, Status) VALUES (?, ?, ?, 0, 'PRESENT')",
+                [
+                    (s, _from_epoch(st).isoformat(" "), None if en != en else _from_epoch(en).isoformat(" "))
+                    for s, st, en in zip(sid.tolist(), starts.tolist(), ends.tolist())
+                ],
+            )
+        db = SessionLocal()
+        _, db_ms = timed(
+            lambda: hours_for_range(db, RANGE_START.date(), (RANGE_END - timedelta(days=1)).date(), now=NOW),
+            args.repeat,
+        )
+        db.close()
+        engine.dispose()
+        result["fetch_and_compute_ms"] = db_ms
+
+    tmpdir.cleanup()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
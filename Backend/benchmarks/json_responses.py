@@ -0,0 +1,143 @@
+"""CPU per request of large list responses, default JSON path vs. FAST_JSON.
+
+Usage:
+  python -m Backend.benchmarks.json_responses [--rows 10000] [--requests 50]
+
+Seeds --rows Positions and --rows Attendance rows (all for student 1, all
+on one day) into a temp database, then runs each mode in its own
+subprocess against the same file:
+
+  default     ORM objects -> dicts -> jsonable_encoder -> json.dumps
+  fast_json   STUDENT_TRACKER_FAST_JSON=true: Core tuples -> orjson
+              (Backend/fastjson.py)
+
+for GET /positions/, GET /attendance/student/1 and
+GET /teacher/attendance/<day>. "cpu_ms" is process CPU time per request
+(all threads), "p50_ms" the median wall time, "bytes" the body size; the
+bodies of both modes are checked to decode to the same JSON. Prints one
+JSON object.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+MODES = {"default": "false", "fast_json": "true"}
+DAY = datetime(2025, 3, 3, 8, 0, 0)
+ROUTES = {
+    "positions": "/positions/",
+    "student_attendance": "/attendance/student/1",
+    "attendance_sheet": f"/teacher/attendance/{DAY.date()}",
+}
+
+
+def seed(db_path: str, rows: int) -> None:
+    os.environ["STUDENT_TRACKER_DB_PATH"] = db_path
+    from Backend.db import engine
+    from Backend.migrations import migrate
+
+    migrate(engine)
+    engine.dispose()
+
+    ts = lambda value: value.strftime("%Y-%m-%d %H:%M:%S.%f")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO Students (StudentId, UniversityId, FirstName, LastName, Email, Program, Year, Status) "
+        "VALUES (1, 100001, 'F', 'L', 's1@example.edu', 'Nursing', '2', 'Active')"
+    )
+    conn.executemany(
+        "INSERT INTO Positions (Title, Company, SiteLocation, SupervisorName, SupervisorEmail, TermStart, TermEnd, "
+        "CreatedAtUtc, SiteLat, SiteLng, SiteRadiusM) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (f"Position {i}", f"Company {i % 97}", f"Site {i}", f"Supervisor {i}", f"sup{i}@example.com",
+             ts(DAY), ts(DAY + timedelta(days=120)), ts(DAY), 36.3 + i / 1e5, -82.35 - i / 1e5, 150.0)
+            for i in range(rows)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO Attendance (StudentId, CheckInUtc, CheckOutUtc, IsApproved, Status, Lat, Lng, CreatedAtUtc) "
+        "VALUES (1, ?, ?, ?, 'PRESENT', ?, ?, ?)",
+        (
+            (ts(DAY + timedelta(seconds=i)), ts(DAY + timedelta(seconds=i, hours=1)), i % 3 == 0,
+             36.3 + i / 1e5, -82.35, ts(DAY + timedelta(seconds=i)))
+            for i in range(rows)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+async def measure(requests: int) -> dict:
+    """Runs inside the child process."""
+    import httpx
+    from Backend.main import app
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, url in ROUTES.items():
+            body = (await client.get(url)).content  # warm-up
+            cpu, wall = [], []
+            for _ in range(requests):
+                c0, w0 = time.process_time(), time.perf_counter()
+                r = await client.get(url)
+                body = r.content
+                wall.append(time.perf_counter() - w0)
+                cpu.append(time.process_time() - c0)
+            results[name] = {
+                "cpu_ms": round(statistics.mean(cpu) * 1000, 2),
+                "p50_ms": round(statistics.median(wall) * 1000, 2),
+                "bytes": len(body),
+                # compare decoded bodies: the two paths may differ in whitespace
+                "digest": hashlib.sha1(json.dumps(json.loads(body), sort_keys=True).encode()).hexdigest(),
+            }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--db", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(measure(args.requests))))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench_json.db")
+        seed(db_path, args.rows)
+        runs = {}
+        for mode, flag in MODES.items():
+            out = subprocess.run(
+                [sys.executable, "-m", "Backend.benchmarks.json_responses",
+                 "--requests", str(args.requests), "--child"],
+                check=True, capture_output=True, text=True,
+                env=dict(os.environ, STUDENT_TRACKER_DB_PATH=db_path, STUDENT_TRACKER_FAST_JSON=flag),
+            )
+            runs[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    result = {"rows": args.rows, "requests": args.requests, "routes": {}}
+    for name in ROUTES:
+        default, fast = runs["default"][name], runs["fast_json"][name]
+        result["routes"][name] = {
+            "default": {k: v for k, v in default.items() if k != "digest"},
+            "fast_json": {k: v for k, v in fast.items() if k != "digest"},
+            "cpu_speedup": round(default["cpu_ms"] / fast["cpu_ms"], 2) if fast["cpu_ms"] else None,
+            "same_body": default["digest"] == fast["digest"],
+        }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Location traces: storage and trace-query time, raw vs thinned vs packed.
+
+Usage:
+  python -m Backend.benchmarks.location_traces [--students 50] [--days 14]
+      [--interval 30] [--repeat 5]
+
+Simulates devices pinging every --interval seconds through an 8 hour shift
+(mostly standing at the site with GPS jitter, with a few walks in between)
+and stores them three ways in one temp database:
+
+  raw      every ping a StudentLocations row, as before thinning
+  thinned  only the pings traces.thin() keeps
+  packed   the thinned rows after traces.compact_traces()
+
+For each it reports the rows, the bytes the data takes after VACUUM and
+the median time of traces.trace_points() for one student over a week.
+Prints one JSON object.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BASE_LAT, BASE_LNG = 36.3134, -82.3535
+TS = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def synthetic_pings(students: int, days: int, interval: int, seed: int = 11):
+    """(StudentId, CheckInUtc, Lat, Lng) in time order per student."""
+    rng = random.Random(seed)
+    first_day = datetime.combine(datetime.utcnow().date() - timedelta(days=days), datetime.min.time())
+    meters_lat = 1 / 111320.0
+    meters_lng = meters_lat / math.cos(math.radians(BASE_LAT))
+    for sid in range(1, students + 1):
+        site = (BASE_LAT + rng.uniform(-0.1, 0.1), BASE_LNG + rng.uniform(-0.1, 0.1))
+        for d in range(days):
+            at = first_day + timedelta(days=d, hours=8, seconds=rng.randrange(1800))
+            lat, lng = site
+            walking, heading = 0, 0.0
+            for _ in range(8 * 3600 // interval):
+                if walking:
+                    step = 1.4 * interval
+                    heading += rng.gauss(0, 0.3)
+                    lat += step * math.cos(heading) * meters_lat
+                    lng += step * math.sin(heading) * meters_lng
+                    walking -= 1
+                elif rng.random() < 0.01:
+                    walking, heading = rng.randint(5, 40), rng.uniform(0, 2 * math.pi)
+                jitter = rng.gauss(0, 4.0)
+                yield (
+                    sid,
+                    at,
+                    lat + jitter * meters_lat * rng.uniform(-1, 1),
+                    lng + jitter * meters_lng * rng.uniform(-1, 1),
+                )
+                at += timedelta(seconds=interval + rng.randint(-3, 3))
+
+
+def load(db_path: str, pings) -> int:
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM StudentLocations")
+    conn.executemany(
+        "INSERT INTO StudentLocations (StudentId, Lat, Lng, CheckInUtc, CreatedAtUtc) VALUES (?, ?, ?, ?, ?)",
+        ((sid, lat, lng, at.strftime(TS), at.strftime(TS)) for sid, at, lat, lng in pings),
+    )
+    conn.commit()
+    n = conn.execute("SELECT count(*) FROM StudentLocations").fetchone()[0]
+    conn.close()
+    return n
+
+
+def data_bytes(engine) -> int:
+    """Database size after VACUUM; everything but the locations is a few pages."""
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+        page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+        pages = conn.exec_driver_sql("PRAGMA page_count").scalar()
+    return pages * page_size
+
+
+def timed_trace(student_id: int, start: datetime, end: datetime, repeat: int):
+    from Backend.db import SessionLocal
+    from Backend.traces import trace_points
+
+    db = SessionLocal()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        points = trace_points(db, student_id, start, end)
+        samples.append(time.perf_counter() - t0)
+    db.close()
+    return len(points), round(statistics.median(samples) * 1000, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--interval", type=int, default=30, help="seconds between pings")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    db_path = os.path.join(tmpdir.name, "bench_traces.db")
+    os.environ["STUDENT_TRACKER_DB_PATH"] = db_path
+    from Backend.db import engine
+    from Backend.migrations import migrate
+    from Backend.traces import worth_storing, compact_traces
+
+    migrate(engine)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO Students (StudentId, UniversityId, FirstName, LastName, Email, Status) VALUES (?, ?, ?, ?, ?, 'Active')",
+        ((i, 100000 + i, f"First{i}", f"Last{i}", f"s{i}@example.edu") for i in range(1, args.students + 1)),
+    )
+    conn.commit()
+    conn.close()
+
+    pings = list(synthetic_pings(args.students, args.days, args.interval))
+    week_end = datetime.utcnow()
+    week_start = week_end - timedelta(days=7)
+    result = {"students": args.students, "days": args.days, "interval_s": args.interval}
+
+    rows = load(db_path, pings)
+    points, ms = timed_trace(1, week_start, week_end, args.repeat)
+    result["raw"] = {"rows": rows, "bytes": data_bytes(engine), "trace_points": points, "trace_ms": ms}
+
+    last, thinned = {}, []
+    for sid, at, lat, lng in pings:
+        if worth_storing(last.get(sid), lat, lng, at):
+            thinned.append((sid, at, lat, lng))
+            last[sid] = (lat, lng, at)
+    rows = load(db_path, thinned)
+    points, ms = timed_trace(1, week_start, week_end, args.repeat)
+    result["thinned"] = {"rows": rows, "bytes": data_bytes(engine), "trace_points": points, "trace_ms": ms}
+
+    t0 = time.perf_counter()
+    stats = compact_traces(engine, datetime.utcnow().date(), log=lambda _: None)
+    compact_s = round(time.perf_counter() - t0, 2)
+    points, ms = timed_trace(1, week_start, week_end, args.repeat)
+    result["packed"] = {
+        "rows": stats.get("traces", 0),
+        "bytes": data_bytes(engine),
+        "trace_points": points,
+        "trace_ms": ms,
+        "compact_seconds": compact_s,
+    }
+
+    raw = result["raw"]
+    for name in ("thinned", "packed"):
+        result[name]["storage_saved"] = f"{1 - result[name]['bytes'] / raw['bytes']:.1%}"
+        result[name]["trace_speedup"] = round(raw["trace_ms"] / result[name]["trace_ms"], 1) if result[name]["trace_ms"] else None
+
+    engine.dispose()
+    tmpdir.cleanup()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
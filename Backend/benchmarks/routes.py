@@ -0,0 +1,300 @@
+"""Route latency and throughput on a seeded database.
+
+Usage:
+  python -m Backend.benchmarks.routes [--db seeded.db] [--requests 500]
+      [--concurrency 16] [--scenario map --scenario dashboard ...]
+      [--compare previous.json] [seed options, see Backend/benchmarks/seed.py]
+
+Without --db a temp database is seeded first (same options as seed.py;
+seeding a few million rows takes a while, so reuse one with --db when
+comparing changes). Writes go into that database: check-ins add rows and
+the attendance sheet rewrites one day, so use a fresh copy per run when
+numbers have to be comparable.
+
+The real Backend.main.app is driven in-process through httpx's ASGI
+transport. Each scenario gets --warmup untimed requests, then --requests
+timed ones with --concurrency in flight. Request parameters come from a
+random.Random(--seed), so two runs send the same requests.
+
+Prints one JSON object: "meta" (scale, settings, versions) and one entry
+per scenario with p50/p95/p99/max latency in ms, requests per second and
+status codes. With --compare, every scenario also gets the ratio against
+the same scenario in an earlier output (< 1.0 is faster).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+
+def _today() -> date:
+    return datetime.utcnow().date()
+
+
+# name -> fn(rng, scale) returning (method, url, json body or None)
+def _checkin(rng, scale):
+    return "POST", "/student/checkin/location", {
+        "StudentId": rng.randint(1, scale["students"]),
+        "Lat": 36.3134 + rng.uniform(-0.15, 0.15),
+        "Lng": -82.3535 + rng.uniform(-0.15, 0.15),
+    }
+
+
+def _map(rng, scale):
+    return "GET", "/teacher/locations/today", None
+
+
+def _map_bbox(rng, scale):
+    lat = 36.3134 + rng.uniform(-0.1, 0.1)
+    lng = -82.3535 + rng.uniform(-0.1, 0.1)
+    return "GET", (
+        f"/teacher/locations/today?min_lat={lat - 0.05:.4f}&min_lng={lng - 0.05:.4f}"
+        f"&max_lat={lat + 0.05:.4f}&max_lng={lng + 0.05:.4f}"
+    ), None
+
+
+def _attendance_sheet(rng, scale):
+    size = min(scale["sheet_size"], scale["students"])
+    first = rng.randint(1, scale["students"] - size + 1)
+    statuses = ["PRESENT", "PRESENT", "PRESENT", "TARDY", "ABSENT"]
+    return "POST", "/teacher/attendance", {
+        "Date": f"{_today() - timedelta(days=1)}T08:00:00",
+        "students": [{"StudentId": sid, "Status": rng.choice(statuses)} for sid in range(first, first + size)],
+    }
+
+
+def _attendance_day(rng, scale):
+    day = _today() - timedelta(days=rng.randint(1, scale["days"]))
+    return "GET", f"/teacher/attendance/{day}", None
+
+
+def _attendance_daily(rng, scale):
+    end = _today() - timedelta(days=rng.randint(0, scale["days"] // 2))
+    student = rng.randint(1, scale["students"])
+    return "GET", f"/teacher/attendance/daily?from={end - timedelta(days=30)}&to={end}&student_id={student}", None
+
+
+def _hours(rng, scale):
+    end = _today()
+    students = "&".join(f"student_id={rng.randint(1, scale['students'])}" for _ in range(10))
+    return "GET", f"/teacher/hours?from={end - timedelta(days=scale['days'])}&to={end}&{students}", None
+
+
+def _dashboard(rng, scale):
+    return "GET", "/admin/dashboard/metrics", None
+
+
+def _students_page(rng, scale):
+    return "GET", "/admin/students?limit=50", None
+
+
+def _students_all(rng, scale):
+    return "GET", "/admin/students?status=all", None
+
+
+def _teacher_students(rng, scale):
+    return "GET", "/teacher/students", None
+
+
+def _positions(rng, scale):
+    return "GET", "/positions/", None
+
+
+def _student_history(rng, scale):
+    return "GET", f"/attendance/student/{rng.randint(1, scale['students'])}", None
+
+
+# read-only scenarios first; the write scenarios change what later reads see
+SCENARIOS = {
+    "map": _map,
+    "map_bbox": _map_bbox,
+    "dashboard": _dashboard,
+    "students_page": _students_page,
+    "students_all": _students_all,
+    "teacher_students": _teacher_students,
+    "positions": _positions,
+    "attendance_day": _attendance_day,
+    "attendance_daily": _attendance_daily,
+    "student_history": _student_history,
+    "hours": _hours,
+    "checkin": _checkin,
+    "attendance_sheet": _attendance_sheet,
+}
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), math.ceil(q / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+async def run_scenario(client, name: str, scale: dict, requests: int, warmup: int, concurrency: int, seed: int) -> dict:
+    rng = random.Random(f"{seed}:{name}")
+    build = SCENARIOS[name]
+    plan = [build(rng, scale) for _ in range(warmup + requests)]
+
+    async def send(method, url, body):
+        t0 = time.perf_counter()
+        r = await client.request(method, url, json=body)
+        await r.aread()
+        return r.status_code, time.perf_counter() - t0
+
+    for method, url, body in plan[:warmup]:
+        await send(method, url, body)
+
+    sem = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async def one(method, url, body):
+        async with sem:
+            status, elapsed = await send(method, url, body)
+        latencies.append(elapsed)
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(*p) for p in plan[warmup:]))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda s: round(s * 1000, 2)
+    return {
+        "requests": requests,
+        "status_codes": dict(sorted(statuses.items())),
+        "errors": sum(n for code, n in statuses.items() if not code.startswith("2")),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1]) if latencies else 0.0,
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+        "throughput_rps": round(requests / wall, 1) if wall else 0.0,
+    }
+
+
+async def drive(names: list, scale: dict, args: argparse.Namespace) -> dict:
+    import httpx
+    from Backend.main import app, on_startup, on_shutdown
+
+    on_startup()
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name in names:
+                results[name] = await run_scenario(
+                    client, name, scale, args.requests, args.warmup, args.concurrency, args.seed
+                )
+                print(f"{name}: p50 {results[name]['p50_ms']} ms, {results[name]['throughput_rps']} req/s", file=sys.stderr)
+    finally:
+        on_shutdown()
+    return results
+
+
+def _table_counts(db_path: str) -> dict:
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            table: conn.execute(f'SELECT count(*) FROM "{table}"').fetchone()[0]
+            for table in ("Students", "Positions", "StudentAssignments", "Attendance", "StudentLocations")
+        }
+    finally:
+        conn.close()
+
+
+def _git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results: dict, previous: dict) -> None:
+    """Add "vs_previous" ratios (new / old) to every scenario present in both."""
+    for name, current in results.items():
+        old = previous.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        current["vs_previous"] = {
+            key: round(current[key] / old[key], 3) if old.get(key) else None
+            for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+        }
+
+
+def main() -> None:
+    from Backend.benchmarks import seed as seeding
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=None, help="Reuse a database made by Backend.benchmarks.seed")
+    parser.add_argument("--requests", type=int, default=500, help="Timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--sheet-size", type=int, default=200, help="Students per attendance sheet")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Repeatable; default all")
+    parser.add_argument("--compare", default=None, help="Earlier JSON output to compare against")
+    seeding.add_arguments(parser)
+    args = parser.parse_args()
+
+    tmpdir = None
+    seeded = None
+    db_path = args.db
+    if db_path is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmpdir.name, "bench_routes.db")
+        seeded = seeding.seed_from_args(db_path, args)
+        print(f"seeded in {seeded['total_seconds']}s", file=sys.stderr)
+    os.environ["STUDENT_TRACKER_DB_PATH"] = db_path
+
+    counts = _table_counts(db_path)
+    scale = {
+        "students": counts["Students"],
+        "days": args.days,
+        "sheet_size": args.sheet_size,
+    }
+    names = [name for name in SCENARIOS if not args.scenario or name in args.scenario]
+    results = asyncio.run(drive(names, scale, args))
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+    import sqlalchemy
+    from Backend.db import engine
+
+    engine.dispose()
+    output = {
+        "meta": {
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "sqlalchemy": sqlalchemy.__version__,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "rows": counts,
+            "seed_seconds": seeded["total_seconds"] if seeded else None,
+            "settings": {
+                k: v for k, v in sorted(os.environ.items())
+                if k.startswith("STUDENT_TRACKER_") and k != "STUDENT_TRACKER_DB_PATH"
+            },
+        },
+        "scenarios": results,
+    }
+    if tmpdir is not None:
+        tmpdir.cleanup()
+    print(json.dumps(output, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Full-text search (Backend/search.py): latency at scale.
+
+Usage:
+  python -m Backend.benchmarks.search [--students 100000] [--users 500]
+      [--positions 2000] [--feedback 20000] [--repeat 20]
+
+Loads students, users, positions and feedback with realistic name
+distributions (a few hundred first names, a few thousand last names)
+into a temp database through the migrations, so SearchIndex is filled
+the way production fills it. Then times search() for typical queries:
+a full name, name prefixes of 2 to 4 letters, an email, a company, words
+from feedback, and with a type filter. Prints one JSON object with the
+median and p95 per query in milliseconds.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+NOW = "2026-01-12 09:00:00.000000"
+FIRST = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth",
+    "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+    "Christopher", "Nancy", "Daniel", "Lisa", "Matthew", "Betty", "Anthony", "Margaret", "Mark", "Sandra",
+    "Donald", "Ashley", "Steven", "Kimberly", "Paul", "Emily", "Andrew", "Donna", "Joshua", "Michelle",
+    "Kenneth", "Dorothy", "Kevin", "Carol", "Brian", "Amanda", "George", "Melissa", "Timothy", "Deborah",
+    "Ronald", "Stephanie", "Edward", "Rebecca", "Jason", "Sharon", "Jeffrey", "Laura", "Ryan", "Cynthia",
+    "Jacob", "Kathleen", "Gary", "Amy", "Nicholas", "Angela", "Eric", "Shirley", "Jonathan", "Anna",
+    "Stephen", "Brenda", "Larry", "Pamela", "Justin", "Emma", "Scott", "Nicole", "Brandon", "Helen",
+    "Benjamin", "Samantha", "Samuel", "Katherine", "Gregory", "Christine", "Alexander", "Debra", "Frank", "Rachel",
+    "Zoë", "José", "Chloé", "Renée", "Ana", "Luis", "Mei", "Wei", "Aisha", "Omar",
+]
+SYLLABLES = ["an", "ber", "car", "den", "el", "fer", "gar", "hol", "is", "jen", "kin", "lan", "mor", "nel",
+             "ol", "par", "quin", "ros", "sten", "tor", "ul", "van", "wal", "yor", "zim", "son", "ton", "ley"]
+PROGRAMS = ["Nursing", "Education", "Social Work", "Engineering", "Business"]
+COMPANIES = ["Ballad Health", "Eastman", "Washington County Schools", "Frontier Health", "Nuclear Fuel Services",
+             "Citi", "Mountain States", "Johnson City Press", "Bristol Motor Speedway", "Tennessee Valley Authority"]
+WORDS = ["punctual", "excellent", "communication", "needs", "improvement", "documentation", "patient", "care",
+         "lesson", "planning", "teamwork", "initiative", "late", "professional", "feedback", "charting",
+         "classroom", "management", "safety", "protocol", "supervisor", "reports", "great", "progress"]
+QUERIES = {
+    "full name": ("Jennifer Morgarson", None),
+    "first name, 2 letters": ("je", None),
+    "first name, 4 letters": ("jenn", None),
+    "last name prefix": ("morg", None),
+    "first + last prefix": ("jennifer mor", None),
+    "email": ("jennifer.anber", None),
+    "company": ("ballad", None),
+    "feedback words": ("documentation impro", None),
+    "students only": ("smith", ["student"]),
+    "positions + users": ("ball", ["position", "user"]),
+}
+
+
+def last_names(rng, n: int = 4000) -> list:
+    names = set()
+    while len(names) < n:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize())
+    return sorted(names) + ["Smith", "Johnson", "Williams", "Brown", "Jones"]
+
+
+def load(db_path: str, args) -> dict:
+    rng = random.Random(args.seed)
+    lasts = last_names(rng)
+    conn = sqlite3.connect(db_path)
+    students = []
+    for i in range(1, args.students + 1):
+        first, last = ("Jennifer", "Morgarson") if i == 1 else (rng.choice(FIRST), rng.choice(lasts))
+        students.append((i, str(100000 + i), first, last, f"{first.lower()}.{last.lower()}{i}@etsu.edu",
+                         rng.choice(PROGRAMS), "Active"))
+    conn.executemany(
+        "INSERT INTO Students (StudentId, UniversityId, FirstName, LastName, Email, Program, Status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        students,
+    )
+    conn.executemany(
+        "INSERT INTO Users (UserId, FirstName, LastName, Email, Role, CreatedAtUtc, IsActive) VALUES (?, ?, ?, ?, ?, ?, 1)",
+        ((i, f := rng.choice(FIRST), l := rng.choice(lasts), f"{f.lower()}.{l.lower()}{i}@etsu.edu",
+          rng.choice(["INSTRUCTOR", "ADMIN", "IT"]), NOW) for i in range(1, args.users + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO Positions (PositionId, Title, Company, SiteLocation, SupervisorName, SupervisorEmail, TermStart, TermEnd, CreatedAtUtc) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((i, f"{rng.choice(['Clinical', 'Student', 'Field', 'Research'])} {rng.choice(['Intern', 'Teacher', 'Assistant', 'Placement'])}",
+          rng.choice(COMPANIES), f"Site {i}", f"{rng.choice(FIRST)} {rng.choice(lasts)}", f"sup{i}@example.com", NOW, NOW, NOW)
+         for i in range(1, args.positions + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO Feedback (FeedbackId, TargetType, TargetId, FeedbackText, CreatedAtUtc) VALUES (?, ?, ?, ?, ?)",
+        ((i, "STUDENT", rng.randint(1, args.students), " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 30))), NOW)
+         for i in range(1, args.feedback + 1)),
+    )
+    conn.commit()
+    rows = conn.execute("SELECT count(*) FROM SearchIndex").fetchone()[0]
+    conn.close()
+    return {"indexed_rows": rows}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--positions", type=int, default=2000)
+    parser.add_argument("--feedback", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    db_path = os.path.join(tmpdir.name, "bench_search.db")
+    os.environ["STUDENT_TRACKER_DB_PATH"] = db_path
+    from Backend.db import SessionLocal, engine
+    from Backend.migrations import migrate
+    from Backend.search import search
+
+    migrate(engine)
+    t0 = time.perf_counter()
+    result = load(db_path, args)
+    result["load_seconds"] = round(time.perf_counter() - t0, 1)  # includes the triggers
+    with engine.connect() as conn:
+        conn.exec_driver_sql("INSERT INTO SearchIndex (SearchIndex) VALUES ('optimize')")
+        conn.commit()
+
+    db = SessionLocal()
+    result["queries"] = {}
+    for name, (q, kinds) in QUERIES.items():
+        samples = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            hits, next_cursor = search(db, q, kinds, limit=20)
+            samples.append((time.perf_counter() - t0) * 1000)
+        samples.sort()
+        result["queries"][name] = {
+            "q": q,
+            "hits": len(hits),
+            "more": next_cursor is not None,
+            "ranked": bool(hits) and hits[0]["Score"] is not None,
+            "median_ms": round(statistics.median(samples), 2),
+            "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 2),
+        }
+    db.close()
+    engine.dispose()
+    tmpdir.cleanup()
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Synthetic student_tracker database at a configurable scale.
+
+Usage:
+  python -m Backend.benchmarks.seed --out /tmp/bench.db [--students 5000]
+      [--positions 200] [--teachers 50] [--attendance 1000000]
+      [--locations 1000000] [--days 120] [--seed 42]
+
+Creates the schema with the migrations, then bulk-loads with plain sqlite3
+executemany (the ORM would dominate the run time at millions of rows):
+
+  Users                 --teachers instructors plus one admin
+  Positions             --positions sites around Johnson City, TN
+  StudentAssignments    every student on one position and one teacher
+  Attendance            --attendance sessions spread over the last --days
+                        days up to now; about 1 in 20 still open, 1 in 3
+                        approved, most of them located near the site
+  StudentLocations      --locations GPS points over the same window
+
+AttendanceDaily and StudentCurrentLocations are rebuilt afterwards, so the
+database looks like one that has been in use. The same --seed gives the
+same rows (relative to the current date). Prints one JSON object.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+BASE_LAT, BASE_LNG = 36.3134, -82.3535
+STATUSES = ["PRESENT"] * 16 + ["TARDY"] * 3 + ["ABSENT"]
+PROGRAMS = ["Nursing", "Education", "Social Work", "Engineering", "Business"]
+TS = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def _ts(value: datetime) -> str:
+    return value.strftime(TS)
+
+
+def seed(
+    db_path: str,
+    students: int = 5000,
+    positions: int = 200,
+    teachers: int = 50,
+    attendance: int = 1_000_000,
+    locations: int = 1_000_000,
+    days: int = 120,
+    rng_seed: int = 42,
+) -> dict:
+    """Create and fill `db_path`. Returns the row counts and timings."""
+    os.environ["STUDENT_TRACKER_DB_PATH"] = db_path
+    from Backend.db import engine
+    from Backend.migrations import migrate
+
+    started = time.perf_counter()
+    migrate(engine)
+
+    rng = random.Random(rng_seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    window_start = now - timedelta(days=days)
+    term_start = window_start - timedelta(days=7)
+    term_end = now + timedelta(days=60)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+
+    conn.executemany(
+        "INSERT INTO Users (UserId, FirstName, LastName, Email, Role, CreatedAtUtc, IsActive) VALUES (?, ?, ?, ?, ?, ?, 1)",
+        [(1, "Admin", "User", "admin@example.edu", "Admin", now.isoformat())] + [
+            (i, f"Teacher{i}", f"Instructor{i}", f"t{i}@example.edu", "Instructor", now.isoformat())
+            for i in range(2, teachers + 2)
+        ],
+    )
+
+    sites = {}
+    position_rows = []
+    for pid in range(1, positions + 1):
+        lat = BASE_LAT + rng.uniform(-0.15, 0.15)
+        lng = BASE_LNG + rng.uniform(-0.15, 0.15)
+        sites[pid] = (lat, lng)
+        position_rows.append((
+            pid, f"Position {pid}", f"Company {pid % 97}", f"Site {pid}", f"Supervisor {pid}",
+            f"sup{pid}@example.com", _ts(term_start), _ts(term_end), _ts(now),
+            lat, lng, rng.choice([100.0, 150.0, 250.0]),
+        ))
+    conn.executemany(
+        "INSERT INTO Positions (PositionId, Title, Company, SiteLocation, SupervisorName, SupervisorEmail, "
+        "TermStart, TermEnd, CreatedAtUtc, SiteLat, SiteLng, SiteRadiusM) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        position_rows,
+    )
+
+    conn.executemany(
+        "INSERT INTO Students (StudentId, UniversityId, FirstName, LastName, Email, Program, Year, Status, GPA, CreatedAtUtc) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                i, 100000 + i, f"First{i}", f"Last{rng.randrange(students)}", f"s{i}@example.edu",
+                rng.choice(PROGRAMS), rng.choice(["1", "2", "3", "4"]),
+                "Active" if rng.random() < 0.9 else rng.choice(["Inactive", "OnLeave"]),
+                round(rng.uniform(2.0, 4.0), 2), _ts(term_start),
+            )
+            for i in range(1, students + 1)
+        ),
+    )
+
+    student_site = {sid: rng.randint(1, positions) for sid in range(1, students + 1)}
+    conn.executemany(
+        "INSERT INTO StudentAssignments (StudentId, UserId, PositionId, IsActive) VALUES (?, ?, ?, 1)",
+        ((sid, 2 + sid % teachers, pid) for sid, pid in student_site.items()),
+    )
+
+    window = days * 86400
+
+    def located(sid):
+        lat, lng = sites[student_site[sid]]
+        spread = 0.001 if rng.random() < 0.85 else 0.02
+        return lat + rng.gauss(0, spread), lng + rng.gauss(0, spread)
+
+    def attendance_rows():
+        for _ in range(attendance):
+            sid = rng.randint(1, students)
+            check_in = window_start + timedelta(seconds=rng.randrange(window))
+            check_out = None
+            if rng.random() >= 0.05:
+                check_out = _ts(min(check_in + timedelta(minutes=rng.randint(30, 540)), now))
+            lat, lng = located(sid) if rng.random() < 0.8 else (None, None)
+            yield (
+                sid, _ts(check_in), check_out, rng.random() < 0.33, rng.choice(STATUSES),
+                lat, lng, _ts(check_in),
+            )
+
+    conn.executemany(
+        "INSERT INTO Attendance (StudentId, CheckInUtc, CheckOutUtc, IsApproved, Status, Lat, Lng, CreatedAtUtc) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        attendance_rows(),
+    )
+
+    def location_rows():
+        for _ in range(locations):
+            sid = rng.randint(1, students)
+            at = _ts(window_start + timedelta(seconds=rng.randrange(window)))
+            lat, lng = located(sid)
+            yield sid, lat, lng, at, at
+
+    conn.executemany(
+        "INSERT INTO StudentLocations (StudentId, Lat, Lng, CheckInUtc, CreatedAtUtc) VALUES (?, ?, ?, ?, ?)",
+        location_rows(),
+    )
+    conn.commit()
+    conn.close()
+    loaded = time.perf_counter() - started
+
+    from Backend import locations as current
+    from Backend import rollups
+
+    with engine.begin() as bind:
+        daily = rollups.rebuild(bind)
+        located_students = current.rebuild(bind)
+    with engine.connect() as bind:
+        bind.exec_driver_sql("ANALYZE")
+    engine.dispose()
+
+    return {
+        "db": db_path,
+        "seed": rng_seed,
+        "days": days,
+        "rows": {
+            "Users": teachers + 1,
+            "Positions": positions,
+            "Students": students,
+            "StudentAssignments": students,
+            "Attendance": attendance,
+            "StudentLocations": locations,
+            "AttendanceDaily": daily,
+            "StudentCurrentLocations": located_students,
+        },
+        "load_seconds": round(loaded, 1),
+        "total_seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--positions", type=int, default=200)
+    parser.add_argument("--teachers", type=int, default=50)
+    parser.add_argument("--attendance", type=int, default=1_000_000)
+    parser.add_argument("--locations", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def seed_from_args(db_path: str, args: argparse.Namespace) -> dict:
+    return seed(
+        db_path,
+        students=args.students,
+        positions=args.positions,
+        teachers=args.teachers,
+        attendance=args.attendance,
+        locations=args.locations,
+        days=args.days,
+        rng_seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", required=True, help="Path of the database to create")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    if os.path.exists(args.out):
+        sys.exit(f"{args.out} already exists")
+    print(json.dumps(seed_from_args(args.out, args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""In-process caches shared by the route modules."""
+import threading
+import time
+from contextlib import contextmanager
+from Backend.settings import env
+
+
+class CountCache:
+    """
+    Small TTL cache for `SELECT count(*)` results.
+    Keys are tuples whose first item is the table name, so every count for a
+    table can be dropped at once when a write route changes that table.
+    The load runs outside the lock; one that an invalidate() overtook may
+    predate that write, so it is returned but not stored.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._data = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key: tuple, loader):
+        now = time.monotonic()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and hit[1] > now:
+                return hit[0]
+            generation = self._generation
+        value = loader()
+        with self._lock:
+            if self._generation == generation:
+                self._data[key] = (value, now + self.ttl_seconds)
+        return value
+
+    def invalidate(self, table: str = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if table is None:
+                self._data.clear()
+                return
+            for key in [k for k in self._data if k[0] == table]:
+                del self._data[key]
+
+
+count_cache = CountCache(ttl_seconds=env("COUNT_CACHE_TTL", 30.0))
+
+
+class DashboardMetricsCache:
+    """
+    Running totals behind /admin/dashboard/metrics.
+
+    The first request (and the first one after the TTL runs out) loads the
+    totals with a single query; after that the admin write routes keep them
+    current with O(1) updates, so the average GPA is just sum / count.
+    The TTL is a safety net for writes that bypass the routes.
+
+    The load runs outside the lock, so it is only stored when no write
+    overlapped it. A write route wraps its commit and delta in writing():
+
+        with metrics_cache.writing():
+            db.commit()
+            metrics_cache.student_added(student.GPA)
+
+    A load that runs while a write is open cannot tell whether its
+    snapshot already has that row, which would be counted twice once the
+    delta is applied. Such a load, or one that a write or invalidation
+    started during (generation counter), is answered but not stored.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._state = None
+        self._expires = 0.0
+        self._generation = 0
+        self._writers = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def writing(self):
+        with self._lock:
+            self._generation += 1
+            self._writers += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._generation += 1
+                self._writers -= 1
+
+    def get(self, loader) -> dict:
+        """
+        `loader()` must return a dict with total_students, total_assignments,
+        gpa_sum and gpa_count.
+        """
+        with self._lock:
+            if self._state is not None and time.monotonic() < self._expires:
+                self.hits += 1
+                return self._metrics()
+            self.misses += 1
+            generation = self._generation
+            writers = self._writers
+        state = dict(loader())
+        with self._lock:
+            if writers or self._generation != generation:
+                return self._metrics(state)
+            self._state = state
+            self._expires = time.monotonic() + self.ttl_seconds
+            return self._metrics()
+
+    def _metrics(self, state: dict = None) -> dict:
+        s = state if state is not None else self._state
+        avg_gpa = round(s["gpa_sum"] / s["gpa_count"], 2) if s["gpa_count"] else 0.0
+        return {
+            "total_students": s["total_students"],
+            "total_assignments": s["total_assignments"],
+            "average_gpa": avg_gpa,
+        }
+
+    def _apply(self, **deltas) -> None:
+        with self._lock:
+            self._generation += 1
+            if self._state is None:
+                return  # nothing cached yet, the next read loads fresh totals
+            for key, delta in deltas.items():
+                self._state[key] += delta
+
+    def student_added(self, gpa) -> None:
+        if gpa is None:
+            self._apply(total_students=1)
+        else:
+            self._apply(total_students=1, gpa_sum=gpa, gpa_count=1)
+
+    def student_gpa_changed(self, old, new) -> None:
+        if old == new:
+            return
+        self._apply(
+            gpa_sum=(new or 0.0) - (old or 0.0),
+            gpa_count=(new is not None) - (old is not None),
+        )
+
+    def assignment_added(self) -> None:
+        self._apply(total_assignments=1)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._state = None
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "cached": self._state is not None,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+metrics_cache = DashboardMetricsCache(ttl_seconds=env("METRICS_CACHE_TTL", 300.0))
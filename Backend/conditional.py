@@ -0,0 +1,150 @@
+"""Conditional GET (ETag / If-None-Match) for rarely changing read routes.
+
+A route opts in with a dependency naming the tables its response is built
+from and its Cache-Control policy:
+
+    @router.get("/users", dependencies=[conditional("Users", cache_control=PRIVATE_REVALIDATE)])
+
+The async routes (Backend/routes/async_routes.py) use conditional_async()
+instead, so the lookup shares their AsyncSession and never takes a
+thread-pool worker or a sync pooled connection.
+
+The dependency runs before the route body. It builds the ETag from the
+tables' rows in TableVersions, one primary-key lookup. When the request's
+If-None-Match already holds that tag it answers 304 Not Modified right
+away: no route query, no serialization. Otherwise the route runs and
+CacheHeadersMiddleware adds ETag and Cache-Control to its 200 response,
+whatever Response class it returns.
+
+The counters live in the database, bumped by triggers on each table
+(install(), migration 7) in the same transaction as the write. So every
+worker process sees every write the moment it commits, and writes from
+scripts or the sqlite shell change the tag too.
+"""
+from typing import List
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from Backend.db import get_async_db, get_db
+from Backend.models import TableVersion
+
+# browser and proxies must ask every time; a matching tag makes that a 304
+PRIVATE_REVALIDATE = "private, no-cache"
+# positions change a few times per term: a minute of staleness is fine
+PRIVATE_SHORT = "private, max-age=60, must-revalidate"
+
+STATE_KEY = "cache_headers"
+
+# tables with a counter bumped by triggers: what a conditional() route may
+# depend on, and what geofence.site_index is built from
+VERSIONED_TABLES = ("Users", "Students", "Positions", "StudentAssignments")
+
+
+def ddl() -> List[str]:
+    statements = []
+    for table in VERSIONED_TABLES:
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            name = f'"TableVersions_{table}_{event.lower()}"'
+            statements += [
+                f"DROP TRIGGER IF EXISTS {name}",
+                f'CREATE TRIGGER {name} AFTER {event} ON "{table}" BEGIN '
+                f"UPDATE TableVersions SET Version = Version + 1 WHERE TableName = '{table}'; END",
+            ]
+    return statements
+
+
+def install(conn) -> None:
+    """The counter rows (kept when they exist) and the triggers."""
+    conn.execute(
+        sqlite_insert(TableVersion)
+        .values([{"TableName": t, "Version": 0} for t in VERSIONED_TABLES])
+        .on_conflict_do_nothing()
+    )
+    for statement in ddl():
+        conn.exec_driver_sql(statement)
+
+
+def table_versions(bind, tables) -> dict:
+    """TableName -> Version, one primary-key lookup per table."""
+    return dict(
+        bind.execute(select(TableVersion.TableName, TableVersion.Version).where(TableVersion.TableName.in_(tables))).all()
+    )
+
+
+def etag(bind, tables) -> str:
+    versions = table_versions(bind, tables)
+    return 'W/"' + ".".join(f"{t}{versions.get(t, 0)}" for t in tables) + '"'
+
+
+def _matches(if_none_match: str, tag: str) -> bool:
+    """Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored."""
+    if if_none_match.strip() == "*":
+        return True
+    bare = tag[2:] if tag.startswith("W/") else tag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def _check_tables(tables) -> None:
+    unknown = set(tables) - set(VERSIONED_TABLES)
+    if unknown:
+        # no triggers, so the tag would never change
+        raise ValueError(f"No version counter for {sorted(unknown)}; add them to VERSIONED_TABLES")
+
+
+def _answer(request: Request, tag: str, cache_control: str) -> None:
+    headers = {"ETag": tag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, tag):
+        raise HTTPException(status_code=304, headers=headers)
+    setattr(request.state, STATE_KEY, headers)
+
+
+def conditional(*tables: str, cache_control: str = PRIVATE_REVALIDATE):
+    _check_tables(tables)
+
+    # a sync route gets the same session from its own Depends(get_db)
+    def check(request: Request, db: Session = Depends(get_db)) -> None:
+        _answer(request, etag(db, tables), cache_control)
+
+    return Depends(check)
+
+
+def conditional_async(*tables: str, cache_control: str = PRIVATE_REVALIDATE):
+    """conditional() for the async routes: the lookup runs on their AsyncSession."""
+    _check_tables(tables)
+
+    async def check(request: Request, db: AsyncSession = Depends(get_async_db)) -> None:
+        _answer(request, await db.run_sync(etag, tables), cache_control)
+
+    return Depends(check)
+
+
+class CacheHeadersMiddleware:
+    """Adds the headers chosen by conditional() to the route's 200 response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = scope.get("state", {}).get(STATE_KEY)
+                if headers:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()
+                    ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,16 +1,87 @@
 import os
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from Backend.settings import env
 
 
 BASE_DIR = Path(__file__).resolve().parent
-DB_PATH = BASE_DIR / "student_tracker.db"   
+DB_PATH = Path(os.getenv("STUDENT_TRACKER_DB_PATH", BASE_DIR / "student_tracker.db"))
 
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH.as_posix()}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+
+# ---------------------------------------------------------
+# ENGINE PROFILE
+# ---------------------------------------------------------
+# Every setting can be overridden with an environment variable, e.g.
+#   STUDENT_TRACKER_SQLITE_JOURNAL_MODE=DELETE
+#   STUDENT_TRACKER_POOL_SIZE=20
+# WAL lets the check-in writers and the teacher map readers work at the
+# same time instead of queueing behind one file lock.
+SQLITE_PRAGMAS = {
+    "journal_mode": env("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": env("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": env("SQLITE_BUSY_TIMEOUT_MS", 5000),
+    "mmap_size": env("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+    "cache_size": env("SQLITE_CACHE_SIZE", -64 * 1024),  # negative = KiB, so 64 MiB
+    "temp_store": env("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+POOL_SIZE = env("POOL_SIZE", 10)
+POOL_MAX_OVERFLOW = env("POOL_MAX_OVERFLOW", 20)
+POOL_TIMEOUT = env("POOL_TIMEOUT", 30)
+POOL_RECYCLE = env("POOL_RECYCLE", 3600)
+
+# Serve the hot routes (check-in, map, listings) from async handlers on an
+# aiosqlite engine instead of the thread pool; needs aiosqlite and greenlet.
+DB_ASYNC = env("DB_ASYNC", False)
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    """
+    Runs once for every new DBAPI connection the pool opens.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+# Cold Attendance/StudentLocations rows moved out by Backend/archive.py live
+# in this file, attached to every connection as "archive". Empty: no archive.
+ARCHIVE_PATH = env("ARCHIVE_PATH", "")
+
+
+def attach_archive(dbapi_connection, connection_record=None):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_PATH,))
+    finally:
+        cursor.close()
+
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={
+        "check_same_thread": False,
+        # seconds the sqlite3 driver waits on a locked database
+        "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000,
+    },
+    poolclass=QueuePool,
+    pool_size=POOL_SIZE,
+    max_overflow=POOL_MAX_OVERFLOW,
+    pool_timeout=POOL_TIMEOUT,
+    pool_recycle=POOL_RECYCLE,
+)
+event.listen(engine, "connect", apply_sqlite_pragmas)
+if ARCHIVE_PATH:
+    event.listen(engine, "connect", attach_archive)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -21,3 +92,34 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ---------------------------------------------------------
+# ASYNC ENGINE (STUDENT_TRACKER_DB_ASYNC=true)
+# ---------------------------------------------------------
+# Same file, pragmas and pool limits as the sync engine. Only created when
+# enabled, so aiosqlite stays optional.
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{DB_PATH.as_posix()}",
+        connect_args={"timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000},
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+    )
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+    if ARCHIVE_PATH:
+        event.listen(async_engine.sync_engine, "connect", attach_archive)
+    # objects stay readable after commit, there is no lazy refresh on await
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
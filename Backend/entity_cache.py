@@ -0,0 +1,191 @@
+"""Read-through cache of Student, User and Positions rows keyed by id.
+
+Most write routes start by loading the Student (or User, or Position)
+they refer to, and the profile routes are the same primary-key query.
+EntityCache.get(db, id) answers those from memory and only queries on a
+miss. Cached values are plain JSON-safe dicts of the row's columns
+(datetimes as ISO strings), never ORM objects, so they can be shared
+between sessions, threads and processes. Missing rows are not cached.
+
+The update/delete routes call invalidate(id) after they commit; the bulk
+import clears the whole cache. Writes that bypass the API, or reach
+another worker's memory cache, are picked up when the entry's TTL runs
+out. A load that an invalidate() overtakes is returned but not stored.
+
+Routes behind conditional() use load() instead of get(): their ETag comes
+from the shared TableVersions counters, so the body must come from the
+database too, or a worker could send its stale entry under a new tag and
+the client would revalidate that body into 304s.
+
+Backends (STUDENT_TRACKER_ENTITY_CACHE_BACKEND):
+
+  memory   per process: LRU bounded to ENTITY_CACHE_MAX_ENTRIES per
+           entity, entries expire after ENTITY_CACHE_TTL seconds
+  redis    shared by every worker process (needs the redis package);
+           an invalidation in one worker is seen by all of them. Entries
+           expire after the TTL; the size bound is Redis' own maxmemory
+           policy
+
+Hit/miss counters are on GET /admin/cache/stats.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import inspect, select
+from Backend.models import Positions, Student, User
+from Backend.settings import env
+
+ENTITY_CACHE_BACKEND = env("ENTITY_CACHE_BACKEND", "memory")  # memory | redis
+ENTITY_CACHE_MAX_ENTRIES = env("ENTITY_CACHE_MAX_ENTRIES", 10000)
+ENTITY_CACHE_TTL = env("ENTITY_CACHE_TTL", 300.0)
+ENTITY_CACHE_REDIS_URL = env("ENTITY_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            if hit[1] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return hit[0]
+
+    def set(self, key: str, value: dict, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self, prefix: str) -> None:
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def size(self, prefix: str) -> int:
+        with self._lock:
+            return sum(1 for k in self._data if k.startswith(prefix))
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        import redis
+
+        self.evictions = None  # Redis evicts on its own, see INFO stats
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[dict]:
+        raw = self._client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: dict, ttl: float) -> None:
+        self._client.set(key, json.dumps(value), px=int(ttl * 1000))
+
+    def delete(self, key: str) -> None:
+        self._client.delete(key)
+
+    def clear(self, prefix: str) -> None:
+        keys = list(self._client.scan_iter(match=f"{prefix}*", count=1000))
+        if keys:
+            self._client.delete(*keys)
+
+    def size(self, prefix: str) -> int:
+        return sum(1 for _ in self._client.scan_iter(match=f"{prefix}*", count=1000))
+
+
+class EntityCache:
+    def __init__(self, model, backend, ttl_seconds: float):
+        self.model = model
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.prefix = f"entity:{model.__tablename__}:"
+        self._columns = list(model.__table__.columns)
+        self._pk = inspect(model).primary_key[0]
+        self.hits = 0
+        self.misses = 0
+        # bumped by invalidate(); a load that saw it move must not be stored
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db, pk) -> Optional[dict]:
+        """The row with primary key `pk` as a dict, or None if there is none."""
+        value = self.backend.get(f"{self.prefix}{pk}")
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        return self.load(db, pk)
+
+    def load(self, db, pk) -> Optional[dict]:
+        """Like get(), but always read from the database; refreshes the entry."""
+        generation = self._generation
+        row = db.execute(select(*self._columns).where(self._pk == pk)).mappings().first()
+        if row is None:
+            return None
+        value = jsonable_encoder(dict(row))
+        with self._lock:
+            if generation == self._generation:
+                self.backend.set(f"{self.prefix}{pk}", value, self.ttl_seconds)
+        return value
+
+    def invalidate(self, pk=None) -> None:
+        """Drop one row, or every row of this entity when `pk` is None."""
+        with self._lock:
+            self._generation += 1
+        if pk is None:
+            self.backend.clear(self.prefix)
+        else:
+            self.backend.delete(f"{self.prefix}{pk}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "entries": self.backend.size(self.prefix),
+        }
+
+
+if ENTITY_CACHE_BACKEND not in ("memory", "redis"):
+    raise ValueError("STUDENT_TRACKER_ENTITY_CACHE_BACKEND must be 'memory' or 'redis'")
+
+_redis = RedisBackend(ENTITY_CACHE_REDIS_URL) if ENTITY_CACHE_BACKEND == "redis" else None
+
+
+def _cache(model) -> EntityCache:
+    # in memory: one LRU per entity, so a burst of student lookups cannot evict users
+    return EntityCache(model, _redis or MemoryBackend(ENTITY_CACHE_MAX_ENTRIES), ENTITY_CACHE_TTL)
+
+
+student_cache = _cache(Student)
+user_cache = _cache(User)
+position_cache = _cache(Positions)
+
+
+def cache_stats() -> dict:
+    return {
+        "backend": ENTITY_CACHE_BACKEND,
+        "ttl_seconds": ENTITY_CACHE_TTL,
+        "max_entries": ENTITY_CACHE_MAX_ENTRIES if ENTITY_CACHE_BACKEND == "memory" else None,
+        "Students": {**student_cache.stats(), "evictions": student_cache.backend.evictions},
+        "Users": {**user_cache.stats(), "evictions": user_cache.backend.evictions},
+        "Positions": {**position_cache.stats(), "evictions": position_cache.backend.evictions},
+    }
@@ -0,0 +1,103 @@
+"""Streaming attendance export.
+
+Rows are pulled from SQLite in batches (`yield_per`) on a dedicated
+connection and encoded as they arrive, so memory use stays flat no matter
+how many rows match and the first bytes go out before the query finishes.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+from typing import Iterator, Optional
+from sqlalchemy import select
+from Backend.archive import read_source
+from Backend.db import engine
+from Backend.models import Attendance
+
+EXPORT_BATCH_SIZE = 2000
+
+EXPORT_COLUMNS = [
+    Attendance.AttendanceId,
+    Attendance.StudentId,
+    Attendance.CheckInUtc,
+    Attendance.CheckOutUtc,
+    Attendance.IsApproved,
+    Attendance.Status,
+    Attendance.Lat,
+    Attendance.Lng,
+]
+EXPORT_FIELDS = [c.key for c in EXPORT_COLUMNS]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def export_query(
+    date_from: Optional[date],
+    date_to: Optional[date],
+    student_id: Optional[int] = None,
+    source=Attendance.__table__,
+):
+    """`source`: the Attendance table, or its union with the archive (archive.read_source)."""
+    stmt = select(*[source.c[c.key] for c in EXPORT_COLUMNS])
+    if date_from is not None:
+        stmt = stmt.where(source.c.CheckInUtc >= datetime.combine(date_from, time.min))
+    if date_to is not None:
+        stmt = stmt.where(source.c.CheckInUtc < datetime.combine(date_to + timedelta(days=1), time.min))
+    if student_id is not None:
+        stmt = stmt.where(source.c.StudentId == student_id)
+        return stmt.order_by(source.c.StudentId, source.c.CheckInUtc)
+    return stmt.order_by(source.c.CheckInUtc)
+
+
+def iter_rows(date_from, date_to, student_id, bind=None) -> Iterator[tuple]:
+    with (bind or engine).connect() as conn:
+        since = datetime.combine(date_from, time.min) if date_from is not None else None
+        stmt = export_query(date_from, date_to, student_id, read_source(conn, Attendance, since))
+        result = conn.execution_options(yield_per=EXPORT_BATCH_SIZE).execute(stmt)
+        for row in result:
+            yield row
+
+
+def _value(v):
+    if isinstance(v, datetime):
+        return v.isoformat()
+    return v
+
+
+def encode_csv(rows: Iterator[tuple]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    count = 0
+    for row in rows:
+        writer.writerow([_value(v) for v in row])
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def encode_ndjson(rows: Iterator[tuple]) -> Iterator[str]:
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(dict(zip(EXPORT_FIELDS, map(_value, row)))))
+        if len(chunk) == EXPORT_BATCH_SIZE:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+ENCODERS = {
+    "csv": encode_csv,
+    "ndjson": encode_ndjson,
+}
+
+
+def stream_attendance(fmt: str, date_from=None, date_to=None, student_id=None, bind=None) -> Iterator[str]:
+    return ENCODERS[fmt](iter_rows(date_from, date_to, student_id, bind))
@@ -0,0 +1,48 @@
+"""Opt-in fast JSON path for large list responses (STUDENT_TRACKER_FAST_JSON).
+
+The default path for a route that returns a list of dicts is: hydrate ORM
+objects, build the dicts, run them through jsonable_encoder and the
+response_model, then json.dumps. For 10k rows that is mostly CPU spent
+re-walking data that is already JSON-shaped.
+
+With FAST_JSON on:
+
+  ORJSONResponse   is the app's default response class, so every route is
+                   rendered by orjson (datetimes come out in the same ISO
+                   format as before)
+  rows_response()  builds the body straight from a Core result (plain
+                   tuples, no ORM objects) and returns a ready Response,
+                   which FastAPI sends without encoding or validating it
+                   again
+
+Needs the orjson package; without FAST_JSON it is never imported.
+"""
+from typing import Optional
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from Backend.settings import env
+
+FAST_JSON = env("FAST_JSON", False)
+
+if FAST_JSON:
+    import orjson
+
+
+def _fallback(value):
+    # anything orjson has no native encoding for (Decimal, pydantic models, ...)
+    return jsonable_encoder(value)
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_fallback, option=orjson.OPT_NON_STR_KEYS)
+
+
+def rows_response(result, envelope: Optional[str] = None, status_code: int = 200) -> ORJSONResponse:
+    """
+    One JSON object per row of a Core `result`, keyed by its column labels.
+    With `envelope` the list is wrapped as {envelope: [...]}.
+    """
+    keys = list(result.keys())
+    body = [dict(zip(keys, row)) for row in result]
+    return ORJSONResponse({envelope: body} if envelope else body, status_code=status_code)
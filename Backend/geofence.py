@@ -0,0 +1,280 @@
+"""Location verification of check-ins against the assigned Positions site.
+
+Every Position can carry SiteLat/SiteLng/SiteRadiusM. The sites and the
+active StudentAssignments are held in memory (`site_index`), so classifying
+a check-in is a dictionary lookup plus a haversine or two:
+
+  ON_SITE   distance <= radius
+  NEAR      distance <= radius + GEOFENCE_NEAR_MARGIN_M
+  OFF_SITE  farther away
+  UNKNOWN   no coordinates, or no located site to compare with
+
+A student with assignments is compared to their assigned sites only.
+Otherwise the nearest site found through a uniform lat/lng grid is used,
+so a check-in at any partner site is still recognised.
+
+The index is rebuilt (a few thousand rows at most) whenever positions or
+assignments change: the write routes rebuild it right away, and before
+classifying, ensure_current() compares the TableVersions counters of
+Positions and StudentAssignments (Backend/conditional.py) with the ones
+it was built from, so a write handled by another worker process, or a
+script, is picked up on the next check-in. `reverify` re-classifies
+historical rows in bulk with NumPy.
+"""
+import math
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import bindparam, select, update
+from Backend.conditional import table_versions
+from Backend.migrations.runner import immediate
+from Backend.models import Attendance, Positions, StudentAssignment
+from Backend.settings import env
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEG_LAT = 111320.0
+
+DEFAULT_RADIUS_M = env("GEOFENCE_DEFAULT_RADIUS_M", 150.0)
+NEAR_MARGIN_M = env("GEOFENCE_NEAR_MARGIN_M", 250.0)
+GRID_CELL_DEG = env("GEOFENCE_GRID_CELL_DEG", 0.01)  # ~1.1 km north-south
+
+ON_SITE = "ON_SITE"
+NEAR = "NEAR"
+OFF_SITE = "OFF_SITE"
+UNKNOWN = "UNKNOWN"
+
+# what the index is built from, see ensure_current()
+SITE_TABLES = ("Positions", "StudentAssignments")
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def haversine_np(lat1, lng1, lat2, lng2) -> np.ndarray:
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    dp, dl = p2 - p1, np.radians(np.asarray(lng2) - np.asarray(lng1))
+    a = np.sin(dp / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def status_for(distance: float, radius: float) -> str:
+    if distance <= radius:
+        return ON_SITE
+    if distance <= radius + NEAR_MARGIN_M:
+        return NEAR
+    return OFF_SITE
+
+
+class SiteIndex:
+    def __init__(self, cell_deg: float = GRID_CELL_DEG):
+        self.cell_deg = cell_deg
+        self._sites: Dict[int, Tuple[float, float, float]] = {}
+        self._cells: Dict[Tuple[int, int], list] = {}
+        self._assigned: Dict[int, Set[int]] = {}
+        self._versions: Optional[dict] = None  # SITE_TABLES versions of the last load()
+        self._lock = threading.Lock()
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lng / self.cell_deg))
+
+    def build(self, sites: Dict[int, Tuple[float, float, float]], assigned: Dict[int, Set[int]]) -> None:
+        """
+        sites: PositionId -> (lat, lng, radius_m); assigned: StudentId -> {PositionId}.
+        Each site is registered in every grid cell its NEAR circle touches.
+        """
+        cells = defaultdict(list)
+        for pid, (lat, lng, radius) in sites.items():
+            reach = radius + NEAR_MARGIN_M
+            dlat = reach / METERS_PER_DEG_LAT
+            dlng = reach / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+            i0, j0 = self._cell(lat - dlat, lng - dlng)
+            i1, j1 = self._cell(lat + dlat, lng + dlng)
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    cells[(i, j)].append(pid)
+        with self._lock:
+            self._sites, self._cells, self._assigned = dict(sites), dict(cells), dict(assigned)
+
+    def load(self, db) -> None:
+        # read first: a write landing during the load makes the next check reload
+        versions = table_versions(db, SITE_TABLES)
+        sites = {
+            pid: (lat, lng, radius or DEFAULT_RADIUS_M)
+            for pid, lat, lng, radius in db.execute(
+                select(Positions.PositionId, Positions.SiteLat, Positions.SiteLng, Positions.SiteRadiusM)
+                .where(Positions.SiteLat.isnot(None), Positions.SiteLng.isnot(None))
+            )
+        }
+        assigned = defaultdict(set)
+        for sid, pid in db.execute(
+            select(StudentAssignment.StudentId, StudentAssignment.PositionId)
+            .where(StudentAssignment.PositionId.isnot(None), StudentAssignment.IsActive.isnot(False))
+        ):
+            assigned[sid].add(pid)
+        self.build(sites, assigned)
+        self._versions = versions
+
+    def ensure_current(self, db) -> None:
+        """Reload when Positions or StudentAssignments changed since the last load, in any process."""
+        if table_versions(db, SITE_TABLES) != self._versions:
+            self.load(db)
+
+    def sites_for(self, student_id: int) -> Dict[int, Tuple[float, float, float]]:
+        with self._lock:
+            sites = self._sites
+            return {pid: sites[pid] for pid in self._assigned.get(student_id, ()) if pid in sites}
+
+    def classify(self, student_id: int, lat: Optional[float], lng: Optional[float]) -> Tuple[str, Optional[float], Optional[int]]:
+        """
+        Returns (status, distance_m, PositionId) for one check-in.
+        """
+        if lat is None or lng is None:
+            return UNKNOWN, None, None
+        with self._lock:
+            sites, cells, assigned = self._sites, self._cells, self._assigned
+
+        if student_id in assigned:
+            candidates = [pid for pid in assigned[student_id] if pid in sites]
+        else:
+            candidates = cells.get(self._cell(lat, lng), ())
+        if not candidates:
+            return UNKNOWN, None, None
+
+        # pick the site the student is "most inside" of
+        best = None
+        for pid in candidates:
+            s_lat, s_lng, radius = sites[pid]
+            d = haversine_m(lat, lng, s_lat, s_lng)
+            if best is None or d - radius < best[0]:
+                best = (d - radius, d, radius, pid)
+        _, distance, radius, pid = best
+        return status_for(distance, radius), round(distance, 1), pid
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._sites), {k: set(v) for k, v in self._assigned.items()}
+
+
+site_index = SiteIndex()
+
+
+def refresh_site_index(db) -> None:
+    site_index.load(db)
+
+
+def reverify(
+    engine,
+    chunk_size: int = 5000,
+    only_missing: bool = False,
+    index: SiteIndex = None,
+    after: int = 0,
+    on_chunk: Optional[Callable[[int], None]] = None,
+) -> dict:
+    """
+    Re-classify historical located Attendance rows with an AttendanceId
+    above `after`, in chunks, using vectorized haversine over (row,
+    assigned site) pairs. Every chunk is read and rewritten in its own
+    write transaction, so a live check-in waits for one chunk at most;
+    on_chunk(last id) runs after each commit, for a resume checkpoint.
+    Returns counts per status.
+    """
+    index = index or site_index
+    sites, assigned = index.snapshot()
+    counts = defaultdict(int)
+
+    # flat (StudentId -> site) pair table for the join below
+    pair_sid, pair_pid, pair_lat, pair_lng, pair_rad = [], [], [], [], []
+    for sid, pids in assigned.items():
+        for pid in pids:
+            if pid in sites:
+                lat, lng, radius = sites[pid]
+                pair_sid.append(sid)
+                pair_pid.append(pid)
+                pair_lat.append(lat)
+                pair_lng.append(lng)
+                pair_rad.append(radius)
+    order = np.argsort(np.array(pair_sid, dtype=np.int64), kind="stable")
+    pair_sid = np.array(pair_sid, dtype=np.int64)[order]
+    pair_pid = np.array(pair_pid, dtype=np.int64)[order]
+    pair_lat = np.array(pair_lat, dtype=float)[order]
+    pair_lng = np.array(pair_lng, dtype=float)[order]
+    pair_rad = np.array(pair_rad, dtype=float)[order]
+
+    stmt = (
+        update(Attendance)
+        .where(Attendance.AttendanceId == bindparam("b_id"))
+        .values(GeoStatus=bindparam("b_status"), GeoDistanceM=bindparam("b_dist"), GeoPositionId=bindparam("b_pid"))
+    )
+
+    last_id = after
+    while True:
+        q = (
+            select(Attendance.AttendanceId, Attendance.StudentId, Attendance.Lat, Attendance.Lng)
+            .where(Attendance.AttendanceId > last_id, Attendance.Lat.isnot(None), Attendance.Lng.isnot(None))
+            .order_by(Attendance.AttendanceId)
+            .limit(chunk_size)
+        )
+        if only_missing:
+            q = q.where(Attendance.GeoStatus.is_(None))
+        with immediate(engine) as conn:
+            rows = conn.execute(q).all()
+            if not rows:
+                break
+            data = np.array([tuple(r) for r in rows], dtype=float)
+            att_id = data[:, 0].astype(np.int64)
+            att_sid = data[:, 1].astype(np.int64)
+            last_id = int(att_id[-1])
+
+            # expand every row into one pair per assigned site
+            lo = np.searchsorted(pair_sid, att_sid, side="left")
+            hi = np.searchsorted(pair_sid, att_sid, side="right")
+            n_pairs = hi - lo
+            row_idx = np.repeat(np.arange(len(att_id)), n_pairs)
+            pair_idx = np.repeat(lo, n_pairs) + (np.arange(n_pairs.sum()) - np.repeat(np.cumsum(n_pairs) - n_pairs, n_pairs))
+
+            status = np.full(len(att_id), UNKNOWN, dtype=object)
+            distance = np.full(len(att_id), np.nan)
+            position = np.full(len(att_id), -1, dtype=np.int64)
+
+            if len(row_idx):
+                d = haversine_np(data[row_idx, 2], data[row_idx, 3], pair_lat[pair_idx], pair_lng[pair_idx])
+                slack = d - pair_rad[pair_idx]
+                # best site per row: sort by (row, slack) and keep the first of each row
+                order = np.lexsort((slack, row_idx))
+                first = order[np.concatenate(([True], row_idx[order][1:] != row_idx[order][:-1]))]
+                rows_hit = row_idx[first]
+                radius = pair_rad[pair_idx[first]]
+                distance[rows_hit] = np.round(d[first], 1)
+                position[rows_hit] = pair_pid[pair_idx[first]]
+                status[rows_hit] = np.select(
+                    [d[first] <= radius, d[first] <= radius + NEAR_MARGIN_M],
+                    [ON_SITE, NEAR],
+                    OFF_SITE,
+                )
+
+            # students without assignments go through the grid, like live check-ins
+            for i in np.flatnonzero(n_pairs == 0).tolist():
+                s_, dist_, pid_ = index.classify(int(att_sid[i]), data[i, 2], data[i, 3])
+                status[i] = s_
+                distance[i] = np.nan if dist_ is None else dist_
+                position[i] = -1 if pid_ is None else pid_
+
+            conn.execute(stmt, [
+                {
+                    "b_id": int(i),
+                    "b_status": s,
+                    "b_dist": None if math.isnan(dist) else float(dist),
+                    "b_pid": None if p < 0 else int(p),
+                }
+                for i, s, dist, p in zip(att_id, status, distance, position)
+            ])
+        for s in status:
+            counts[s] += 1
+        if on_chunk is not None:
+            on_chunk(last_id)
+    return dict(counts)
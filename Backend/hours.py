@@ -0,0 +1,238 @@
+"""Hours-worked engine.
+
+Sessions come from Attendance (CheckInUtc -> CheckOutUtc). All the interval
+math runs on NumPy arrays, one pass for the whole cohort:
+
+  1. open punches (no CheckOutUtc) end at `now`, capped at OPEN_SESSION_CAP;
+     attendance-sheet rows (SheetDay set) and ABSENT rows are not punches
+     and count for nothing;
+  2. sessions are clipped to the requested [from, to] range;
+  3. overlapping sessions of the same student are merged, so double
+     check-ins are not counted twice;
+  4. the merged time is split on week (and optionally day) boundaries and
+     summed per student per bucket.
+
+Times are handled as float seconds since the Unix epoch, computed in SQLite
+with julianday(), so no datetime objects are built per row.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional
+import numpy as np
+from sqlalchemy import and_, func, or_, select
+from Backend.archive import COLD, read_source, watermark
+from Backend.models import Attendance
+
+DAY = 86400.0
+WEEK = 7 * DAY
+OPEN_SESSION_CAP = 12 * 3600.0  # a forgotten check-out never counts for more than this
+UNIX_EPOCH_JD = 2440587.5
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch_seconds(column):
+    return (func.julianday(column) - UNIX_EPOCH_JD) * DAY
+
+
+def _to_epoch(dt: datetime) -> float:
+    return (dt - EPOCH).total_seconds()
+
+
+def _from_epoch(seconds: float) -> datetime:
+    return EPOCH + timedelta(seconds=float(seconds))
+
+
+def merged_intervals(student_ids: np.ndarray, starts: np.ndarray, ends: np.ndarray):
+    """
+    Merge overlapping intervals per student.
+    Returns (student_ids, starts, ends) of disjoint pieces whose total
+    length per student equals the length of the union of that student's
+    intervals. Inputs must already be clipped (ends > starts).
+    """
+    if len(starts) == 0:
+        return student_ids, starts, ends
+
+    order = np.lexsort((starts, student_ids))
+    sid, s, e = student_ids[order], starts[order], ends[order]
+
+    # Running max of the end time, restarted for every student: shift each
+    # student's ends by group_index * span so one cumulative max does it.
+    origin = s.min()
+    span = e.max() - origin + 1.0
+    group = np.concatenate(([0], np.cumsum(sid[1:] != sid[:-1])))
+    offset = group * span
+    running_end = np.maximum.accumulate(e - origin + offset)
+    previous_end = np.concatenate(([-np.inf], running_end[:-1])) - offset + origin
+
+    piece_start = np.maximum(s, previous_end)
+    keep = e > piece_start
+    return sid[keep], piece_start[keep], e[keep]
+
+
+def bucket_totals(student_ids, starts, ends, origin: float, width: float):
+    """
+    Split disjoint pieces on bucket boundaries (origin + k * width) and sum
+    the seconds per (student, bucket).
+    Returns (student_ids, bucket_index, seconds).
+    """
+    if len(starts) == 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=float)
+
+    first = np.floor((starts - origin) / width).astype(np.int64)
+    last = np.floor((np.nextafter(ends, -np.inf) - origin) / width).astype(np.int64)
+    parts = last - first + 1
+
+    # one row per (piece, bucket it touches); almost always one per piece
+    idx = np.repeat(np.arange(len(starts)), parts)
+    step = np.arange(parts.sum()) - np.repeat(np.cumsum(parts) - parts, parts)
+    bucket = first[idx] + step
+    seg_start = np.maximum(starts[idx], origin + bucket * width)
+    seg_end = np.minimum(ends[idx], origin + (bucket + 1) * width)
+
+    # fold (student, bucket) into one int64 key so a 1-D unique can group it
+    sid = student_ids[idx]
+    b_min = bucket.min()
+    width_b = bucket.max() - b_min + 1
+    keys, inverse = np.unique(sid * width_b + (bucket - b_min), return_inverse=True)
+    seconds = np.bincount(inverse, weights=seg_end - seg_start, minlength=len(keys))
+    return keys // width_b, keys % width_b + b_min, seconds
+
+
+def _earliest_overlap(db, start: datetime) -> datetime:
+    """
+    Check-in time of the earliest session still running at `start`: open
+    ones count for OPEN_SESSION_CAP, closed ones however long they lasted.
+    One range on the (CheckOutUtc, CheckInUtc) index per side of the archive.
+    """
+    since = start - timedelta(seconds=OPEN_SESSION_CAP)
+    tables = [Attendance.__table__]
+    if watermark(db) is not None:
+        tables.append(COLD[Attendance])
+    for table in tables:
+        # min over an expression, not the bare column: min(CheckInUtc) would
+        # walk the CheckInUtc index from the oldest row instead
+        first = db.execute(
+            select(func.min(_epoch_seconds(table.c.CheckInUtc))).where(
+                table.c.CheckOutUtc > start, table.c.CheckInUtc < since
+            )
+        ).scalar()
+        if first is not None:
+            # julianday() keeps milliseconds; a second early is safe, the
+            # overlap test in fetch_sessions drops anything extra
+            since = min(since, _from_epoch(first - 1.0))
+    return since
+
+
+def fetch_sessions(db, student_ids: Optional[Iterable[int]], start: datetime, end: datetime):
+    """
+    Sessions that overlap [start, end), as three NumPy arrays: checked in
+    before `end` and either checked out after `start` or still open and
+    checked in less than OPEN_SESSION_CAP before it. Open sessions come
+    back with end = NaN. Sheet and ABSENT rows never make an open session.
+    """
+    open_since = start - timedelta(seconds=OPEN_SESSION_CAP)
+    # bounded look-back keeps this an index range scan on CheckInUtc
+    since = _earliest_overlap(db, start)
+    src = read_source(db, Attendance, since)
+    stmt = select(
+        src.c.StudentId,
+        _epoch_seconds(src.c.CheckInUtc),
+        _epoch_seconds(src.c.CheckOutUtc),
+    ).where(
+        src.c.CheckInUtc >= since,
+        src.c.CheckInUtc < end,
+        or_(
+            src.c.CheckOutUtc > start,
+            and_(
+                src.c.CheckOutUtc.is_(None),
+                src.c.CheckInUtc > open_since,
+                src.c.SheetDay.is_(None),
+                src.c.Status != "ABSENT",
+            ),
+        ),
+    )
+    if student_ids:
+        stmt = stmt.where(src.c.StudentId.in_(list(student_ids)))
+    # a fixed order keeps the float sums, and so the rounding, the same
+    # whether or not part of the range comes from the archive
+    stmt = stmt.order_by(src.c.CheckInUtc)
+
+    rows = db.execute(stmt).all()
+    if not rows:
+        empty = np.array([], dtype=float)
+        return np.array([], dtype=np.int64), empty, empty
+    # plain tuples: NumPy is much slower reading Row objects; None -> nan
+    data = np.array([tuple(r) for r in rows], dtype=float)
+    return data[:, 0].astype(np.int64), data[:, 1], data[:, 2]
+
+
+def compute_hours(
+    student_ids: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    range_start: datetime,
+    range_end: datetime,
+    now: Optional[datetime] = None,
+    include_days: bool = False,
+) -> dict:
+    """
+    Pure array version of the engine (no database), see module docstring.
+    Returns {StudentId: {"total_hours", "open_sessions", "weeks", ["days"]}}.
+    """
+    now_s = _to_epoch(now or datetime.utcnow())
+    lo, hi = _to_epoch(range_start), _to_epoch(range_end)
+
+    is_open = np.isnan(ends)
+    ends = np.where(is_open, np.minimum(now_s, starts + OPEN_SESSION_CAP), ends)
+    s = np.clip(starts, lo, hi)
+    e = np.clip(ends, lo, hi)
+    valid = e > s
+    open_sid, open_counts = np.unique(student_ids[is_open & valid], return_counts=True)
+
+    sid, s, e = merged_intervals(student_ids[valid], s[valid], e[valid])
+
+    # weeks start on Monday 00:00 UTC
+    week_origin = _to_epoch(datetime.combine(range_start.date() - timedelta(days=range_start.weekday()), time.min))
+
+    result = {}
+    w_sid, w_bucket, w_seconds = bucket_totals(sid, s, e, week_origin, WEEK)
+    w_hours = np.round(w_seconds / 3600, 2).tolist()
+    week_starts = {b: _from_epoch(week_origin + b * WEEK).date() for b in np.unique(w_bucket).tolist()}
+    for student, bucket, hours in zip(w_sid.tolist(), w_bucket.tolist(), w_hours):
+        entry = result.setdefault(student, {"total_hours": 0.0, "open_sessions": 0, "weeks": []})
+        entry["weeks"].append({"week_start": week_starts[bucket], "hours": hours})
+
+    totals_sid, totals_idx = np.unique(w_sid, return_inverse=True)
+    totals = np.round(np.bincount(totals_idx, weights=w_seconds) / 3600, 2).tolist()
+    for student, hours in zip(totals_sid.tolist(), totals):
+        result[student]["total_hours"] = hours
+
+    if include_days:
+        d_sid, d_bucket, d_seconds = bucket_totals(sid, s, e, week_origin, DAY)
+        d_hours = np.round(d_seconds / 3600, 2).tolist()
+        days = {b: _from_epoch(week_origin + b * DAY).date() for b in np.unique(d_bucket).tolist()}
+        for student, bucket, hours in zip(d_sid.tolist(), d_bucket.tolist(), d_hours):
+            result[student].setdefault("days", []).append({"day": days[bucket], "hours": hours})
+
+    for student, count in zip(open_sid.tolist(), open_counts.tolist()):
+        if student in result:
+            result[student]["open_sessions"] = count
+    return result
+
+
+def hours_for_range(
+    db,
+    date_from: date,
+    date_to: date,
+    student_ids: Optional[Iterable[int]] = None,
+    include_days: bool = False,
+    now: Optional[datetime] = None,
+) -> dict:
+    """
+    Hours per student between date_from and date_to (both inclusive, UTC).
+    """
+    start = datetime.combine(date_from, time.min)
+    end = datetime.combine(date_to + timedelta(days=1), time.min)
+    sid, starts, ends = fetch_sessions(db, student_ids, start, end)
+    return compute_hours(sid, starts, ends, start, end, now=now, include_days=include_days)
@@ -0,0 +1,250 @@
+"""Bulk import of Students and Users from CSV or NDJSON uploads.
+
+The upload is parsed as a stream, one record at a time, and every record is
+validated with the same Pydantic model the single-row route uses
+(StudentCreate / UserCreate). Valid rows are collected into chunks of
+IMPORT_CHUNK_SIZE and written with one executemany of
+INSERT ... ON CONFLICT DO UPDATE per chunk, committed per chunk:
+
+  Students  keyed on UniversityId
+  Users     keyed on Email
+
+Students also have a unique Email. A row whose Email already belongs to a
+different UniversityId (in the database or earlier in the same file) is
+reported instead of failing the whole chunk.
+
+The result has counts and a per-row error report (row = line number in
+the file), capped at IMPORT_MAX_ERRORS entries.
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Iterator, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from Backend.models import Student, StudentCreate, User, UserCreate
+from Backend.settings import env
+
+IMPORT_CHUNK_SIZE = env("IMPORT_CHUNK_SIZE", 5000)
+IMPORT_MAX_ERRORS = env("IMPORT_MAX_ERRORS", 1000)
+
+FORMATS = ("csv", "ndjson")
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    name = (filename or "").lower()
+    ctype = (content_type or "").lower()
+    if name.endswith(".csv") or "csv" in ctype:
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in ctype or "jsonl" in ctype:
+        return "ndjson"
+    return None
+
+
+def iter_records(fileobj, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Yields (line_number, record, parse_error) from a binary file object.
+    CSV: empty cells become None so optional fields fall back to defaults.
+    """
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            for record in reader:
+                if None in record:
+                    yield reader.line_num, None, "More values than header columns."
+                    continue
+                yield reader.line_num, {k.strip(): (v if v != "" else None) for k, v in record.items()}, None
+            return
+
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, "Expected a JSON object."
+                continue
+            yield line_number, record, None
+    finally:
+        # leave the upload open; the caller owns it
+        text.detach()
+
+
+def _validation_messages(error: ValidationError) -> list:
+    return [
+        f"{'.'.join(str(p) for p in e['loc']) or 'row'}: {e['msg']}"
+        for e in error.errors()
+    ]
+
+
+class ImportReport:
+    def __init__(self, kind: str, fmt: str, dry_run: bool):
+        self.kind = kind
+        self.format = fmt
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, row: int, messages: list) -> None:
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "errors": messages})
+
+    def as_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "format": self.format,
+            "dry_run": self.dry_run,
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+# ---------------------------------------------------------
+# Students
+# ---------------------------------------------------------
+# Core statements on the Table: the ORM bulk-insert path adds per-row overhead
+def _student_upsert():
+    stmt = sqlite_insert(Student.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=[Student.UniversityId],
+        set_={
+            # Status and CreatedAtUtc are kept on existing students
+            "FirstName": stmt.excluded.FirstName,
+            "LastName": stmt.excluded.LastName,
+            "Email": stmt.excluded.Email,
+            "PhoneE164": stmt.excluded.PhoneE164,
+            "Program": stmt.excluded.Program,
+            "Year": stmt.excluded.Year,
+            "GPA": stmt.excluded.GPA,
+        },
+    )
+
+
+def _flush_students(db, chunk: list, seen_emails: dict, report: ImportReport) -> None:
+    university_ids = {r.UniversityId for _, r in chunk}
+    emails = {r.Email for _, r in chunk}
+    existing = db.execute(
+        select(Student.UniversityId, Student.Email)
+        .where(or_(Student.UniversityId.in_(university_ids), Student.Email.in_(emails)))
+    ).all()
+    # int like StudentCreate: databases created before the model have a
+    # TEXT UniversityId column and return "90010001"
+    owner = {email: int(uid) for uid, email in existing}
+    # earlier chunks count as known too (they are not in the table on a dry run)
+    known_ids = set(owner.values()) | set(seen_emails.values())
+
+    rows = {}  # UniversityId -> values; a later row in the file wins
+    now = datetime.utcnow()
+    for line, r in chunk:
+        taken_by = seen_emails.get(r.Email, owner.get(r.Email))
+        if taken_by is not None and taken_by != r.UniversityId:
+            report.error(line, [f"Email: already used by UniversityId {taken_by}"])
+            continue
+        seen_emails[r.Email] = r.UniversityId
+        rows[r.UniversityId] = {
+            "UniversityId": r.UniversityId,
+            "FirstName": r.FirstName,
+            "LastName": r.LastName,
+            "Email": r.Email,
+            "PhoneE164": r.PhoneE164,
+            "Program": r.Program,
+            "Year": r.Year,
+            "GPA": r.GPA,
+            "Status": "Active",
+            "CreatedAtUtc": now,
+        }
+    if not rows:
+        return
+    created = len(rows.keys() - known_ids)
+    if not report.dry_run:
+        db.execute(_student_upsert(), list(rows.values()))
+        db.commit()
+    report.created += created
+    report.updated += len(rows) - created
+
+
+# ---------------------------------------------------------
+# Users
+# ---------------------------------------------------------
+def _user_upsert():
+    stmt = sqlite_insert(User.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=[User.Email],
+        set_={
+            "FirstName": stmt.excluded.FirstName,
+            "LastName": stmt.excluded.LastName,
+            "Role": stmt.excluded.Role,
+            "IsActive": stmt.excluded.IsActive,
+        },
+    )
+
+
+def _flush_users(db, chunk: list, seen_emails: dict, report: ImportReport) -> None:
+    emails = {r.Email for _, r in chunk}
+    known = set(db.execute(select(User.Email).where(User.Email.in_(emails))).scalars())
+
+    rows = {}
+    now = datetime.now(timezone.utc).isoformat()
+    for _, r in chunk:
+        rows[r.Email] = {
+            "FirstName": r.FirstName,
+            "LastName": r.LastName,
+            "Email": r.Email,
+            "Role": r.Role,
+            "IsActive": r.IsActive,
+            "CreatedAtUtc": now,
+        }
+    created = len(rows.keys() - known - seen_emails.keys())
+    seen_emails.update(dict.fromkeys(rows))
+    if not report.dry_run:
+        db.execute(_user_upsert(), list(rows.values()))
+        db.commit()
+    report.created += created
+    report.updated += len(rows) - created
+
+
+IMPORTERS = {
+    "students": (StudentCreate, _flush_students),
+    "users": (UserCreate, _flush_users),
+}
+
+
+def import_records(db, kind: str, fileobj, fmt: str, dry_run: bool = False, chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    """
+    Validate and upsert every record of `fileobj`. With dry_run the rows
+    are validated (including the Email ownership check) but not written.
+    """
+    model, flush = IMPORTERS[kind]
+    report = ImportReport(kind, fmt, dry_run)
+    seen_emails = {}
+    chunk = []
+    for line, record, parse_error in iter_records(fileobj, fmt):
+        report.rows += 1
+        if parse_error is not None:
+            report.error(line, [parse_error])
+            continue
+        try:
+            chunk.append((line, model.model_validate(record)))
+        except ValidationError as e:
+            report.error(line, _validation_messages(e))
+            continue
+        if len(chunk) >= chunk_size:
+            flush(db, chunk, seen_emails, report)
+            chunk = []
+    if chunk:
+        flush(db, chunk, seen_emails, report)
+    return report.as_dict()
@@ -0,0 +1,301 @@
+"""Buffered, group-committed ingestion for /student/checkin/location.
+
+With STUDENT_TRACKER_CHECKIN_MODE=batched the route does not write to the
+database itself. It puts the check-in on a bounded in-process queue and
+answers 202 with a ticket. A background thread drains the queue and writes
+everything it collected in one transaction: one multi-row INSERT for
+Attendance and one for StudentLocations, i.e. one fsync per batch instead
+of one per student.
+
+A batch is flushed when it reaches CHECKIN_BATCH_SIZE rows or when
+CHECKIN_FLUSH_MS has passed since its first row, whichever comes first.
+
+Backpressure: when the queue holds CHECKIN_QUEUE_MAX items, new check-ins
+are either rejected straight away (CHECKIN_OVERFLOW=reject, the route
+answers 503 + Retry-After) or wait up to CHECKIN_BLOCK_TIMEOUT_MS for room
+(CHECKIN_OVERFLOW=block) before being rejected.
+"""
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import insert, select
+from Backend.db import engine
+from Backend.models import Attendance, Student, StudentLocation
+from Backend.rollups import refresh_days
+from Backend.locations import record_locations
+from Backend.traces import thin
+from Backend.geofence import site_index
+from Backend.live import live_hub
+from Backend.settings import env
+
+logger = logging.getLogger(__name__)
+
+CHECKIN_MODE = env("CHECKIN_MODE", "direct")  # direct | batched
+
+
+class IngestQueueFull(Exception):
+    pass
+
+
+@dataclass
+class PendingCheckIn:
+    ticket: str
+    StudentId: int
+    Status: str
+    Lat: Optional[float]
+    Lng: Optional[float]
+    ReceivedUtc: datetime
+
+
+class CheckInBatcher:
+    def __init__(
+        self,
+        batch_size: int = 500,
+        flush_interval: float = 0.05,
+        max_queue: int = 10000,
+        overflow: str = "reject",
+        block_timeout: float = 0.2,
+        max_tickets: int = 100000,
+        bind=None,
+    ):
+        if overflow not in ("reject", "block"):
+            raise ValueError("overflow must be 'reject' or 'block'")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.max_tickets = max_tickets
+        self.bind = bind or engine
+
+        self._queue: "queue.Queue[PendingCheckIn]" = queue.Queue(maxsize=max_queue)
+        self._tickets: "OrderedDict[str, dict]" = OrderedDict()
+        self._tickets_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.accepted = 0
+        self.rejected_full = 0
+        self.written = 0
+        self.unknown_student = 0
+        self.batches = 0
+        self.failed_batches = 0
+
+    # -------------------------------------------------------------------
+    # producer side (request threads)
+    # -------------------------------------------------------------------
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, student_id: int, status: str, lat: Optional[float], lng: Optional[float]) -> str:
+        item = PendingCheckIn(
+            ticket=f"ci-{next(self._ids)}",
+            StudentId=student_id,
+            Status=status,
+            Lat=lat,
+            Lng=lng,
+            ReceivedUtc=datetime.utcnow(),
+        )
+        # before put(): once queued, the flusher may write the final status
+        self._set_ticket(item.ticket, {"status": "queued"})
+        try:
+            if self.overflow == "block":
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            with self._tickets_lock:
+                self._tickets.pop(item.ticket, None)
+                self.rejected_full += 1
+            raise IngestQueueFull()
+
+        with self._tickets_lock:
+            self.accepted += 1
+        return item.ticket
+
+    def ticket_status(self, ticket: str) -> Optional[dict]:
+        with self._tickets_lock:
+            return self._tickets.get(ticket)
+
+    def stats(self) -> dict:
+        return {
+            "mode": CHECKIN_MODE,
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "accepted": self.accepted,
+            "rejected_queue_full": self.rejected_full,
+            "written": self.written,
+            "unknown_student": self.unknown_student,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+        }
+
+    def _set_ticket(self, ticket: str, value: dict) -> None:
+        with self._tickets_lock:
+            self._tickets[ticket] = value
+            self._tickets.move_to_end(ticket)
+            while len(self._tickets) > self.max_tickets:
+                self._tickets.popitem(last=False)
+
+    # -------------------------------------------------------------------
+    # consumer side (flusher thread)
+    # -------------------------------------------------------------------
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="checkin-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, drain: bool = True) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if drain:
+            while not self._queue.empty():
+                self.flush(self._take_batch(block=False))
+
+    def _take_batch(self, block: bool = True) -> list:
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval) if block else self._queue.get_nowait())
+        except queue.Empty:
+            return batch
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0 or not block:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._take_batch()
+            if batch:
+                self.flush(batch)
+
+    def flush(self, batch: list) -> None:
+        if not batch:
+            return
+        try:
+            with self.bind.begin() as conn:
+                ids = {item.StudentId for item in batch}
+                known = {
+                    sid: (first, last)
+                    for sid, first, last in conn.execute(
+                        select(Student.StudentId, Student.FirstName, Student.LastName).where(Student.StudentId.in_(ids))
+                    )
+                }
+                rows = [item for item in batch if item.StudentId in known]
+                attendance_ids, location_ids, geo = [], {}, []
+
+                if rows:
+                    site_index.ensure_current(conn)
+                    geo = [site_index.classify(item.StudentId, item.Lat, item.Lng) for item in rows]
+                    attendance_ids = conn.execute(
+                        insert(Attendance).returning(Attendance.AttendanceId, sort_by_parameter_order=True),
+                        [
+                            {
+                                "StudentId": item.StudentId,
+                                "Status": item.Status,
+                                "Lat": item.Lat,
+                                "Lng": item.Lng,
+                                "CheckInUtc": item.ReceivedUtc,
+                                "CreatedAtUtc": item.ReceivedUtc,
+                                "IsApproved": False,
+                                "GeoStatus": geo_status,
+                                "GeoDistanceM": geo_distance,
+                                "GeoPositionId": geo_position,
+                            }
+                            for item, (geo_status, geo_distance, geo_position) in zip(rows, geo)
+                        ],
+                    ).scalars().all()
+                    # pings that add nothing to the trace get no row (Backend/traces.py)
+                    pings = thin(conn, [
+                        {"ticket": item.ticket, "StudentId": item.StudentId, "Lat": item.Lat, "Lng": item.Lng, "CheckInUtc": item.ReceivedUtc}
+                        for item in rows
+                    ])
+                    if pings:
+                        location_ids = dict(zip(
+                            [p["ticket"] for p in pings],
+                            conn.execute(
+                                insert(StudentLocation).returning(StudentLocation.StudentLocationId, sort_by_parameter_order=True),
+                                [
+                                    {
+                                        "StudentId": p["StudentId"],
+                                        "Lat": p["Lat"],
+                                        "Lng": p["Lng"],
+                                        "CheckInUtc": p["CheckInUtc"],
+                                        "CreatedAtUtc": p["CheckInUtc"],
+                                    }
+                                    for p in pings
+                                ],
+                            ).scalars().all(),
+                        ))
+                    refresh_days(conn, {(item.StudentId, item.ReceivedUtc.date()) for item in rows})
+                    record_locations(conn, [
+                        {
+                            "StudentId": item.StudentId,
+                            "Lat": item.Lat,
+                            "Lng": item.Lng,
+                            "AttendanceId": attendance_id,
+                            "UpdatedAtUtc": item.ReceivedUtc,
+                        }
+                        for item, attendance_id in zip(rows, attendance_ids)
+                    ])
+        except Exception:
+            logger.exception("check-in batch of %d rows failed", len(batch))
+            self.failed_batches += 1
+            for item in batch:
+                self._set_ticket(item.ticket, {"status": "failed"})
+            return
+
+        self.batches += 1
+        self.written += len(rows)
+        self.unknown_student += len(batch) - len(rows)
+        for item, attendance_id, (geo_status, _, _) in zip(rows, attendance_ids, geo):
+            self._set_ticket(item.ticket, {
+                "status": "written",
+                "attendance_id": attendance_id,
+                "location_id": location_ids.get(item.ticket),
+                "geo_status": geo_status,
+            })
+        for item in batch:
+            if item.StudentId not in known:
+                self._set_ticket(item.ticket, {"status": "rejected", "detail": "Student not found"})
+        live_hub.publish_many("location", [
+            {
+                "StudentId": item.StudentId,
+                "FirstName": known[item.StudentId][0],
+                "LastName": known[item.StudentId][1],
+                "Lat": item.Lat,
+                "Lng": item.Lng,
+                "CheckInTime": item.ReceivedUtc,
+                "AttendanceId": attendance_id,
+                "GeoStatus": geo_status,
+            }
+            for item, attendance_id, (geo_status, _, _) in zip(rows, attendance_ids, geo)
+            if item.Lat is not None and item.Lng is not None
+        ])
+
+
+batcher = CheckInBatcher(
+    batch_size=env("CHECKIN_BATCH_SIZE", 500),
+    flush_interval=env("CHECKIN_FLUSH_MS", 50) / 1000,
+    max_queue=env("CHECKIN_QUEUE_MAX", 10000),
+    overflow=env("CHECKIN_OVERFLOW", "reject"),
+    block_timeout=env("CHECKIN_BLOCK_TIMEOUT_MS", 200) / 1000,
+)
@@ -0,0 +1,257 @@
+"""Request timing and SQL instrumentation, exported on GET /metrics.
+
+`MetricsMiddleware` is a plain ASGI middleware (no BaseHTTPMiddleware
+task/queue overhead). For every request it records a latency histogram
+per route template ("/teacher/attendance/{date}", not the raw path, so the
+number of series stays bounded) and a request counter per status code.
+
+The SQLAlchemy cursor hooks time every statement. While a request is
+running, its counters live in a contextvar (the object is shared with the
+thread-pool worker that runs a sync route), so queries are attributed to
+the route that issued them. Statements outside a request (the check-in
+batcher, startup) are counted under route="background".
+
+N+1 detection: the same SQL text executed METRICS_N_PLUS_ONE_THRESHOLD
+times or more within one request is counted in db_n_plus_one_total and
+logged once per request.
+
+Slow-query log: statements slower than SLOW_QUERY_MS are logged on the
+"Backend.sql.slow" logger (0 turns it off).
+
+The cost per request is a few dict updates under a lock and two
+perf_counter() calls per statement; set METRICS_ENABLED=false to skip it
+entirely.
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Optional
+from sqlalchemy import event
+from Backend.settings import env
+
+METRICS_ENABLED = env("METRICS_ENABLED", True)
+SLOW_QUERY_MS = env("SLOW_QUERY_MS", 250.0)
+N_PLUS_ONE_THRESHOLD = env("METRICS_N_PLUS_ONE_THRESHOLD", 10)
+
+# seconds; Prometheus-style cumulative buckets are built when rendering
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("Backend.sql.slow")
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    __slots__ = ("scope", "queries", "sql_seconds", "statements")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.statements = Counter()
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()                       # (method, route, status) -> n
+        self.latency = {}                               # (method, route) -> _Histogram
+        self.queries_per_request = {}                   # route -> _Histogram
+        self.db_queries = Counter()                     # route -> n
+        self.db_seconds = defaultdict(float)            # route -> seconds
+        self.n_plus_one = Counter()                     # route -> n
+        self.slow_queries = 0
+
+    def record_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        with self._lock:
+            self.requests[(method, route, status)] += 1
+            hist = self.latency.get((method, route))
+            if hist is None:
+                hist = self.latency[(method, route)] = _Histogram(LATENCY_BUCKETS)
+            hist.observe(seconds)
+            qhist = self.queries_per_request.get(route)
+            if qhist is None:
+                qhist = self.queries_per_request[route] = _Histogram(QUERY_COUNT_BUCKETS)
+            qhist.observe(stats.queries)
+            self.db_queries[route] += stats.queries
+            self.db_seconds[route] += stats.sql_seconds
+
+        repeated = [(sql, n) for sql, n in stats.statements.items() if n >= N_PLUS_ONE_THRESHOLD]
+        if repeated:
+            with self._lock:
+                self.n_plus_one[route] += len(repeated)
+            for sql, n in repeated:
+                logger.warning("possible N+1 in %s %s: %d x %s", method, route, n, _shorten(sql))
+
+    def record_background_query(self, seconds: float) -> None:
+        with self._lock:
+            self.db_queries["background"] += 1
+            self.db_seconds["background"] += seconds
+
+    def record_slow_query(self) -> None:
+        with self._lock:
+            self.slow_queries += 1
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4."""
+        with self._lock:
+            lines = [
+                "# HELP http_requests_total Requests by method, route template and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), n in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{_esc(route)}",status="{status}"}} {n}')
+
+            lines += [
+                "# HELP http_request_duration_seconds Request latency by method and route template.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), hist in sorted(self.latency.items()):
+                labels = f'method="{method}",route="{_esc(route)}"'
+                lines += _histogram_lines("http_request_duration_seconds", labels, hist)
+
+            lines += [
+                "# HELP db_queries_per_request SQL statements executed per request.",
+                "# TYPE db_queries_per_request histogram",
+            ]
+            for route, hist in sorted(self.queries_per_request.items()):
+                lines += _histogram_lines("db_queries_per_request", f'route="{_esc(route)}"', hist)
+
+            lines += [
+                "# HELP db_queries_total SQL statements executed, by route template.",
+                "# TYPE db_queries_total counter",
+            ]
+            for route, n in sorted(self.db_queries.items()):
+                lines.append(f'db_queries_total{{route="{_esc(route)}"}} {n}')
+
+            lines += [
+                "# HELP db_query_seconds_total Time spent in SQL statements, by route template.",
+                "# TYPE db_query_seconds_total counter",
+            ]
+            for route, s in sorted(self.db_seconds.items()):
+                lines.append(f'db_query_seconds_total{{route="{_esc(route)}"}} {s:.6f}')
+
+            lines += [
+                "# HELP db_n_plus_one_total SQL texts run at least METRICS_N_PLUS_ONE_THRESHOLD times within one request.",
+                "# TYPE db_n_plus_one_total counter",
+            ]
+            for route, n in sorted(self.n_plus_one.items()):
+                lines.append(f'db_n_plus_one_total{{route="{_esc(route)}"}} {n}')
+
+            lines += [
+                "# HELP db_slow_queries_total SQL statements slower than SLOW_QUERY_MS.",
+                "# TYPE db_slow_queries_total counter",
+                f"db_slow_queries_total {self.slow_queries}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name: str, labels: str, hist: _Histogram) -> list:
+    lines = []
+    cumulative = 0
+    for bound, n in zip(hist.buckets, hist.counts):
+        cumulative += n
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+    lines.append(f"{name}_sum{{{labels}}} {hist.sum:.6f}")
+    lines.append(f"{name}_count{{{labels}}} {hist.count}")
+    return lines
+
+
+def _esc(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _shorten(sql: str, limit: int = 300) -> str:
+    sql = " ".join(sql.split())
+    return sql if len(sql) <= limit else sql[:limit] + "..."
+
+
+registry = MetricsRegistry()
+
+
+# ---------------------------------------------------------
+# SQL hooks
+# ---------------------------------------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is None:
+        registry.record_background_query(elapsed)
+    else:
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+        stats.statements[statement] += 1
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        registry.record_slow_query()
+        slow_logger.warning(
+            "%.1f ms in %s: %s",
+            elapsed * 1000,
+            _route_template(stats.scope) if stats is not None else "background",
+            _shorten(statement),
+        )
+
+
+def instrument_engine(engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------------------------------------------------------
+# ASGI middleware
+# ---------------------------------------------------------
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            registry.record_request(scope["method"], _route_template(scope), status, time.perf_counter() - started, stats)
@@ -0,0 +1,162 @@
+"""In-process pub/sub behind the teacher map stream (/teacher/locations/stream).
+
+Write paths publish small deltas after their transaction commits:
+
+  location   a located check-in (direct route or a batcher flush)
+  approved   a check-in was approved
+  checkout   a check-out time was set
+
+Each open stream is a subscriber with a bounded asyncio.Queue on the event
+loop that serves it. Publishing is thread safe (routes run in the thread
+pool, the batcher in its own thread) and never blocks: a subscriber that
+falls behind is flagged as lagged and gets a fresh snapshot instead of the
+events it missed.
+
+Subscribers opened with a teacher_id only receive events for the students
+assigned to that teacher (active StudentAssignments).
+
+This is a single-process hub; with several workers every process serves
+only the events written through it.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import defaultdict
+from typing import Iterable, Optional, Set
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from Backend.models import StudentAssignment
+from Backend.settings import env
+
+LIVE_QUEUE_MAX = env("LIVE_QUEUE_MAX", 1000)
+LIVE_HEARTBEAT_S = env("LIVE_HEARTBEAT_S", 15.0)
+
+
+class Subscriber:
+    __slots__ = ("teacher_id", "student_ids", "loop", "queue", "lagged")
+
+    def __init__(self, teacher_id: Optional[int], student_ids: Optional[Set[int]], max_queue: int):
+        self.teacher_id = teacher_id
+        # None = every student. Replaced, never changed in place: the
+        # snapshot loader iterates it on a worker thread.
+        self.student_ids = student_ids
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.lagged = False
+
+    def offer(self, event) -> None:
+        # runs on the subscriber's event loop
+        if self.queue.full():
+            self.lagged = True
+            return
+        self.queue.put_nowait(event)
+
+    def end(self) -> None:
+        # runs on the subscriber's event loop; None tells the stream to stop
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class LiveHub:
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self.published = 0
+        self.fanout = 0
+        self._seq = itertools.count(1)
+        self._subs: Set[Subscriber] = set()
+        self._everyone: Set[Subscriber] = set()
+        self._by_student = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, teacher_id: Optional[int] = None, student_ids: Optional[Iterable[int]] = None) -> Subscriber:
+        """
+        Must be called from the event loop that will read the queue.
+        """
+        sub = Subscriber(teacher_id, None if student_ids is None else set(student_ids), self.max_queue)
+        with self._lock:
+            self._subs.add(sub)
+            if sub.student_ids is None:
+                self._everyone.add(sub)
+            else:
+                for sid in sub.student_ids:
+                    self._by_student[sid].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        with self._lock:
+            self._subs.discard(sub)
+            self._everyone.discard(sub)
+            for sid in sub.student_ids or ():
+                subs = self._by_student.get(sid)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._by_student[sid]
+
+    def assignment_added(self, teacher_id: int, student_id: int) -> None:
+        """Start sending a newly assigned student's events to that teacher's streams."""
+        with self._lock:
+            for sub in self._subs:
+                if sub.teacher_id != teacher_id or sub.student_ids is None:
+                    continue
+                sub.student_ids = sub.student_ids | {student_id}
+                self._by_student[student_id].add(sub)
+
+    def publish(self, event_type: str, payload: dict) -> None:
+        self.publish_many(event_type, [payload])
+
+    def publish_many(self, event_type: str, payloads: Iterable[dict]) -> None:
+        """
+        payloads: dicts with at least a StudentId. Call after commit.
+        """
+        for payload in payloads:
+            with self._lock:
+                subs = self._everyone | self._by_student.get(payload["StudentId"], set())
+                self.published += 1
+            if not subs:
+                continue
+            # encoded once, shared by every stream
+            event = format_event(event_type, jsonable_encoder(payload), next(self._seq))
+            for sub in subs:
+                try:
+                    sub.loop.call_soon_threadsafe(sub.offer, event)
+                    self.fanout += 1
+                except RuntimeError:
+                    # the loop is gone (server shutting down)
+                    self.unsubscribe(sub)
+
+    def close(self) -> None:
+        """End every open stream."""
+        with self._lock:
+            subs = list(self._subs)
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.end)
+            except RuntimeError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subs),
+                "published": self.published,
+                "fanout": self.fanout,
+            }
+
+
+live_hub = LiveHub(max_queue=LIVE_QUEUE_MAX)
+
+
+def teacher_student_ids(db, teacher_id: int) -> Set[int]:
+    return set(db.execute(
+        select(StudentAssignment.StudentId)
+        .where(StudentAssignment.UserId == teacher_id, StudentAssignment.IsActive.isnot(False))
+    ).scalars())
+
+
+def format_event(event_type: str, data, event_id: Optional[int] = None) -> str:
+    """One Server-Sent Events message."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
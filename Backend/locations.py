@@ -0,0 +1,109 @@
+"""Latest-known-location index used by the teacher map.
+
+StudentCurrentLocations holds one row per student. Every located check-in
+upserts it in the same transaction as the Attendance insert; an upsert
+only wins if it is newer than what is stored, so batches written out of
+order cannot move a student backwards in time.
+"""
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from Backend.models import Attendance, Student, StudentCurrentLocation
+
+
+def record_locations(bind, rows: Iterable[dict]) -> int:
+    """
+    rows: dicts with StudentId, Lat, Lng, AttendanceId, UpdatedAtUtc.
+    Rows without coordinates are ignored. Nothing is committed here.
+    """
+    values = [r for r in rows if r.get("Lat") is not None and r.get("Lng") is not None]
+    if not values:
+        return 0
+    stmt = sqlite_insert(StudentCurrentLocation)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StudentCurrentLocation.StudentId],
+        set_={
+            "Lat": stmt.excluded.Lat,
+            "Lng": stmt.excluded.Lng,
+            "AttendanceId": stmt.excluded.AttendanceId,
+            "UpdatedAtUtc": stmt.excluded.UpdatedAtUtc,
+        },
+        where=stmt.excluded.UpdatedAtUtc >= StudentCurrentLocation.UpdatedAtUtc,
+    )
+    bind.execute(stmt, values)
+    return len(values)
+
+
+def bounding_box(min_lat, min_lng, max_lat, max_lng) -> Optional[Tuple[float, float, float, float]]:
+    """The map routes' query parameters as a bbox for current_locations (None: no box), or 400."""
+    box = (min_lat, min_lng, max_lat, max_lng)
+    if all(v is None for v in box):
+        return None
+    if any(v is None for v in box):
+        raise HTTPException(status_code=400, detail="Bounding box needs min_lat, min_lng, max_lat and max_lng.")
+    if min_lat > max_lat or min_lng > max_lng:
+        # would match nothing rather than fail, so say so
+        raise HTTPException(status_code=400, detail="Bounding box needs min_lat <= max_lat and min_lng <= max_lng.")
+    return box
+
+
+def current_locations(
+    db,
+    since: datetime,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+    student_ids: Optional[Iterable[int]] = None,
+):
+    """
+    One row per student located since `since`, joined with the name.
+    bbox is (min_lat, min_lng, max_lat, max_lng).
+    """
+    stmt = (
+        select(
+            StudentCurrentLocation.StudentId,
+            Student.FirstName,
+            Student.LastName,
+            StudentCurrentLocation.Lat,
+            StudentCurrentLocation.Lng,
+            StudentCurrentLocation.UpdatedAtUtc.label("CheckInTime"),
+        )
+        .join(Student, Student.StudentId == StudentCurrentLocation.StudentId)
+        .where(StudentCurrentLocation.UpdatedAtUtc >= since)
+    )
+    if bbox is not None:
+        min_lat, min_lng, max_lat, max_lng = bbox
+        stmt = stmt.where(
+            StudentCurrentLocation.Lat.between(min_lat, max_lat),
+            StudentCurrentLocation.Lng.between(min_lng, max_lng),
+        )
+    if student_ids is not None:
+        stmt = stmt.where(StudentCurrentLocation.StudentId.in_(list(student_ids)))
+    return db.execute(stmt).all()
+
+
+def rebuild(bind) -> int:
+    """
+    Refill StudentCurrentLocations from the newest located Attendance row
+    of every student.
+    """
+    bind.execute(StudentCurrentLocation.__table__.delete())
+    # with a single max() SQLite takes the bare columns from the max row
+    latest = (
+        select(
+            Attendance.StudentId,
+            Attendance.Lat,
+            Attendance.Lng,
+            Attendance.AttendanceId,
+            func.max(Attendance.CreatedAtUtc).label("UpdatedAtUtc"),
+        )
+        .where(Attendance.Lat.isnot(None), Attendance.Lng.isnot(None), Attendance.CreatedAtUtc.isnot(None))
+        .group_by(Attendance.StudentId)
+    )
+    bind.execute(
+        insert(StudentCurrentLocation).from_select(
+            ["StudentId", "Lat", "Lng", "AttendanceId", "UpdatedAtUtc"], latest
+        )
+    )
+    return bind.execute(select(func.count()).select_from(StudentCurrentLocation)).scalar()
+
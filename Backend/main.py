@@ -1,14 +1,36 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from Backend.db import Base, engine
+from fastapi.responses import PlainTextResponse
+from Backend.db import Base, engine, SessionLocal, DB_ASYNC, async_engine
 from Backend import models
-from Backend.routes import admin, positions, attendance, student, teacher
+from Backend.migrations import MIGRATE_ON_STARTUP, migrate, require_current
+from Backend.archive import check_configured as check_archive_configured
+from Backend.ingest import batcher, CHECKIN_MODE
+from Backend.geofence import refresh_site_index
+from Backend.live import live_hub
+from Backend.conditional import CacheHeadersMiddleware
+from Backend.fastjson import FAST_JSON, ORJSONResponse
+from Backend.instrumentation import METRICS_ENABLED, MetricsMiddleware, instrument_engine, registry
+from Backend.routes import admin, positions, attendance, student, teacher, search
 
-# Make sure all tables exist
+# Bring the database schema to the version this code expects, see Backend/migrations
 def create_tables():
-    Base.metadata.create_all(bind=engine)
+    if MIGRATE_ON_STARTUP:
+        migrate(engine)
+    else:
+        require_current(engine)
+    check_archive_configured(engine)
 
-app = FastAPI()
+# Sites and assignments used to verify check-in locations
+def load_site_index():
+    db = SessionLocal()
+    try:
+        refresh_site_index(db)
+    finally:
+        db.close()
+
+# STUDENT_TRACKER_FAST_JSON renders every response with orjson, see Backend/fastjson.py
+app = FastAPI(default_response_class=ORJSONResponse) if FAST_JSON else FastAPI()
 
 # Allow frontend (localhost:3000) to call backend (127.0.0.1:8000)
 app.add_middleware(
@@ -17,19 +39,55 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "ETag"],
 )
 
+# ETag / Cache-Control on the routes that use conditional(), see Backend/conditional.py
+app.add_middleware(CacheHeadersMiddleware)
+
+# Per-route latency and SQL counters, exported on /metrics
+if METRICS_ENABLED:
+    instrument_engine(engine)
+    if async_engine is not None:
+        instrument_engine(async_engine.sync_engine)
+    app.add_middleware(MetricsMiddleware)
+
 # Register all route modules
+# With STUDENT_TRACKER_DB_ASYNC the async hot routes go first, so they answer
+# their paths instead of the sync handlers of the same name below
+if DB_ASYNC:
+    from Backend.routes import async_routes
+    app.include_router(async_routes.router)
 app.include_router(admin.router)
 app.include_router(positions.router)
 app.include_router(attendance.router)
 app.include_router(student.router)
 app.include_router(teacher.router)
+app.include_router(search.router)
 
 @app.get("/")
 def root():
     return {"message": "Student tracker api running"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.on_event("startup")
 def on_startup():
-    create_tables()
\ No newline at end of file
+    create_tables()
+    load_site_index()
+    if CHECKIN_MODE == "batched":
+        batcher.start()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # write out anything still queued before the process exits
+    batcher.stop(drain=True)
+    # let open /teacher/locations/stream responses finish
+    live_hub.close()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    if async_engine is not None:
+        await async_engine.dispose()
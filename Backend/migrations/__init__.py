@@ -0,0 +1,24 @@
+"""Versioned schema migrations for student_tracker.db.
+
+Each migration is a numbered step in Backend/migrations/versions.py. The
+version a database is at lives in its header (PRAGMA user_version), with
+a row per applied step in SchemaVersions for the history, so finding out
+whether anything is pending costs one read and no table introspection.
+
+  migrate(engine)          apply every pending step, in order
+  require_current(engine)  raise SchemaOutOfDate unless the database is at head
+
+The app calls one of them at startup (STUDENT_TRACKER_MIGRATE_ON_STARTUP);
+for large files run "python -m Backend.scripts.migrate" beforehand.
+Steps that reshape a big table copy it in batches next to the live one
+(Backend/migrations/online.py) so the database stays writable meanwhile.
+"""
+from Backend.migrations.runner import (  # noqa: F401
+    MIGRATE_ON_STARTUP,
+    SchemaOutOfDate,
+    current_version,
+    head_version,
+    migrate,
+    pending,
+    require_current,
+)
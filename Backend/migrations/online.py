@@ -0,0 +1,124 @@
+"""Reshape a table without holding the write lock for the whole copy.
+
+SQLite can only add columns in place. Anything else (dropping or
+retyping columns, new constraints, a different layout) means creating the
+table anew and copying the rows. Done as one INSERT ... SELECT, that holds
+the write lock for as long as the copy takes, minutes on a large file.
+rebuild_table instead:
+
+  1. creates the new table next to the old one as "_new_<name>", with
+     the model's indexes where their names are free;
+  2. installs triggers so inserts, updates and deletes on the old table
+     are mirrored into the new one while the copy runs;
+  3. copies the old rows in rowid batches, one short transaction each,
+     so other writers get the lock between batches;
+  4. swaps the tables in one short transaction: the old table is dropped
+     (or kept under another name), the new one takes its name and the
+     remaining indexes are built.
+
+An interrupted rebuild is started over: step 1 drops the leftovers.
+"""
+from sqlalchemy import Index, MetaData, text
+from sqlalchemy.schema import CreateTable
+from Backend.migrations.runner import immediate
+
+
+def _triggers(name: str) -> list:
+    return [f"_mig_{name}_{op}" for op in ("ins", "upd", "del")]
+
+
+def rebuild_table(ctx, table, columns: dict, joins: str = "", keep_as: str = None) -> int:
+    """
+    table:   the SQLAlchemy Table with the new layout; its name is the
+             name of the existing table.
+    columns: new column name -> SQL expression over the old row, aliased
+             `t` (and whatever `joins` adds). The primary key is not
+             listed: it is always the old rowid, which is what lets the
+             triggers find a row again.
+    joins:   JOIN clauses appended to "FROM <old> t". Old rows the joins
+             drop are not copied.
+    keep_as: rename the old table to this instead of dropping it.
+
+    Returns the number of rows in the new table.
+    """
+    engine, name, new = ctx.engine, table.name, f"_new_{table.name}"
+    pk = list(table.primary_key.columns)[0].name
+    names = [pk, *columns]
+    insert_cols = ", ".join(f'"{c}"' for c in names)
+    select_list = ", ".join(["t.rowid", *columns.values()])
+    copy = f'INSERT OR REPLACE INTO "{new}" ({insert_cols}) SELECT {select_list} FROM "{name}" t {joins}'
+    ins, upd, dele = _triggers(name)
+
+    # a scratch MetaData with the other tables too, so foreign keys resolve
+    scratch = MetaData()
+    for other in table.metadata.tables.values():
+        if other is not table:
+            other.to_metadata(scratch)
+    shadow = table.to_metadata(scratch, name=new)
+    with immediate(engine) as conn:
+        for trigger in (ins, upd, dele):
+            conn.exec_driver_sql(f'DROP TRIGGER IF EXISTS "{trigger}"')
+        conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{new}"')
+        conn.execute(CreateTable(shadow))
+        taken = {r[0] for r in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        deferred = [ix.name for ix in table.indexes if ix.name in taken]
+        for ix in table.indexes:
+            if ix.name not in taken:
+                # under the model's name: a convention-named copy would be
+                # named after "_new_<name>"
+                columns = [shadow.c[c.name] for c in ix.columns]
+                Index(str(ix.name), *columns, unique=ix.unique, **dict(ix.dialect_kwargs)).create(conn)
+        conn.exec_driver_sql(
+            f'CREATE TRIGGER "{ins}" AFTER INSERT ON "{name}" BEGIN '
+            f"{copy} WHERE t.rowid = NEW.rowid; END"
+        )
+        conn.exec_driver_sql(
+            f'CREATE TRIGGER "{upd}" AFTER UPDATE ON "{name}" BEGIN '
+            f'DELETE FROM "{new}" WHERE "{pk}" = OLD.rowid; '
+            f"{copy} WHERE t.rowid = NEW.rowid; END"
+        )
+        conn.exec_driver_sql(
+            f'CREATE TRIGGER "{dele}" AFTER DELETE ON "{name}" BEGIN '
+            f'DELETE FROM "{new}" WHERE "{pk}" = OLD.rowid; END'
+        )
+
+    batch = text(f"{copy} WHERE t.rowid > :after AND t.rowid <= :upto")
+    bound = text(f'SELECT max(rowid) FROM (SELECT rowid FROM "{name}" WHERE rowid > :after ORDER BY rowid LIMIT :n)')
+    with engine.connect() as conn:
+        total = conn.exec_driver_sql(f'SELECT count(*) FROM "{name}"').scalar()
+    after, done = 0, 0
+    while True:
+        with immediate(engine) as conn:
+            upto = conn.execute(bound, {"after": after, "n": ctx.batch_size}).scalar()
+            if upto is None:
+                break
+            conn.execute(batch, {"after": after, "upto": upto})
+            done += conn.execute(
+                text(f'SELECT count(*) FROM "{name}" WHERE rowid > :after AND rowid <= :upto'),
+                {"after": after, "upto": upto},
+            ).scalar()
+        after = upto
+        ctx.log(f"  {name}: {done}/{total} rows copied")
+
+    with immediate(engine) as conn:
+        for trigger in (ins, upd, dele):
+            conn.exec_driver_sql(f'DROP TRIGGER "{trigger}"')
+        # keep other tables' foreign keys pointing at the name, not at the
+        # renamed old table
+        conn.exec_driver_sql("PRAGMA legacy_alter_table = ON")
+        try:
+            if keep_as:
+                conn.exec_driver_sql(f'ALTER TABLE "{name}" RENAME TO "{keep_as}"')
+                for ix in deferred:
+                    conn.exec_driver_sql(f'DROP INDEX IF EXISTS "{ix}"')
+            else:
+                conn.exec_driver_sql(f'DROP TABLE "{name}"')
+            conn.exec_driver_sql(f'ALTER TABLE "{new}" RENAME TO "{name}"')
+        finally:
+            conn.exec_driver_sql("PRAGMA legacy_alter_table = OFF")
+        for ix in table.indexes:
+            if ix.name in deferred:
+                ix.create(conn)
+        rows = conn.exec_driver_sql(f'SELECT count(*) FROM "{name}"').scalar()
+    ctx.log(f"  {name}: rebuilt, {rows} rows")
+    return rows
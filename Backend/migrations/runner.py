@@ -0,0 +1,114 @@
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, List, Optional
+from sqlalchemy import text
+from Backend.settings import env
+
+# Apply pending migrations when the app starts. Turn off where the schema
+# is upgraded by "python -m Backend.scripts.migrate" ahead of a deploy; the
+# app then refuses to start against an older database.
+MIGRATE_ON_STARTUP = env("MIGRATE_ON_STARTUP", True)
+# Rows per transaction when a migration copies a table (online.rebuild_table)
+MIGRATION_BATCH_SIZE = env("MIGRATION_BATCH_SIZE", 5000)
+
+logger = logging.getLogger("Backend.migrations")
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+class MigrationContext:
+    def __init__(self, engine, batch_size: int, log: Callable[[str], None]):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.log = log
+
+
+@contextmanager
+def immediate(engine):
+    """
+    One write transaction holding SQLite's write lock from the start.
+    pysqlite only opens a transaction in front of DML, so without the
+    explicit BEGIN the DDL of a migration would commit statement by
+    statement.
+    """
+    with engine.connect() as conn:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+def current_version(bind) -> int:
+    return bind.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def head_version() -> int:
+    from Backend.migrations.versions import MIGRATIONS
+
+    return MIGRATIONS[-1][0]
+
+
+def pending(engine) -> List[tuple]:
+    """(version, name) of the steps not applied yet."""
+    from Backend.migrations.versions import MIGRATIONS
+
+    with engine.connect() as conn:
+        version = current_version(conn)
+    return [(number, name) for number, name, _ in MIGRATIONS if number > version]
+
+
+def _record(conn, number: int, name: str, seconds: float) -> None:
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS SchemaVersions ("
+        "Version INTEGER PRIMARY KEY, Name TEXT NOT NULL, AppliedAtUtc DATETIME NOT NULL, Seconds FLOAT)"
+    )
+    conn.execute(
+        text("INSERT OR REPLACE INTO SchemaVersions VALUES (:v, :n, :at, :s)"),
+        {"v": number, "n": name, "at": datetime.utcnow(), "s": round(seconds, 3)},
+    )
+    # part of the same transaction: the header and the history agree
+    conn.exec_driver_sql(f"PRAGMA user_version = {int(number)}")
+
+
+def migrate(engine, target: Optional[int] = None, batch_size: int = MIGRATION_BATCH_SIZE, log=logger.info) -> list:
+    """
+    Apply the pending steps up to `target` (default: all of them).
+    Returns the versions applied. A step that fails leaves the database
+    at the last version that completed; every step is safe to run again.
+    """
+    from Backend.migrations.versions import MIGRATIONS
+
+    with engine.connect() as conn:
+        version = current_version(conn)
+    ctx = MigrationContext(engine, batch_size, log)
+    applied = []
+    for number, name, step in MIGRATIONS:
+        if number <= version or (target is not None and number > target):
+            continue
+        log(f"migration {number:04d} {name}")
+        started = time.perf_counter()
+        step(ctx)
+        seconds = time.perf_counter() - started
+        with immediate(engine) as conn:
+            _record(conn, number, name, seconds)
+        log(f"migration {number:04d} {name}: done in {seconds:.2f}s")
+        applied.append(number)
+    return applied
+
+
+def require_current(engine) -> None:
+    with engine.connect() as conn:
+        version = current_version(conn)
+    head = head_version()
+    if version < head:
+        raise SchemaOutOfDate(
+            f"Database schema is at version {version}, this code needs {head}. "
+            "Run: python -m Backend.scripts.migrate"
+        )
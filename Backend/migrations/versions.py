@@ -0,0 +1,153 @@
+"""The migrations, in the order they are applied.
+
+Add a step by appending (next number, name, function) to MIGRATIONS.
+A step gets a MigrationContext (engine, batch_size, log) and must be safe
+to run again: the version is recorded after it returns, so a crash in
+between repeats it on the next run. Never renumber or edit a step that
+has shipped; fix things forward with a new one.
+"""
+from sqlalchemy import func, inspect, select, text, update
+from Backend.db import ARCHIVE_PATH, Base
+from Backend import archive, conditional, locations, rollups, search
+from Backend.migrations.online import rebuild_table
+from Backend.migrations.runner import immediate
+from Backend.models import ArchiveRun, Attendance, AttendanceDaily, Feedback, LocationTrace, StudentCurrentLocation, TableVersion
+from Backend.schema import ensure_columns, ensure_indexes, table_columns
+
+
+def _stamp(expr: str) -> str:
+    """SQL turning a legacy TEXT timestamp into SQLAlchemy's DateTime format."""
+    return f"strftime('%Y-%m-%d %H:%M:%S', {expr}) || '.000000'"
+
+
+def legacy_attendance(ctx) -> None:
+    """
+    The original schema kept one Attendance row per assignment and date
+    (AssignmentId, AttendanceDate, AttendanceTime, SetByUserId). Rebuild
+    it into the model's per-student check-in layout; the old table stays
+    as Attendance_legacy. Rows whose assignment no longer exists have no
+    student to belong to and are only kept there.
+    """
+    with ctx.engine.connect() as conn:
+        cols = table_columns(conn, "Attendance")
+    if not cols or "StudentId" in cols:
+        return
+    checked_in = _stamp("t.AttendanceDate || ' ' || COALESCE(t.AttendanceTime, '00:00')")
+    rebuild_table(
+        ctx,
+        Attendance.__table__,
+        {
+            "StudentId": "sa.StudentId",
+            "CheckInUtc": checked_in,
+            "CheckOutUtc": "NULL",
+            # entered by staff (SetByUserId), so nothing left to approve
+            "IsApproved": "1",
+            "Status": "t.Status",
+            "Lat": "NULL",
+            "Lng": "NULL",
+            "CreatedAtUtc": f"COALESCE({_stamp('t.CreatedAtUtc')}, {checked_in})",
+        },
+        joins="JOIN StudentAssignments sa ON sa.AssignmentId = t.AssignmentId",
+        keep_as="Attendance_legacy",
+    )
+
+
+def sync_models(ctx) -> None:
+    """Create missing tables, nullable columns and indexes from the models."""
+    Base.metadata.create_all(bind=ctx.engine)
+    with immediate(ctx.engine) as conn:
+        added = ensure_columns(conn)
+        created = ensure_indexes(conn)
+        if created:
+            # refresh planner statistics so the new indexes get picked
+            conn.execute(text("ANALYZE"))
+    for name in added + created:
+        ctx.log(f"  created {name}")
+
+
+def derived_tables(ctx) -> None:
+    """
+    Fill StudentCurrentLocations and AttendanceDaily on databases that
+    predate them (or whose Attendance was just rebuilt). The write routes
+    keep them current from here on.
+    """
+    with immediate(ctx.engine) as conn:
+        if conn.execute(select(StudentCurrentLocation.StudentId).limit(1)).first() is None:
+            ctx.log(f"  StudentCurrentLocations: {locations.rebuild(conn)} rows")
+        has_days = conn.execute(select(AttendanceDaily.StudentId).limit(1)).first() is not None
+        if not has_days and conn.execute(select(func.count()).select_from(Attendance)).scalar():
+            ctx.log(f"  AttendanceDaily: {rollups.rebuild(conn)} rows")
+
+
+def archive_runs(ctx) -> None:
+    """ArchiveRuns, the watermark table of Backend/archive.py."""
+    Base.metadata.create_all(bind=ctx.engine, tables=[ArchiveRun.__table__])
+
+
+def location_traces(ctx) -> None:
+    """LocationTraces, the packed StudentLocations days of Backend/traces.py."""
+    Base.metadata.create_all(bind=ctx.engine, tables=[LocationTrace.__table__])
+
+
+def search_index(ctx) -> None:
+    """
+    Feedback (written by the teacher routes, never created before) and
+    the SearchIndex FTS table with its triggers, filled from the base
+    tables; see Backend/search.py.
+    """
+    Base.metadata.create_all(bind=ctx.engine, tables=[Feedback.__table__])
+    with immediate(ctx.engine) as conn:
+        search.install(conn)
+        ctx.log(f"  SearchIndex: {search.rebuild(conn)} rows")
+
+
+def table_versions(ctx) -> None:
+    """TableVersions and the triggers that bump it; see Backend/conditional.py."""
+    Base.metadata.create_all(bind=ctx.engine, tables=[TableVersion.__table__])
+    with immediate(ctx.engine) as conn:
+        conditional.install(conn)
+
+
+def session_overlap_indexes(ctx) -> None:
+    """
+    Attendance (CheckOutUtc, CheckInUtc) for hours._earliest_overlap, in the
+    main file and, when one is attached, in the archive.
+    """
+    with immediate(ctx.engine) as conn:
+        ctx.log(f"  created {ensure_indexes(conn) or 'nothing'}")
+        if ARCHIVE_PATH and "Attendance" in inspect(conn).get_table_names(schema="archive"):
+            for index in archive.COLD[Attendance].indexes:
+                index.create(conn, checkfirst=True)
+
+
+def archive_copied_at(ctx) -> None:
+    """
+    ArchiveRuns.CopiedAtUtc. Runs used to be recorded only once their rows
+    were copied, so every existing one is copied already.
+    """
+    with immediate(ctx.engine) as conn:
+        for name in ensure_columns(conn):
+            ctx.log(f"  created {name}")
+        conn.execute(
+            update(ArchiveRun).where(ArchiveRun.CopiedAtUtc.is_(None)).values(CopiedAtUtc=ArchiveRun.StartedAtUtc)
+        )
+
+
+def site_index_versions(ctx) -> None:
+    """The StudentAssignments counter and triggers, for geofence.site_index."""
+    with immediate(ctx.engine) as conn:
+        conditional.install(conn)
+
+
+MIGRATIONS = [
+    (1, "legacy_attendance", legacy_attendance),
+    (2, "sync_models", sync_models),
+    (3, "derived_tables", derived_tables),
+    (4, "archive_runs", archive_runs),
+    (5, "location_traces", location_traces),
+    (6, "search_index", search_index),
+    (7, "table_versions", table_versions),
+    (8, "session_overlap_indexes", session_overlap_indexes),
+    (9, "archive_copied_at", archive_copied_at),
+    (10, "site_index_versions", site_index_versions),
+]
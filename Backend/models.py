@@ -1,11 +1,12 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Boolean, DateTime, Float
+from sqlalchemy import Column, ForeignKey, Integer, String, Boolean, Date, DateTime, Float, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from Backend.db import Base
 from pydantic import BaseModel, field_validator
-from typing import Optional
-from datetime import datetime
+from typing import List, Optional
+from datetime import date, datetime, timezone
 
 VALID_ROLES = {"ADMIN", "INSTRUCTOR", "IT"}
+VALID_ATTENDANCE_STATUSES = {"PRESENT", "ABSENT", "TARDY"}
 
 # ========================
 #   USERS
@@ -86,6 +87,11 @@ class Student(Base):
     GPA = Column(Float, nullable=True)
     CreatedAtUtc = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # keyset pagination of the teacher student list
+        Index("IX_Students_LastName_StudentId", "LastName", "StudentId"),
+    )
+
 
 class StudentOut(BaseModel):
     UniversityId: int
@@ -134,6 +140,7 @@ class StudentAssignment(Base):
     AssignmentId = Column(Integer, primary_key=True, index=True)
     StudentId = Column(Integer, ForeignKey("Students.StudentId"), nullable=False)
     UserId = Column(Integer, ForeignKey("Users.UserId"), nullable=False)
+    PositionId = Column(Integer, ForeignKey("Positions.PositionId"), nullable=True)
     IsActive = Column(Boolean, default=True)
 
     Student = relationship("Student", backref="Assignments")
@@ -162,6 +169,10 @@ class Positions(Base):
     TermStart = Column(DateTime, nullable=False)
     TermEnd = Column(DateTime, nullable=False)
     CreatedAtUtc = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Geocoded site, used for location-verified check-ins (Backend/geofence.py)
+    SiteLat = Column(Float, nullable=True)
+    SiteLng = Column(Float, nullable=True)
+    SiteRadiusM = Column(Float, nullable=True)   # on-site radius in meters
 
 
 class PositionCreate(BaseModel):
@@ -172,6 +183,9 @@ class PositionCreate(BaseModel):
     SupervisorEmail: str
     TermStart: Optional[datetime] = None
     TermEnd: Optional[datetime] = None
+    SiteLat: Optional[float] = None
+    SiteLng: Optional[float] = None
+    SiteRadiusM: Optional[float] = None
 
 
 class PositionUpdate(BaseModel):
@@ -182,6 +196,28 @@ class PositionUpdate(BaseModel):
     SupervisorEmail: Optional[str] = None
     TermStart: Optional[datetime] = None
     TermEnd: Optional[datetime] = None
+    SiteLat: Optional[float] = None
+    SiteLng: Optional[float] = None
+    SiteRadiusM: Optional[float] = None
+
+
+# ========================
+#   FEEDBACK
+# ========================
+# Free-text notes teachers leave on a student or a position
+# (teacher.post_feedback_for_student / post_feedback_for_position).
+class Feedback(Base):
+    __tablename__ = "Feedback"
+
+    FeedbackId = Column(Integer, primary_key=True)
+    TargetType = Column(String(20), nullable=False)         # STUDENT | POSITION
+    TargetId = Column(Integer, nullable=False)
+    FeedbackText = Column(String, nullable=False)
+    CreatedAtUtc = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("IX_Feedback_TargetType_TargetId", "TargetType", "TargetId"),
+    )
 
 
 # ========================
@@ -202,9 +238,59 @@ class Attendance(Base):
     Lat = Column(Float, nullable=True)   # latitude
     Lng = Column(Float, nullable=True)   # longitude
     CreatedAtUtc = Column(DateTime, default=datetime.utcnow)
+    # Geofence result: ON_SITE/NEAR/OFF_SITE/UNKNOWN, distance to the site edge check
+    GeoStatus = Column(String(10), nullable=True)
+    GeoDistanceM = Column(Float, nullable=True)
+    GeoPositionId = Column(Integer, nullable=True)
+    # UTC day of rows written by the teacher attendance sheet (one per student per day)
+    SheetDay = Column(Date, nullable=True)
 
     Student = relationship("Student", backref="AttendanceRecords")
 
+    __table_args__ = (
+        # teacher.get_attendance_sheet: range on CheckInUtc
+        Index("IX_Attendance_CheckInUtc", "CheckInUtc"),
+        # attendance.get_student_attendance / teacher.get_check_in:
+        # StudentId = ? ORDER BY CheckInUtc DESC
+        Index("IX_Attendance_StudentId_CheckInUtc", "StudentId", "CheckInUtc"),
+        # teacher.get_today_locations: range on CreatedAtUtc, covers the
+        # columns the map needs so the table itself is never touched
+        Index("IX_Attendance_CreatedAtUtc_Location", "CreatedAtUtc", "StudentId", "Lat", "Lng"),
+        # hours.fetch_sessions: earliest check-in of the sessions closed
+        # after the range start, however long ago they began
+        Index("IX_Attendance_CheckOutUtc_CheckInUtc", "CheckOutUtc", "CheckInUtc"),
+        # teacher.post_attendance_sheet upserts on (StudentId, SheetDay)
+        Index(
+            "IX_Attendance_StudentId_SheetDay", "StudentId", "SheetDay",
+            unique=True, sqlite_where=SheetDay.isnot(None),
+        ),
+    )
+
+
+# ========================
+#   ATTENDANCE DAILY ROLLUP
+# ========================
+# One row per student per day, derived from Attendance and kept current by
+# Backend/rollups.py. Rebuild with Backend/scripts/rebuild_attendance_daily.py.
+class AttendanceDaily(Base):
+    __tablename__ = "AttendanceDaily"
+
+    StudentId = Column(Integer, ForeignKey("Students.StudentId"), primary_key=True)
+    Day = Column(Date, primary_key=True)                    # UTC date of CheckInUtc
+    Status = Column(String(20), nullable=False)             # best status of the day
+    FirstCheckInUtc = Column(DateTime, nullable=False)
+    LastCheckOutUtc = Column(DateTime, nullable=True)
+    IsApproved = Column(Boolean, nullable=False, default=False)  # every session approved
+    WorkedMinutes = Column(Float, nullable=False, default=0.0)   # closed sessions only
+    SessionCount = Column(Integer, nullable=False, default=0)
+    OpenSessions = Column(Integer, nullable=False, default=0)
+    UpdatedAtUtc = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # semester range reports across all students
+        Index("IX_AttendanceDaily_Day", "Day"),
+    )
+
 
 class AttendanceCreate(BaseModel):
     StudentId: int
@@ -213,6 +299,41 @@ class AttendanceCreate(BaseModel):
     Lng: Optional[float] = None
 
 
+class AttendanceSheetEntry(BaseModel):
+    StudentId: int
+    Status: str = "PRESENT"
+
+    @field_validator("Status")
+    @classmethod
+    def validate_status(cls, value: str) -> str:
+        value = value.upper()
+        if value not in VALID_ATTENDANCE_STATUSES:
+            raise ValueError(f"Status must be one of {VALID_ATTENDANCE_STATUSES}")
+        return value
+
+
+class AttendanceSheet(BaseModel):
+    Date: Optional[datetime] = None   # defaults to now
+    students: List[AttendanceSheetEntry] = []
+
+    @field_validator("Date")
+    @classmethod
+    def to_naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # Attendance stores naive UTC timestamps
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class AttendanceApproval(BaseModel):
+    # every given filter must match; at least one is required
+    AttendanceIds: Optional[List[int]] = None
+    StudentId: Optional[int] = None
+    PositionId: Optional[int] = None
+    DateFrom: Optional[date] = None
+    DateTo: Optional[date] = None
+
+
 class StudentLocationOut(BaseModel):
     StudentId: int
     FirstName: str
@@ -240,6 +361,67 @@ class StudentLocation(Base):
 
     Student = relationship("Student", backref="LocationRecords")
 
+    __table_args__ = (
+        Index("IX_StudentLocations_StudentId_CheckInUtc", "StudentId", "CheckInUtc"),
+        # map fallback: range on CheckInUtc, covering
+        Index("IX_StudentLocations_CheckInUtc_Location", "CheckInUtc", "StudentId", "Lat", "Lng"),
+    )
+
+
+# ========================
+#   CURRENT LOCATION (one row per student)
+# ========================
+# Latest known position of each student, upserted by every located check-in
+# (Backend/locations.py), so the teacher map never scans the day's rows.
+class StudentCurrentLocation(Base):
+    __tablename__ = "StudentCurrentLocations"
+
+    StudentId = Column(Integer, ForeignKey("Students.StudentId"), primary_key=True)
+    Lat = Column(Float, nullable=False)
+    Lng = Column(Float, nullable=False)
+    AttendanceId = Column(Integer, nullable=True)
+    UpdatedAtUtc = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("IX_StudentCurrentLocations_UpdatedAtUtc", "UpdatedAtUtc", "Lat", "Lng"),
+    )
+
+
+# ========================
+#   LOCATION TRACES (one row per student per day)
+# ========================
+# StudentLocations rows of past days, simplified and delta-encoded by
+# Backend/traces.py (compact_traces). Read them with traces.trace_points.
+class LocationTrace(Base):
+    __tablename__ = "LocationTraces"
+
+    StudentId = Column(Integer, ForeignKey("Students.StudentId"), primary_key=True)
+    Day = Column(Date, primary_key=True)                    # UTC date of CheckInUtc
+    StartUtc = Column(DateTime, nullable=False)             # first point, the base of the deltas
+    EndUtc = Column(DateTime, nullable=False)
+    PointCount = Column(Integer, nullable=False)
+    RawPointCount = Column(Integer, nullable=False)         # StudentLocations rows it replaced
+    Trace = Column(LargeBinary, nullable=False)
+    UpdatedAtUtc = Column(DateTime, default=datetime.utcnow)
+
+
+# ========================
+#   ARCHIVE RUNS
+# ========================
+# One row per Backend/archive.py run. The newest copied CutoffUtc is the
+# archive watermark: Attendance and StudentLocations rows checked in before
+# it are read from the attached archive database, see Backend/archive.py.
+class ArchiveRun(Base):
+    __tablename__ = "ArchiveRuns"
+
+    RunId = Column(Integer, primary_key=True)
+    CutoffUtc = Column(DateTime, nullable=False)
+    AttendanceRows = Column(Integer, nullable=False, default=0)   # copied to the archive
+    LocationRows = Column(Integer, nullable=False, default=0)
+    StartedAtUtc = Column(DateTime, default=datetime.utcnow)      # cutoff read-only from here
+    CopiedAtUtc = Column(DateTime, nullable=True)                 # watermark moved
+    FinishedAtUtc = Column(DateTime, nullable=True)               # hot rows deleted
+
 
 class StudentLocationCreate(BaseModel):
     StudentId: int
@@ -247,4 +429,17 @@ class StudentLocationCreate(BaseModel):
     Lng: float
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# ========================
+#   TABLE VERSIONS
+# ========================
+# One counter per table behind a conditional GET, bumped by triggers on
+# that table in the writing transaction; Backend/conditional.py builds the
+# ETag from them, so every worker process sees every write.
+class TableVersion(Base):
+    __tablename__ = "TableVersions"
+
+    TableName = Column(String(64), primary_key=True)
+    Version = Column(Integer, nullable=False, default=0)
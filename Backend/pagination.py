@@ -0,0 +1,108 @@
+"""Keyset (cursor) pagination and column projection for list endpoints.
+
+A page is requested with `?limit=N`; the response carries the cursor for the
+next page in the `X-Next-Cursor` header, and the total number of matching
+rows in `X-Total-Count`. Passing `?cursor=<value>` continues after the last
+row of the previous page, so deep pages cost the same as the first one.
+"""
+import base64
+import json
+from typing import Iterable, List, Optional
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+from Backend.cache import count_cache
+
+MAX_PAGE_SIZE = 1000
+TOTAL_COUNT_HEADER = "X-Total-Count"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return values
+
+
+def parse_fields(fields: Optional[str], model, allowed: Iterable[str]) -> Optional[list]:
+    """
+    Turn `?fields=FirstName,LastName` into a list of model columns.
+    Returns None when no projection was requested.
+    """
+    if not fields:
+        return None
+    allowed = set(allowed)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [n for n in names if n not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(sorted(allowed))}",
+        )
+    return [getattr(model, n) for n in dict.fromkeys(names)]
+
+
+def keyset_paginate(
+    db: Session,
+    model,
+    criteria: list,
+    order_by: list,
+    *,
+    response: Response,
+    count_key: tuple,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[str] = None,
+    allowed_fields: Iterable[str] = (),
+):
+    """
+    Returns ORM rows (so the route's response_model still applies), or a
+    ready JSONResponse of plain dicts when a `fields` projection was asked for.
+    `order_by` must be unique per row (end it with the primary key).
+    """
+    headers = {}
+    total = count_cache.get_or_set(
+        count_key,
+        lambda: db.query(func.count()).select_from(model).filter(*criteria).scalar(),
+    )
+    headers[TOTAL_COUNT_HEADER] = str(total)
+
+    projection = parse_fields(fields, model, allowed_fields)
+    if projection is None:
+        query = db.query(model)
+    else:
+        picked = {c.key for c in projection}
+        # the order columns are always loaded so the next cursor can be built
+        query = db.query(*projection, *[c for c in order_by if c.key not in picked])
+
+    query = query.filter(*criteria)
+    if cursor:
+        after = decode_cursor(cursor, len(order_by))
+        query = query.filter(tuple_(*order_by) > tuple_(*after))
+    query = query.order_by(*order_by)
+    if limit:
+        query = query.limit(limit + 1)
+
+    rows = query.all()
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(rows[-1], c.key) for c in order_by])
+
+    if projection is None:
+        response.headers.update(headers)
+        return rows
+
+    body: List[dict] = [{c.key: getattr(r, c.key) for c in projection} for r in rows]
+    return JSONResponse(content=jsonable_encoder(body), headers=headers)
@@ -0,0 +1,149 @@
+"""Maintenance of the AttendanceDaily rollup (student x day).
+
+Write routes call `refresh_days` with the (StudentId, day) pairs they touched,
+inside their own transaction and after a flush, so the rollup commits or
+rolls back together with the raw Attendance rows. Each call recomputes only
+those student-days from the (StudentId, CheckInUtc) index, which keeps it
+correct for check-in, check-out, approval and status edits alike.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Tuple
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from Backend.archive import watermark
+from Backend.models import Attendance, AttendanceDaily
+
+# Day status is the best status seen that day: PRESENT > TARDY > ABSENT.
+STATUS_RANK = {"PRESENT": 3, "TARDY": 2, "ABSENT": 1}
+
+_best_rank = func.max(case(*[(Attendance.Status == k, v) for k, v in STATUS_RANK.items()], else_=0))
+_day_status = case(*[(_best_rank == v, k) for k, v in STATUS_RANK.items()], else_=func.max(Attendance.Status))
+
+_worked_minutes = func.round(func.coalesce(
+    func.sum(
+        case(
+            (
+                Attendance.CheckOutUtc.isnot(None),
+                (func.julianday(Attendance.CheckOutUtc) - func.julianday(Attendance.CheckInUtc)) * 1440.0,
+            ),
+            else_=0.0,
+        )
+    ),
+    0.0,
+), 2)
+
+ROLLUP_COLUMNS = [
+    Attendance.StudentId.label("StudentId"),
+    func.date(Attendance.CheckInUtc).label("Day"),
+    _day_status.label("Status"),
+    func.min(Attendance.CheckInUtc).label("FirstCheckInUtc"),
+    func.max(Attendance.CheckOutUtc).label("LastCheckOutUtc"),
+    func.min(func.coalesce(Attendance.IsApproved, False)).label("IsApproved"),
+    _worked_minutes.label("WorkedMinutes"),
+    func.count().label("SessionCount"),
+    func.sum(case((Attendance.CheckOutUtc.is_(None), 1), else_=0)).label("OpenSessions"),
+]
+
+
+def _day_bounds(day: date):
+    return datetime.combine(day, time.min), datetime.combine(day + timedelta(days=1), time.min)
+
+
+def refresh_days(bind, keys: Iterable[Tuple[int, date]]) -> int:
+    """
+    Recompute the rollup rows for the given (StudentId, day) pairs.
+    `bind` is a Session or Connection; nothing is committed here.
+    Returns the number of rollup rows written.
+    """
+    by_day = defaultdict(set)
+    for student_id, day in keys:
+        if isinstance(day, datetime):
+            day = day.date()
+        by_day[day].add(student_id)
+
+    written = 0
+    now = datetime.utcnow()
+    for day, student_ids in by_day.items():
+        start, end = _day_bounds(day)
+        rows = bind.execute(
+            select(*ROLLUP_COLUMNS)
+            .where(
+                Attendance.StudentId.in_(student_ids),
+                Attendance.CheckInUtc >= start,
+                Attendance.CheckInUtc < end,
+            )
+            .group_by(Attendance.StudentId)
+        ).all()
+
+        found = {r.StudentId for r in rows}
+        missing = student_ids - found
+        if missing:
+            # every raw row for that student-day is gone
+            bind.execute(
+                delete(AttendanceDaily).where(
+                    AttendanceDaily.StudentId.in_(missing), AttendanceDaily.Day == day
+                )
+            )
+        if not rows:
+            continue
+
+        values = [
+            {
+                "StudentId": r.StudentId,
+                "Day": day,
+                "Status": r.Status,
+                "FirstCheckInUtc": r.FirstCheckInUtc,
+                "LastCheckOutUtc": r.LastCheckOutUtc,
+                "IsApproved": bool(r.IsApproved),
+                "WorkedMinutes": r.WorkedMinutes,
+                "SessionCount": r.SessionCount,
+                "OpenSessions": r.OpenSessions,
+                "UpdatedAtUtc": now,
+            }
+            for r in rows
+        ]
+        stmt = sqlite_insert(AttendanceDaily)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AttendanceDaily.StudentId, AttendanceDaily.Day],
+            set_={c: stmt.excluded[c] for c in values[0] if c not in ("StudentId", "Day")},
+        )
+        bind.execute(stmt, values)
+        written += len(values)
+    return written
+
+
+def rebuild(bind) -> int:
+    """
+    Drop and recompute the whole rollup with one INSERT ... SELECT.
+    Days already moved to the archive keep their rows.
+    """
+    clear = delete(AttendanceDaily)
+    source = (
+        select(*ROLLUP_COLUMNS, func.datetime("now").label("UpdatedAtUtc"))
+        .where(Attendance.CheckInUtc.isnot(None))
+        .group_by(Attendance.StudentId, func.date(Attendance.CheckInUtc))
+    )
+    cutoff = watermark(bind)
+    if cutoff is not None:
+        clear = clear.where(AttendanceDaily.Day >= cutoff.date())
+        source = source.where(Attendance.CheckInUtc >= cutoff)
+    bind.execute(clear)
+    bind.execute(
+        insert(AttendanceDaily).from_select(
+            ["StudentId", "Day", "Status", "FirstCheckInUtc", "LastCheckOutUtc", "IsApproved",
+             "WorkedMinutes", "SessionCount", "OpenSessions", "UpdatedAtUtc"],
+            source,
+        )
+    )
+    return bind.execute(select(func.count()).select_from(AttendanceDaily)).scalar()
+
+
+def daily_range(db, date_from: date, date_to: date, student_ids=None):
+    """
+    Rollup rows in [date_from, date_to] as ORM objects (`db` is a Session).
+    """
+    stmt = select(AttendanceDaily).where(AttendanceDaily.Day >= date_from, AttendanceDaily.Day <= date_to)
+    if student_ids:
+        stmt = stmt.where(AttendanceDaily.StudentId.in_(student_ids))
+    return db.execute(stmt.order_by(AttendanceDaily.Day, AttendanceDaily.StudentId)).scalars().all()
@@ -1,12 +1,19 @@
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 from ..db import get_db                   
+from Backend.cache import count_cache, metrics_cache
+from Backend.conditional import conditional
+from Backend.entity_cache import cache_stats, student_cache, user_cache
+from Backend.geofence import refresh_site_index
+from Backend.live import live_hub
+from Backend.importer import import_records, detect_format, FORMATS, IMPORTERS
+from Backend.pagination import keyset_paginate, MAX_PAGE_SIZE
 from Backend.models import User, UserOut, UserCreate, UserUpdate
 from Backend.models import Student, StudentOut, StudentCreate, StudentUpdate
 from Backend.models import AssignmentCreate, StudentAssignment, Positions
-from typing import List
+from typing import List, Optional
 
 ## HTTP status codes
 ## https://developer.mozilla.org/en-US/docs/Web/HTTP/Reference/Status
@@ -16,16 +23,33 @@ router = APIRouter(prefix="/admin", tags=["Admin"])
 
 
 ## Users display (multiple)
-@router.get("/users", response_model=List[UserOut])
-def get_users(status: bool = True, db: Session = Depends(get_db)):
+## /users?limit=50                      → first page, X-Next-Cursor header holds the next cursor
+## /users?limit=50&cursor=<cursor>      → next page
+## /users?fields=UserId,Email           → only those columns
+@router.get("/users", response_model=List[UserOut], dependencies=[conditional("Users")])
+def get_users(
+    response: Response,
+    status: bool = True,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
     # status is a boolean filter for active users (default True)
-    users = db.query(User).filter(User.IsActive == status).all()
-    return users                                                 ## Active and inactive
+    return keyset_paginate(                                      ## Active and inactive
+        db, User, [User.IsActive == status], [User.UserId],
+        response=response,
+        count_key=("Users", status),
+        cursor=cursor,
+        limit=limit,
+        fields=fields,
+        allowed_fields=["UserId", *UserOut.model_fields],
+    )
     
 ## User display (one)
-@router.get("/users/{user_id}", response_model=UserOut)
+@router.get("/users/{user_id}", response_model=UserOut, dependencies=[conditional("Users")])
 def get_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.UserId == user_id).first()
+    user = user_cache.load(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User Not Found")
     return user
@@ -49,6 +73,7 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    count_cache.invalidate("Users")
 
     return new_user
 
@@ -66,6 +91,8 @@ def update_user(user_id: int, update_data: UserUpdate, db: Session = Depends(get
 
     db.commit()
     db.refresh(user)
+    count_cache.invalidate("Users")
+    user_cache.invalidate(user_id)
     return user
 
 ## Deleting a user
@@ -79,22 +106,39 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
     user.IsActive = False
 
     db.commit()
+    count_cache.invalidate("Users")
+    user_cache.invalidate(user_id)
     return
 
 
 ## /students                → Active students only (default)
 ## /students?status=all     → All students
 ## /students?status=Inactive → Only inactive students
+## /students?limit=50&cursor=<cursor>&fields=StudentId,LastName → keyset paging on StudentId
 ## Get Students (multiple)
-@router.get("/students", response_model=list[StudentOut])
-def get_students(status: str = "Active", db: Session = Depends(get_db)):
-    students = db.query(Student).filter(Student.Status.ilike(status)).all() ## Status can be called to allow filtering between
-    return students                                                         ## Active, Inactive, and OnLeave
+@router.get("/students", response_model=list[StudentOut], dependencies=[conditional("Students")])
+def get_students(
+    response: Response,
+    status: str = "Active",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    return keyset_paginate(
+        db, Student, [Student.Status.ilike(status)], [Student.StudentId], ## Status can be called to allow filtering between
+        response=response,                                                ## Active, Inactive, and OnLeave
+        count_key=("Students", status.lower()),
+        cursor=cursor,
+        limit=limit,
+        fields=fields,
+        allowed_fields=["StudentId", *StudentOut.model_fields],
+    )
 
 ## Get a student (one)
-@router.get("/student/{student_id}", response_model=StudentOut)
+@router.get("/student/{student_id}", response_model=StudentOut, dependencies=[conditional("Students")])
 def get_student(student_id: int, db: Session = Depends(get_db)):
-    student = db.query(Student).filter(Student.StudentId == student_id).first()
+    student = student_cache.load(db, student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Student Not Found.")
     return student
@@ -115,11 +159,47 @@ def create_student(data: StudentCreate, db: Session = Depends(get_db)):
     )
 
     db.add(student)
-    db.commit()
+    with metrics_cache.writing():
+        db.commit()
+        metrics_cache.student_added(data.GPA)
     db.refresh(student)
+    count_cache.invalidate("Students")
 
     return student
 
+## Bulk import (CSV or NDJSON upload, one record per row/line)
+## /import/students              → upsert on UniversityId
+## /import/users                 → upsert on Email
+## /import/students?dry_run=true → validate only, nothing is written
+## Columns/keys are the StudentCreate / UserCreate fields; see Backend/importer.py
+@router.post("/import/{kind}")
+def bulk_import(
+    kind: str,
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+):
+    if kind not in IMPORTERS:
+        raise HTTPException(status_code=404, detail=f"Can only import {sorted(IMPORTERS)}.")
+    fmt = format or detect_format(file.filename, file.content_type)
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(FORMATS)}")
+
+    try:
+        report = import_records(db, kind, file.file, fmt, dry_run=dry_run)
+    finally:
+        if not dry_run:
+            # chunks are committed as they go, so drop caches even after an error
+            if kind == "students":
+                count_cache.invalidate("Students")
+                student_cache.invalidate()
+                metrics_cache.invalidate()
+            else:
+                count_cache.invalidate("Users")
+                user_cache.invalidate()
+    return report
+
 ## Update a student
 @router.put("/students/{student_id}", response_model=StudentOut)
 def update_student(student_id: int, data: StudentUpdate, db: Session = Depends(get_db)):
@@ -130,11 +210,17 @@ def update_student(student_id: int, data: StudentUpdate, db: Session = Depends(g
     if not student:
         raise HTTPException(status_code=404, detail="Student not found.")
     
+    old_gpa = student.GPA
     for key, value in update_dict.items():
         setattr(student, key, value)
 
-    db.commit()
+    new_gpa = student.GPA
+    with metrics_cache.writing():
+        db.commit()
+        metrics_cache.student_gpa_changed(old_gpa, new_gpa)
     db.refresh(student)
+    count_cache.invalidate("Students")
+    student_cache.invalidate(student_id)
     return student
 
 ## Delete a student
@@ -149,16 +235,16 @@ def delete_student(student_id: int, db: Session = Depends(get_db)):
     student.Status = "Gone"
 
     db.commit()
+    count_cache.invalidate("Students")
+    student_cache.invalidate(student_id)
     return
 
 ## Get all dashboard metrics
 ## Recent Students can be added in the frontend
 ## Add an attendance average to the students? 
+## Served from metrics_cache (Backend/cache.py); only a cache miss queries the DB
 @router.get("/dashboard/metrics")
 def get_dashboard_metrics(db: Session = Depends(get_db)):
-    today = datetime.utcnow()
-    total_students = db.query(Student).count()
-    total_assignments = db.query(StudentAssignment).count()
 
     ## Active term functionality
     ##active_term = db.query(Cohort).filter(
@@ -166,40 +252,60 @@ def get_dashboard_metrics(db: Session = Depends(get_db)):
     ##  Cohort.EndDate >= today
     ##).count
 
-    avg_gpa = db.query(func.avg(Student.GPA)).scalar()
-    avg_gpa = round(avg_gpa, 2) if avg_gpa is not None else 0.0
-
-    return{
-        "total_students": total_students,
-        "total_assignments": total_assignments,
-        "average_gpa": avg_gpa
-    }
+    def load_totals():
+        # one round-trip for all three aggregates
+        row = db.query(
+            db.query(func.count(Student.StudentId)).scalar_subquery(),
+            db.query(func.count(StudentAssignment.AssignmentId)).scalar_subquery(),
+            db.query(func.coalesce(func.sum(Student.GPA), 0.0)).scalar_subquery(),
+            db.query(func.count(Student.GPA)).scalar_subquery(),
+        ).one()
+        return {
+            "total_students": row[0],
+            "total_assignments": row[1],
+            "gpa_sum": row[2],
+            "gpa_count": row[3],
+        }
+
+    return metrics_cache.get(load_totals)
+
+## Entity cache (Student/User/Position lookups by id) hit/miss counters, see Backend/entity_cache.py
+@router.get("/cache/stats")
+def get_entity_cache_stats():
+    return cache_stats()
+
+## Dashboard cache hit/miss counters
+@router.get("/dashboard/metrics/cache")
+def get_dashboard_metrics_cache():
+    return metrics_cache.stats()
 
 ## Get Admin logs
 
 ## Assign a teacher to a student
 @router.post("/assign", status_code=201)
 def assign_teacher(data: AssignmentCreate, db: Session = Depends(get_db)):
-    student = db.query(Student).filter(Student.StudentId == data.StudentId).first()
+    student = student_cache.get(db, data.StudentId)
     # AssignmentCreate provides UserId as the instructor's user id
-    instructor = db.query(User).filter(
-        User.UserId == data.UserId,
-        User.Role == "INSTRUCTOR"
-        ).first()
+    instructor = user_cache.get(db, data.UserId)
 
     if not student: 
         raise HTTPException(status_code=404, detail="Student not found.")
-    if not instructor:
+    if not instructor or instructor["Role"] != "INSTRUCTOR":
         raise HTTPException(status_code=404, detail="Instrustor not found.")
 
     assignment = StudentAssignment(
         StudentId = data.StudentId,
         UserId = data.UserId,
+        PositionId = data.PositionId,
         IsActive = True
     )
 
     db.add(assignment)
-    db.commit()
+    with metrics_cache.writing():
+        db.commit()
+        metrics_cache.assignment_added()
     db.refresh(assignment)
+    refresh_site_index(db)
+    live_hub.assignment_added(data.UserId, data.StudentId)
     return assignment
 
@@ -0,0 +1,132 @@
+"""Async versions of the hot routes, used when STUDENT_TRACKER_DB_ASYNC=true.
+
+main.py includes this router before the sync ones, so these handlers
+answer the same paths and the sync handlers stay in place as the default.
+They run on the event loop with an AsyncSession (aiosqlite) instead of
+taking a thread-pool worker per request. The shared sync helpers
+(record_check_in, current_locations, keyset_paginate) run unchanged
+through AsyncSession.run_sync, on the session's own aiosqlite connection,
+and the ETag check is conditional_async(), so no request here touches the
+sync engine.
+"""
+from datetime import datetime, time
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from Backend.conditional import conditional_async, PRIVATE_SHORT
+from Backend.db import get_async_db
+from Backend.fastjson import FAST_JSON, rows_response
+from Backend.ingest import batcher, IngestQueueFull
+from Backend.locations import bounding_box, current_locations
+from Backend.models import AttendanceCreate, Student, StudentLocationOut, StudentOut
+from Backend.pagination import keyset_paginate, MAX_PAGE_SIZE
+from Backend.routes.positions import POSITION_COLUMNS
+from Backend.routes.student import record_check_in
+
+router = APIRouter()
+
+
+# ---------------------------------------------------------
+# Checkin/location (student.check_in_with_location)
+# ---------------------------------------------------------
+# the write itself is student.record_check_in, run through run_sync
+@router.post("/student/checkin/location", status_code=201, tags=["Student"])
+async def check_in_with_location_async(payload: AttendanceCreate, db: AsyncSession = Depends(get_async_db)):
+    if batcher.running:
+        args = (payload.StudentId, payload.Status if payload.Status else "PRESENT", payload.Lat, payload.Lng)
+        try:
+            if batcher.overflow == "block":
+                # waiting for room in the queue must not stall the event loop
+                ticket = await run_in_threadpool(batcher.submit, *args)
+            else:
+                ticket = batcher.submit(*args)
+        except IngestQueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Check-in queue is full, try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+        return JSONResponse(status_code=202, content={"ticket": ticket, "status": "queued"})
+
+    return await db.run_sync(record_check_in, payload)
+
+
+# ---------------------------------------------------------
+# Map (teacher.get_today_locations)
+# ---------------------------------------------------------
+@router.get("/teacher/locations/today", response_model=list[StudentLocationOut], tags=["Teacher"])
+async def get_today_locations_async(
+    min_lat: Optional[float] = None,
+    min_lng: Optional[float] = None,
+    max_lat: Optional[float] = None,
+    max_lng: Optional[float] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    start_of_day = datetime.combine(datetime.utcnow().date(), time.min)
+
+    bbox = bounding_box(min_lat, min_lng, max_lat, max_lng)
+
+    rows = await db.run_sync(current_locations, start_of_day, bbox)
+    return [
+        StudentLocationOut(
+            StudentId=r.StudentId,
+            FirstName=r.FirstName,
+            LastName=r.LastName,
+            Lat=r.Lat,
+            Lng=r.Lng,
+            CheckInTime=r.CheckInTime,
+        )
+        for r in rows
+    ]
+
+
+# ---------------------------------------------------------
+# Listings (admin.get_students, teacher.get_students, positions.get_positions)
+# ---------------------------------------------------------
+async def _student_page(db: AsyncSession, response: Response, status: str, order_by: list, limit, cursor, fields):
+    return await db.run_sync(
+        lambda session: keyset_paginate(
+            session, Student, [Student.Status.ilike(status)], order_by,
+            response=response,
+            count_key=("Students", status.lower()),
+            cursor=cursor,
+            limit=limit,
+            fields=fields,
+            allowed_fields=["StudentId", *StudentOut.model_fields],
+        )
+    )
+
+
+@router.get("/admin/students", response_model=list[StudentOut], tags=["Admin"], dependencies=[conditional_async("Students")])
+async def get_students_admin_async(
+    response: Response,
+    status: str = "Active",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await _student_page(db, response, status, [Student.StudentId], limit, cursor, fields)
+
+
+@router.get("/teacher/students", response_model=list[StudentOut], tags=["Teacher"], dependencies=[conditional_async("Students")])
+async def get_students_teacher_async(
+    response: Response,
+    status: str = "Active",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await _student_page(db, response, status, [Student.LastName, Student.StudentId], limit, cursor, fields)
+
+
+@router.get("/positions/", response_model=List[dict], tags=["Positions"], dependencies=[conditional_async("Positions", cache_control=PRIVATE_SHORT)])
+async def get_positions_async(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(*POSITION_COLUMNS))
+    if FAST_JSON:
+        return rows_response(result)
+    return [dict(r) for r in result.mappings()]
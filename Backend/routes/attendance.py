@@ -1,8 +1,14 @@
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from ..db import get_db
-from Backend.models import Student, Attendance
+from Backend.archive import check_writable, read_source
+from Backend.entity_cache import student_cache
+from Backend.fastjson import FAST_JSON, rows_response
+from Backend.models import Attendance
+from Backend.rollups import refresh_days
+from Backend.live import live_hub
 
 # router setup
 router = APIRouter(prefix="/attendance", tags=["Attendance"])
@@ -23,7 +29,7 @@ def check_in(payload: dict, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="StudentId is required.")
 
     # make sure student exists
-    student = db.query(Student).filter(Student.StudentId == student_id).first()
+    student = student_cache.get(db, student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found.")
 
@@ -34,6 +40,8 @@ def check_in(payload: dict, db: Session = Depends(get_db)):
         IsApproved=False,
     )
     db.add(record)
+    db.flush()
+    refresh_days(db, [(record.StudentId, record.CheckInUtc)])
     db.commit()
     db.refresh(record)
 
@@ -56,8 +64,16 @@ def check_out(attendance_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Attendance record not found.")
 
     record.CheckOutUtc = datetime.utcnow()
+    db.flush()
+    check_writable(db, [record.CheckInUtc])
+    refresh_days(db, [(record.StudentId, record.CheckInUtc)])
     db.commit()
     db.refresh(record)
+    live_hub.publish("checkout", {
+        "AttendanceId": record.AttendanceId,
+        "StudentId": record.StudentId,
+        "CheckOutUtc": record.CheckOutUtc,
+    })
 
     return {
         "AttendanceId": record.AttendanceId,
@@ -78,8 +94,16 @@ def approve(attendance_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Attendance record not found.")
 
     record.IsApproved = True
+    db.flush()
+    check_writable(db, [record.CheckInUtc])
+    refresh_days(db, [(record.StudentId, record.CheckInUtc)])
     db.commit()
     db.refresh(record)
+    live_hub.publish("approved", {
+        "AttendanceId": record.AttendanceId,
+        "StudentId": record.StudentId,
+        "IsApproved": True,
+    })
 
     return {
         "AttendanceId": record.AttendanceId,
@@ -95,7 +119,19 @@ def get_student_attendance(student_id: int, db: Session = Depends(get_db)):
     """
     Get all attendance records for a given student.
     """
-    records = db.query(Attendance).filter(Attendance.StudentId == student_id).all()
+    # all time: archived terms included, see Backend/archive.py
+    src = read_source(db, Attendance)
+    stmt = select(
+        src.c.AttendanceId,
+        src.c.StudentId,
+        src.c.CheckInUtc,
+        src.c.CheckOutUtc,
+        src.c.IsApproved,
+    ).where(src.c.StudentId == student_id).order_by(src.c.CheckInUtc)
+    if FAST_JSON:
+        return rows_response(db.execute(stmt))
+
+    records = db.execute(stmt).all()
     return [
         {
             "AttendanceId": r.AttendanceId,
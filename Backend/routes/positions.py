@@ -1,19 +1,34 @@
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List
 
+from Backend.conditional import conditional, PRIVATE_SHORT
 from Backend.db import get_db
+from Backend.entity_cache import position_cache
+from Backend.fastjson import FAST_JSON, rows_response
+from Backend.geofence import refresh_site_index
 from Backend.models import Positions, PositionCreate, PositionUpdate
 
 router = APIRouter(prefix="/positions", tags=["Positions"])
 
+# the fields of a position in API responses, in response order
+POSITION_COLUMNS = [
+    Positions.PositionId, Positions.Title, Positions.Company, Positions.SiteLocation,
+    Positions.SupervisorName, Positions.SupervisorEmail, Positions.TermStart, Positions.TermEnd,
+    Positions.SiteLat, Positions.SiteLng, Positions.SiteRadiusM, Positions.CreatedAtUtc,
+]
+
 
 # ---------------------------------------------------------
 # GET ALL POSITIONS
 # ---------------------------------------------------------
-@router.get("/", response_model=List[dict])
+@router.get("/", response_model=List[dict], dependencies=[conditional("Positions", cache_control=PRIVATE_SHORT)])
 def get_positions(db: Session = Depends(get_db)):
+    if FAST_JSON:
+        return rows_response(db.execute(select(*POSITION_COLUMNS)))
+
     rows = db.query(Positions).all()
     return [
         {
@@ -25,6 +40,9 @@ def get_positions(db: Session = Depends(get_db)):
         "SupervisorEmail": r.SupervisorEmail,
         "TermStart": r.TermStart,
         "TermEnd": r.TermEnd,
+        "SiteLat": r.SiteLat,
+        "SiteLng": r.SiteLng,
+        "SiteRadiusM": r.SiteRadiusM,
         "CreatedAtUtc": r.CreatedAtUtc
         }
         for r in rows
@@ -34,22 +52,12 @@ def get_positions(db: Session = Depends(get_db)):
 # ---------------------------------------------------------
 # GET ONE POSITION
 # ---------------------------------------------------------
-@router.get("/{position_id}", response_model=dict)
+@router.get("/{position_id}", response_model=dict, dependencies=[conditional("Positions", cache_control=PRIVATE_SHORT)])
 def get_position(position_id: int, db: Session = Depends(get_db)):
-    pos = db.query(Positions).filter(Positions.PositionId == position_id).first()
+    pos = position_cache.load(db, position_id)
     if not pos:
         raise HTTPException(status_code=404, detail="Position not found.")
-    return {
-        "PositionId": pos.PositionId,
-        "Title": pos.Title,
-        "Company": pos.Company,
-        "SiteLocation": pos.SiteLocation,
-        "SupervisorName": pos.SupervisorName,
-        "SupervisorEmail": pos.SupervisorEmail,
-        "TermStart": pos.TermStart,
-        "TermEnd": pos.TermEnd,
-        "CreatedAtUtc": pos.CreatedAtUtc,
-    }
+    return {c.key: pos[c.key] for c in POSITION_COLUMNS}
 
 
 # ---------------------------------------------------------
@@ -65,11 +73,15 @@ def create_position(payload: PositionCreate, db: Session = Depends(get_db)):
         SupervisorEmail=payload.SupervisorEmail,
         TermStart=payload.TermStart,
         TermEnd=payload.TermEnd,
+        SiteLat=payload.SiteLat,
+        SiteLng=payload.SiteLng,
+        SiteRadiusM=payload.SiteRadiusM,
         CreatedAtUtc=datetime.utcnow(),
     )
     db.add(pos)
     db.commit()
     db.refresh(pos)
+    refresh_site_index(db)
     return {"detail": f"Position '{pos.Title}' created.", "PositionId": pos.PositionId}
 
 # ---------------------------------------------------------
@@ -88,6 +100,8 @@ def update_position(position_id: int, payload: PositionUpdate, db: Session = Dep
 
     db.commit()
     db.refresh(pos)
+    position_cache.invalidate(position_id)
+    refresh_site_index(db)
     return {"detail": f"Position {position_id} updated."}
 
 
@@ -101,3 +115,5 @@ def delete_position(position_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Position not found.")
     db.delete(pos)
     db.commit()
+    position_cache.invalidate(position_id)
+    refresh_site_index(db)
@@ -0,0 +1,33 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+from Backend.db import get_db
+from Backend.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from Backend.search import KINDS, match_expression, search
+
+router = APIRouter(tags=["Search"])
+
+## Search students, users, positions and feedback at once, best match first
+## /search?q=smi                                  → anything with a word starting with "smi"
+## /search?q=john smi&type=student&type=user&limit=10 → "john" and a word starting with "smi"
+## Queries with more than SEARCH_RANK_MAX_MATCHES hits come in id order, unranked (Score null).
+## Next page: the same request plus ?cursor=<X-Next-Cursor header of this one>
+@router.get("/search")
+def search_all(
+    response: Response,
+    q: str = Query(..., max_length=200),
+    type: Optional[List[str]] = Query(None),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    unknown = sorted(set(type or []) - set(KINDS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown type(s): {', '.join(unknown)}. Allowed: {', '.join(KINDS)}")
+    if match_expression(q) is None:
+        raise HTTPException(status_code=400, detail="q must contain a word of at least two characters.")
+
+    hits, next_cursor = search(db, q, type, limit=limit, cursor=cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return {"hits": hits}
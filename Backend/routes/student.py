@@ -1,7 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
 from ..db import get_db
+from Backend.cache import count_cache, metrics_cache
+from Backend.conditional import conditional
+from Backend.entity_cache import student_cache
+from Backend.ingest import batcher, IngestQueueFull
+from Backend.rollups import refresh_days
+from Backend.locations import record_locations
+from Backend.traces import thin
+from Backend.geofence import site_index
+from Backend.live import live_hub
 from Backend.models import Student, Attendance, AttendanceCreate, StudentLocation, StudentLocationCreate
 
 router = APIRouter(prefix="/student", tags=["Student"])
@@ -10,24 +20,24 @@ router = APIRouter(prefix="/student", tags=["Student"])
 # ---------------------------------------------------------
 # GET ONE STUDENT (PROFILE)
 # ---------------------------------------------------------
-@router.get("/profile/{student_id}", response_model=dict)
+@router.get("/profile/{student_id}", response_model=dict, dependencies=[conditional("Students")])
 def get_student(student_id: int, db: Session = Depends(get_db)):
-    student = db.query(Student).filter(Student.StudentId == student_id).first()
+    student = student_cache.load(db, student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found.")
 
     return {
-        "StudentId": student.StudentId,
-        "UniversityId": student.UniversityId,
-        "FirstName": student.FirstName,
-        "LastName": student.LastName,
-        "Email": student.Email,
-        "PhoneE164": student.PhoneE164,
-        "Program": student.Program,
-        "Year": student.Year,
-        "Status": student.Status,
-        "GPA": student.GPA,
-        "CreatedAtUtc": student.CreatedAtUtc,
+        "StudentId": student["StudentId"],
+        "UniversityId": student["UniversityId"],
+        "FirstName": student["FirstName"],
+        "LastName": student["LastName"],
+        "Email": student["Email"],
+        "PhoneE164": student["PhoneE164"],
+        "Program": student["Program"],
+        "Year": student["Year"],
+        "Status": student["Status"],
+        "GPA": student["GPA"],
+        "CreatedAtUtc": student["CreatedAtUtc"],
     }
 
 
@@ -40,59 +50,131 @@ def update_student(student_id: int, payload: dict, db: Session = Depends(get_db)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found.")
 
+    old_gpa = student.GPA
     for key, value in payload.items():
         # only update fields that actually exist on the model
         if hasattr(student, key) and value is not None:
             setattr(student, key, value)
 
-    db.commit()
+    new_gpa = student.GPA
+    with metrics_cache.writing():
+        db.commit()
+        metrics_cache.student_gpa_changed(old_gpa, new_gpa)
     db.refresh(student)
+    count_cache.invalidate("Students")
+    student_cache.invalidate(student_id)
     return {"detail": f"Student {student_id} updated."}
 
 # ---------------------------------------------------------
 # Checkin/location
 # ---------------------------------------------------------
-@router.post("/checkin/location", status_code=201)
-def check_in_with_location(payload: AttendanceCreate, db: Session = Depends(get_db)):
+def record_check_in(db: Session, payload: AttendanceCreate) -> dict:
     """
-    Student sends StudentId + Lat + Lng (and optional Status).
-    Creates an Attendance row with GPS coordinates.
+    Write one check-in and commit: the Attendance row, its StudentLocations
+    ping (unless thinned away), the day rollup and current location. Then
+    publish it to the live map. Returns the response body. Shared by this
+    route and the async one (async_routes, through AsyncSession.run_sync).
     """
-    student = (
-        db.query(Student)
-        .filter(Student.StudentId == payload.StudentId)
-        .first()
-    )
+    student = student_cache.get(db, payload.StudentId)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
 
     status_value = payload.Status if payload.Status else "PRESENT"
-    
+    site_index.ensure_current(db)
+    geo_status, geo_distance, geo_position = site_index.classify(payload.StudentId, payload.Lat, payload.Lng)
+    now = datetime.utcnow()
     attendance = Attendance(
         StudentId=payload.StudentId,
         Status=status_value,
+        CheckInUtc=now,
         Lat=payload.Lat,
         Lng=payload.Lng,
-        CreatedAtUtc=datetime.utcnow(),
+        GeoStatus=geo_status,
+        GeoDistanceM=geo_distance,
+        GeoPositionId=geo_position,
+        CreatedAtUtc=now,
     )
 
-    # Also insert into StudentLocations table for teacher map/locations
-    location = StudentLocation(
-        StudentId=payload.StudentId,
-        Lat=payload.Lat if payload.Lat is not None else 0.0,
-        Lng=payload.Lng if payload.Lng is not None else 0.0,
-        CheckInUtc=datetime.utcnow(),
-        CreatedAtUtc=datetime.utcnow(),
-    )
+    # Also insert into StudentLocations table for teacher map/locations,
+    # unless the ping adds nothing to the student's trace (Backend/traces.py)
+    location = None
+    ping = {"StudentId": payload.StudentId, "Lat": payload.Lat, "Lng": payload.Lng, "CheckInUtc": now}
+    if thin(db, [ping]):
+        location = StudentLocation(**ping, CreatedAtUtc=now)
 
     try:
         db.add(attendance)
-        db.add(location)
+        if location is not None:
+            db.add(location)
+        db.flush()
+        refresh_days(db, [(attendance.StudentId, now)])
+        record_locations(db, [{
+            "StudentId": attendance.StudentId,
+            "Lat": attendance.Lat,
+            "Lng": attendance.Lng,
+            "AttendanceId": attendance.AttendanceId,
+            "UpdatedAtUtc": now,
+        }])
+        # read before commit: the sync session expires objects on commit
+        result = {
+            "attendance_id": attendance.AttendanceId,
+            "location_id": location.StudentLocationId if location is not None else None,
+            "geo_status": geo_status,
+            "geo_distance_m": geo_distance,
+        }
         db.commit()
-        db.refresh(attendance)
-        db.refresh(location)
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-    return {"attendance_id": attendance.AttendanceId, "location_id": location.StudentLocationId}
\ No newline at end of file
+    if payload.Lat is not None and payload.Lng is not None:
+        live_hub.publish("location", {
+            "StudentId": payload.StudentId,
+            "FirstName": student["FirstName"],
+            "LastName": student["LastName"],
+            "Lat": payload.Lat,
+            "Lng": payload.Lng,
+            "CheckInTime": now,
+            "AttendanceId": result["attendance_id"],
+            "GeoStatus": geo_status,
+        })
+    return result
+
+
+@router.post("/checkin/location", status_code=201)
+def check_in_with_location(payload: AttendanceCreate, db: Session = Depends(get_db)):
+    """
+    Student sends StudentId + Lat + Lng (and optional Status).
+    Creates an Attendance row with GPS coordinates.
+
+    In batched mode (STUDENT_TRACKER_CHECKIN_MODE=batched) the check-in is
+    queued instead and the response is 202 with a ticket, see Backend/ingest.py.
+    """
+    if batcher.running:
+        try:
+            ticket = batcher.submit(
+                payload.StudentId,
+                payload.Status if payload.Status else "PRESENT",
+                payload.Lat,
+                payload.Lng,
+            )
+        except IngestQueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Check-in queue is full, try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+        return JSONResponse(status_code=202, content={"ticket": ticket, "status": "queued"})
+
+    return record_check_in(db, payload)
+
+
+# ---------------------------------------------------------
+# Checkin ticket status (batched mode)
+# ---------------------------------------------------------
+@router.get("/checkin/ticket/{ticket}")
+def get_checkin_ticket(ticket: str):
+    result = batcher.ticket_status(ticket)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Ticket not found or expired.")
+    return {"ticket": ticket, **result}
\ No newline at end of file
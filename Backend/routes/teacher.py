@@ -1,14 +1,27 @@
+import asyncio
 from datetime import datetime, date, time
 import shutil
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from sqlalchemy.exc import OperationalError
-from ..db import get_db                   
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, text
+from ..db import get_db, SessionLocal                   
 from Backend.models import User, UserOut, UserCreate, UserUpdate 
-from Backend.models import StudentOut, StudentCreate, Student, Attendance, StudentLocationOut, StudentLocation       
-from typing import List
-from Backend.db import engine
+from Backend.models import StudentOut, StudentCreate, Student, Attendance, StudentLocationOut, StudentLocation, AttendanceSheet, AttendanceApproval       
+from Backend.rollups import refresh_days, daily_range
+from Backend.sheets import save_sheet, unknown_students
+from Backend.approvals import approve_attendance
+from Backend.archive import check_writable, read_source
+from Backend.hours import hours_for_range
+from Backend.locations import bounding_box, current_locations
+from Backend.traces import trace_points
+from Backend.live import live_hub, teacher_student_ids, format_event, LIVE_HEARTBEAT_S
+from typing import List, Optional
+from Backend.pagination import keyset_paginate, MAX_PAGE_SIZE
+from Backend.export import stream_attendance, MEDIA_TYPES
+from Backend.fastjson import FAST_JSON, rows_response
+from Backend.conditional import conditional
 
 router = APIRouter(prefix="/teacher", tags=["Teacher"])
 
@@ -16,10 +29,25 @@ router = APIRouter(prefix="/teacher", tags=["Teacher"])
 
 
 ## Get a student
-@router.get("/students", response_model=list[StudentOut])
-def get_students(status: str = "Active", db: Session = Depends(get_db)):
-    students = db.query(Student).filter(Student.Status.ilike(status)).all() ## Status can be called to allow filtering between
-    return students 
+## Paged alphabetically: keyset on (LastName, StudentId), see Backend/pagination.py
+@router.get("/students", response_model=list[StudentOut], dependencies=[conditional("Students")])
+def get_students(
+    response: Response,
+    status: str = "Active",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    return keyset_paginate(
+        db, Student, [Student.Status.ilike(status)], [Student.LastName, Student.StudentId], ## Status can be called to allow filtering between
+        response=response,
+        count_key=("Students", status.lower()),
+        cursor=cursor,
+        limit=limit,
+        fields=fields,
+        allowed_fields=["StudentId", *StudentOut.model_fields],
+    )
 
 ## post feeback for a student
 @router.post("/feedback/student/{student_id}")
@@ -72,6 +100,81 @@ def get_time_clock(db: Session = Depends(get_db)):
     ).fetchall()
     return {"active_punches": [dict(row._mapping) for row in result]}
 
+## Export attendance for a date range (streamed, constant memory)
+## /attendance/export?from=2025-01-01&to=2025-05-31&format=csv
+## /attendance/export?format=ndjson&student_id=7
+## Declared before /attendance/{date} so "export" is not parsed as a date
+@router.get("/attendance/export")
+def export_attendance(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    format: str = "csv",
+    student_id: Optional[int] = None,
+):
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(MEDIA_TYPES)}")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'.")
+
+    filename = f"attendance_{date_from or 'start'}_{date_to or 'now'}.{format}"
+    return StreamingResponse(
+        stream_attendance(format, date_from, date_to, student_id),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+## Daily attendance rollup for a date range (one row per student per day)
+## /attendance/daily?from=2025-01-06&to=2025-05-09&student_id=3
+@router.get("/attendance/daily")
+def get_attendance_daily(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    student_id: Optional[List[int]] = Query(None),
+    db: Session = Depends(get_db),
+):
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'.")
+    rows = daily_range(db, date_from, date_to, student_id)
+    return {"days": [
+        {
+            "StudentId": r.StudentId,
+            "Day": r.Day,
+            "Status": r.Status,
+            "FirstCheckInUtc": r.FirstCheckInUtc,
+            "LastCheckOutUtc": r.LastCheckOutUtc,
+            "IsApproved": r.IsApproved,
+            "WorkedMinutes": r.WorkedMinutes,
+            "SessionCount": r.SessionCount,
+            "OpenSessions": r.OpenSessions,
+        }
+        for r in rows
+    ]}
+
+## Hours worked for a cohort (or the given students) in a date range
+## /hours?from=2025-01-06&to=2025-05-09                     → every student with sessions
+## /hours?from=...&to=...&student_id=3&student_id=8&include_days=true
+@router.get("/hours")
+def get_hours(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    student_id: Optional[List[int]] = Query(None),
+    include_days: bool = False,
+    db: Session = Depends(get_db),
+):
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'.")
+    totals = hours_for_range(db, date_from, date_to, student_id, include_days=include_days)
+
+    # requested students without any sessions still get a zero row
+    for sid in student_id or []:
+        totals.setdefault(sid, {"total_hours": 0.0, "open_sessions": 0, "weeks": []})
+
+    return {
+        "from": date_from,
+        "to": date_to,
+        "students": [{"StudentId": sid, **totals[sid]} for sid in sorted(totals)],
+    }
+
 ## Get attendance sheet for specified time
 @router.get("/attendance/{date}")
 def get_attendance_sheet(date: str, db: Session = Depends(get_db)):
@@ -84,11 +187,21 @@ def get_attendance_sheet(date: str, db: Session = Depends(get_db)):
     start = datetime.combine(qdate, time.min)
     end = datetime.combine(qdate, time.max)
 
-    rows = (
-        db.query(Attendance)
-        .filter(Attendance.CheckInUtc >= start, Attendance.CheckInUtc <= end)
-        .all()
-    )
+    # days of archived terms are read from the archive, see Backend/archive.py
+    src = read_source(db, Attendance, start)
+    stmt = select(
+        src.c.AttendanceId,
+        src.c.StudentId,
+        src.c.CheckInUtc,
+        src.c.CheckOutUtc,
+        src.c.IsApproved,
+        src.c.Lat,
+        src.c.Lng,
+    ).where(src.c.CheckInUtc >= start, src.c.CheckInUtc <= end)
+    if FAST_JSON:
+        return rows_response(db.execute(stmt), envelope="attendance")
+
+    rows = db.execute(stmt).all()
 
     return {"attendance": [
         {
@@ -104,18 +217,26 @@ def get_attendance_sheet(date: str, db: Session = Depends(get_db)):
     ]}
 
 ## post attendance sheet
+## { "Date": "2025-03-03", "students": [{"StudentId": 1, "Status": "PRESENT"}, ...] }
+## Re-posting a sheet for the same day updates it, see Backend/sheets.py
 @router.post("/attendance")
-def post_attendance_sheet(data: dict, db: Session = Depends(get_db)):
+def post_attendance_sheet(sheet: AttendanceSheet, db: Session = Depends(get_db)):
+    # a student listed twice keeps the last status
+    statuses = {entry.StudentId: entry.Status for entry in sheet.students}
+    check_in = sheet.Date or datetime.utcnow()
+
+    missing = unknown_students(db, statuses)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Unknown StudentId(s): {sorted(missing)}")
     try:
-        for record in data.get("students", []):
-            att = Attendance(
-                StudentId=record["StudentId"],
-                Status=record.get("Status", "PRESENT"),
-                CheckInUtc=datetime.fromisoformat(data.get("Date")) if data.get("Date") else datetime.utcnow(),
-            )
-            db.add(att)
+        created, updated = save_sheet(db, statuses, check_in)
+        check_writable(db, [check_in])
+        refresh_days(db, [(student_id, check_in) for student_id in statuses])
         db.commit()
-        return {"message": "Attendance sheet saved successfully."}
+        return {"message": "Attendance sheet saved successfully.", "created": created, "updated": updated}
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -128,8 +249,14 @@ def update_attendance(attendance_id: int, status: str, db: Session = Depends(get
         if not record:
             raise HTTPException(status_code=404, detail="Attendance record not found.")
         record.Status = status
+        db.flush()
+        check_writable(db, [record.CheckInUtc])
+        refresh_days(db, [(record.StudentId, record.CheckInUtc)])
         db.commit()
         return {"message": f"Attendance record {attendance_id} updated."}
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -137,13 +264,13 @@ def update_attendance(attendance_id: int, status: str, db: Session = Depends(get
 ## get a check in
 @router.get("/check_in/{student_id}")
 def get_check_in(student_id: int, db: Session = Depends(get_db)):
-    # Return attendance records for the student (most recent first)
-    rows = (
-        db.query(Attendance)
-        .filter(Attendance.StudentId == student_id)
-        .order_by(Attendance.CheckInUtc.desc())
-        .all()
-    )
+    # Return attendance records for the student (most recent first), archived terms included
+    src = read_source(db, Attendance)
+    rows = db.execute(
+        select(src.c.AttendanceId, src.c.StudentId, src.c.CheckInUtc, src.c.IsApproved)
+        .where(src.c.StudentId == student_id)
+        .order_by(src.c.CheckInUtc.desc())
+    ).all()
     return {"checkins": [
         {
             "CheckInId": r.AttendanceId,
@@ -154,6 +281,41 @@ def get_check_in(student_id: int, db: Session = Depends(get_db)):
         for r in rows
     ]}
 
+## approve many check-ins in one request
+## { "AttendanceIds": [1, 2, 3] }
+## { "StudentId": 7, "DateFrom": "2025-03-03", "DateTo": "2025-03-07" }
+## { "PositionId": 2, "DateTo": "2025-03-07" }
+##   (check-ins at position 2, or without a site, of the students placed there)
+@router.put("/check_in/approve")
+def approve_check_ins(payload: AttendanceApproval, db: Session = Depends(get_db)):
+    filters = payload.model_dump(exclude_none=True)
+    if not filters:
+        raise HTTPException(status_code=400, detail="Give AttendanceIds or at least one filter.")
+    if payload.DateFrom and payload.DateTo and payload.DateFrom > payload.DateTo:
+        raise HTTPException(status_code=400, detail="DateFrom must not be after DateTo.")
+    try:
+        approved = approve_attendance(
+            db,
+            attendance_ids=payload.AttendanceIds,
+            student_id=payload.StudentId,
+            position_id=payload.PositionId,
+            date_from=payload.DateFrom,
+            date_to=payload.DateTo,
+        )
+        check_writable(db, [r["CheckInUtc"] for r in approved])
+        db.commit()
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+    live_hub.publish_many("approved", [
+        {"AttendanceId": r["AttendanceId"], "StudentId": r["StudentId"], "IsApproved": True}
+        for r in approved
+    ])
+    return {"approved": len(approved), "AttendanceIds": [r["AttendanceId"] for r in approved]}
+
 ## approve a check in
 @router.put("/check_in/{checkin_id}/approve")
 def approve_check_in(checkin_id: int, db: Session = Depends(get_db)):
@@ -162,8 +324,15 @@ def approve_check_in(checkin_id: int, db: Session = Depends(get_db)):
         if not record:
             raise HTTPException(status_code=404, detail="Check-in not found.")
         record.IsApproved = True
+        db.flush()
+        check_writable(db, [record.CheckInUtc])
+        refresh_days(db, [(record.StudentId, record.CheckInUtc)])
         db.commit()
+        live_hub.publish("approved", {"AttendanceId": record.AttendanceId, "StudentId": record.StudentId, "IsApproved": True})
         return {"message": f"Check-in {checkin_id} approved."}
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -189,108 +358,121 @@ def upload_resource(file: UploadFile = File(...), db: Session = Depends(get_db))
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     
-    ## get locations of students
+## get locations of students
+## /locations/today                                              → latest point per student today
+## /locations/today?min_lat=36.2&min_lng=-82.5&max_lat=36.4&max_lng=-82.2 → only inside the box
 @router.get("/locations/today", response_model=list[StudentLocationOut])
-def get_today_locations(db: Session = Depends(get_db)):
+def get_today_locations(
+    min_lat: Optional[float] = None,
+    min_lng: Optional[float] = None,
+    max_lat: Optional[float] = None,
+    max_lng: Optional[float] = None,
+    db: Session = Depends(get_db),
+):
     """
-    Returns latest attendance entries with location for today,
+    Returns the latest location of every student seen today,
     joined with student names, for the map view.
+    Served from StudentCurrentLocations (one row per student).
     """
-    today: date = datetime.utcnow().date()
-    start_of_day = datetime.combine(today, time.min)
-    end_of_day = datetime.combine(today, time.max)
+    start_of_day = datetime.combine(datetime.utcnow().date(), time.min)
+
+    bbox = bounding_box(min_lat, min_lng, max_lat, max_lng)
 
-    # Check the actual Attendance table schema — older DBs may not have Lat/Lng/StudentId
+    rows = current_locations(db, start_of_day, bbox)
+    return [
+        StudentLocationOut(
+            StudentId=r.StudentId,
+            FirstName=r.FirstName,
+            LastName=r.LastName,
+            Lat=r.Lat,
+            Lng=r.Lng,
+            CheckInTime=r.CheckInTime,
+        )
+        for r in rows
+    ]
+
+## track of one student over a time range, to draw the route on the map
+## /locations/trace/7                                            → today so far
+## /locations/trace/7?from=2025-03-03T08:00:00&to=2025-03-03T17:00:00
+## Past days come simplified from LocationTraces, see Backend/traces.py.
+@router.get("/locations/trace/{student_id}")
+def get_location_trace(
+    student_id: int,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    start = date_from or datetime.combine(datetime.utcnow().date(), time.min)
+    end = date_to or datetime.utcnow()
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'.")
+    return {
+        "StudentId": student_id,
+        "points": [{"Lat": lat, "Lng": lng, "CheckInTime": at} for at, lat, lng in trace_points(db, student_id, start, end)],
+    }
+
+
+## live map feed (Server-Sent Events)
+## /locations/stream?teacher_id=3   → only students assigned to instructor 3
+## First message is "snapshot" (same rows as /locations/today), then
+## "location", "approved" and "checkout" deltas, see Backend/live.py.
+## The stream holds no database session; these short reads open their own.
+def _assigned_students(teacher_id: int) -> set:
+    db = SessionLocal()
     try:
-        with engine.connect() as conn:
-            res = conn.execute("PRAGMA table_info('Attendance')")
-            cols = [row[1] for row in res.fetchall()]
-    except Exception:
-        cols = []
+        return teacher_student_ids(db, teacher_id)
+    finally:
+        db.close()
 
-    required = {"StudentId", "Lat", "Lng", "CreatedAtUtc"}
-    if not required.issubset(set(cols)):
-        # Attendance table lacks location columns — try StudentLocations table instead
-        try:
-            rows = (
-                db.query(
-                    StudentLocation.StudentId,
-                    Student.FirstName,
-                    Student.LastName,
-                    StudentLocation.Lat,
-                    StudentLocation.Lng,
-                    StudentLocation.CheckInUtc.label("CheckInTime"),
-                )
-                .join(Student, Student.StudentId == StudentLocation.StudentId)
-                .filter(
-                    StudentLocation.CheckInUtc >= start_of_day,
-                    StudentLocation.CheckInUtc <= end_of_day,
-                )
-                .all()
-            )
-        except Exception:
-            return []
-    else:
-        # Proceed with the normal query when columns exist
-        try:
-            rows = (
-                db.query(
-                    Attendance.StudentId,
-                    Student.FirstName,
-                    Student.LastName,
-                    Attendance.Lat,
-                    Attendance.Lng,
-                    Attendance.CreatedAtUtc.label("CheckInTime"),
-                )
-                .join(Student, Student.StudentId == Attendance.StudentId)
-                .filter(
-                    Attendance.CreatedAtUtc >= start_of_day,
-                    Attendance.CreatedAtUtc <= end_of_day,
-                    Attendance.Lat.isnot(None),
-                    Attendance.Lng.isnot(None),
-                )
-                .all()
-            )
-        except OperationalError:
-            # Defensive: if query fails, return empty list
-            return []
-
-    # Proceed with the normal query when columns exist
+
+def _load_snapshot(student_ids) -> list:
+    start_of_day = datetime.combine(datetime.utcnow().date(), time.min)
+    if student_ids is not None:
+        student_ids = list(student_ids)
+    db = SessionLocal()
     try:
-        rows = (
-            db.query(
-                Attendance.StudentId,
-                Student.FirstName,
-                Student.LastName,
-                Attendance.Lat,
-                Attendance.Lng,
-                Attendance.CreatedAtUtc.label("CheckInTime"),
-            )
-            .join(Student, Student.StudentId == Attendance.StudentId)
-            .filter(
-                Attendance.CreatedAtUtc >= start_of_day,
-                Attendance.CreatedAtUtc <= end_of_day,
-                Attendance.Lat.isnot(None),
-                Attendance.Lng.isnot(None),
-            )
-            .all()
-        )
-    except OperationalError:
-        # Defensive: if the Attendance table/schema doesn't match the model
-        # (e.g. missing StudentId/Lat/Lng columns), return empty list
-        return []
-
-    # Convert to pydantic-friendly objects
-    locations: list[StudentLocationOut] = []
-    for r in rows:
-        locations.append(
-            StudentLocationOut(
-                StudentId=r.StudentId,
-                FirstName=r.FirstName,
-                LastName=r.LastName,
-                Lat=r.Lat,
-                Lng=r.Lng,
-                CheckInTime=r.CheckInTime,
-            )
-        )
-    return locations
\ No newline at end of file
+        return [
+            StudentLocationOut.model_validate(r, from_attributes=True).model_dump(mode="json")
+            for r in current_locations(db, start_of_day, student_ids=student_ids)
+        ]
+    finally:
+        db.close()
+
+
+@router.get("/locations/stream")
+async def stream_locations(request: Request, teacher_id: Optional[int] = None):
+    student_ids = None
+    if teacher_id is not None:
+        student_ids = await run_in_threadpool(_assigned_students, teacher_id)
+    # subscribe before the snapshot so nothing written in between is lost
+    sub = live_hub.subscribe(teacher_id, student_ids)
+
+    async def events():
+        try:
+            yield format_event("snapshot", await run_in_threadpool(_load_snapshot, sub.student_ids))
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), LIVE_HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                if event is None:
+                    break
+                if sub.lagged:
+                    # events were dropped for this client: start over from a snapshot
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                    sub.lagged = False
+                    yield format_event("snapshot", await run_in_threadpool(_load_snapshot, sub.student_ids))
+                    continue
+                yield event
+        finally:
+            live_hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
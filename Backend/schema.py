@@ -0,0 +1,61 @@
+"""Compare an existing student_tracker.db with the SQLAlchemy models.
+
+`Base.metadata.create_all` only creates tables that are missing; it never
+touches a table that already exists, so indexes and nullable columns added
+to a model later are not created on old database files. The helpers here
+fill that gap; they are run by the sync_models migration
+(Backend/migrations/versions.py), not at request time.
+"""
+from sqlalchemy import inspect, text
+from Backend.db import Base
+from Backend import models  # noqa: F401  (registers the tables on Base.metadata)
+
+
+def table_columns(conn, table_name: str) -> set:
+    return {r[1] for r in conn.execute(text(f"PRAGMA table_info('{table_name}')")).fetchall()}
+
+
+def ensure_indexes(conn) -> list:
+    """
+    Create every model index that is missing from the database.
+    Indexes whose columns are not present (older schemas) are skipped.
+    Returns the names of the indexes that were created.
+    """
+    created = []
+    existing_tables = set(inspect(conn).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        cols = table_columns(conn, table.name)
+        existing = {ix["name"] for ix in inspect(conn).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if not {c.name for c in index.columns}.issubset(cols):
+                continue
+            index.create(conn, checkfirst=True)
+            created.append(index.name)
+    return created
+
+
+def ensure_columns(conn) -> list:
+    """
+    Add nullable model columns that are missing from existing tables
+    (ALTER TABLE ... ADD COLUMN). NOT NULL columns are left alone since
+    SQLite cannot add them without a default.
+    Returns "Table.Column" names that were added.
+    """
+    added = []
+    existing_tables = set(inspect(conn).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        cols = table_columns(conn, table.name)
+        for column in table.columns:
+            if column.name in cols or not column.nullable or column.primary_key:
+                continue
+            col_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}'))
+            added.append(f"{table.name}.{column.name}")
+    return added
+
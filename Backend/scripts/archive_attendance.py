@@ -0,0 +1,68 @@
+"""Move Attendance and StudentLocations rows of closed terms to the archive.
+
+Usage: run from repository root with the virtualenv active:
+  STUDENT_TRACKER_ARCHIVE_PATH=archive.db \
+  python -m Backend.scripts.archive_attendance (--before 2025-01-01 | --closed-terms) [--batch-size 10000] [--no-vacuum]
+  python -m Backend.scripts.archive_attendance --status
+
+Safe to run while the API is serving: rows are copied and deleted in short
+batches and reads switch to the archive in one step (see Backend/archive.py).
+An interrupted run is finished by running it again with the same cutoff.
+VACUUM at the end blocks writers for a while; pass --no-vacuum during the
+day and run it again later.
+"""
+import argparse
+import time
+from datetime import datetime
+from sqlalchemy import select
+from Backend.archive import ARCHIVE_BATCH_SIZE, archive_before, closed_terms_cutoff, compact
+from Backend.db import ARCHIVE_PATH, engine
+from Backend.migrations import migrate
+from Backend.models import ArchiveRun
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    which = parser.add_mutually_exclusive_group(required=True)
+    which.add_argument("--before", type=lambda s: datetime.strptime(s, "%Y-%m-%d"), help="archive rows checked in before this date")
+    which.add_argument("--closed-terms", action="store_true", help="archive everything before the oldest running term")
+    which.add_argument("--status", action="store_true", help="list the archive runs, change nothing")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="rows per transaction")
+    parser.add_argument("--no-vacuum", action="store_true", help="skip VACUUM (ANALYZE still runs)")
+    args = parser.parse_args()
+
+    if not ARCHIVE_PATH:
+        parser.error("set STUDENT_TRACKER_ARCHIVE_PATH to the archive database file")
+    migrate(engine)
+
+    if args.status:
+        with engine.connect() as conn:
+            runs = conn.execute(select(ArchiveRun).order_by(ArchiveRun.RunId)).all()
+        print(f"Archive: {ARCHIVE_PATH}")
+        for r in runs:
+            state = f"finished {r.FinishedAtUtc}" if r.FinishedAtUtc else "interrupted, run again"
+            print(f"  run {r.RunId}: before {r.CutoffUtc}  {r.AttendanceRows} attendance, {r.LocationRows} locations  {state}")
+        if not runs:
+            print("  nothing archived yet")
+        return
+
+    cutoff = args.before
+    if args.closed_terms:
+        with engine.connect() as conn:
+            cutoff = closed_terms_cutoff(conn)
+        if cutoff is None:
+            parser.error("no terms in Positions, pass --before instead")
+
+    started = time.perf_counter()
+    print(f"Archiving rows checked in before {cutoff} to {ARCHIVE_PATH}")
+    try:
+        result = archive_before(engine, cutoff, batch_size=args.batch_size, log=print)
+    except ValueError as exc:
+        parser.error(str(exc))
+    print(f"Moved {result['AttendanceRows']} attendance and {result['LocationRows']} location rows")
+    compact(engine, vacuum=not args.no_vacuum, log=print)
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,63 @@
 """Backfill historical location data into StudentLocations.
 
 Usage: run from repository root with the virtualenv active:
-  .\.venv\Scripts\Activate.ps1
-  python Backend\scripts\backfill_locations.py [--dry-run] [--csv output.csv] [--dedupe-window seconds]
+  python -m Backend.scripts.backfill_locations [--dry-run] [--csv output.csv] [--dedupe-window seconds]
+                                              [--chunk-size 20000] [--workers 4]
+                                              [--checkpoint file] [--restart]
 
 Options:
   --dry-run           : Do not insert rows; write candidate rows to CSV instead.
   --csv <file>        : CSV file path to write candidates when --dry-run is used (default: backfill_candidates.csv).
   --dedupe-window S   : Consider existing rows within S seconds as duplicates (default 0 = exact timestamp match).
+  --chunk-size N      : Source rows per chunk; each chunk is one INSERT ... SELECT in its own transaction.
+  --workers N         : Source tables processed at the same time (default 4).
+  --checkpoint <file> : Where the last finished chunk of every source table is recorded (JSON).
+  --restart           : Ignore an existing checkpoint and start from the first row.
+
+Every source table (Attendance, and any other table with StudentId or
+AssignmentId plus Lat/Lng) is read in rowid order, --chunk-size rows at a
+time. One SELECT per chunk does the set work in SQLite: candidates already
+in StudentLocations (same student, timestamp within the window) are
+dropped by a NOT EXISTS anti-join on IX_StudentLocations_StudentId_CheckInUtc,
+days already packed into LocationTraces by compact_locations by another
+on its primary key, and candidates of the same chunk that fall within the
+window of each other are collapsed with LAG() so only the earliest is
+kept. The rest go through the write-time thinning rule of
+Backend/traces.py (LOCATION_MIN_DISTANCE_M / LOCATION_HEARTBEAT_S), walked
+per student together with the rows already stored around them, so a
+rerun does not bring back the pings thin() left out at check-in time.
+
+After each chunk commits, the table's last rowid goes to the checkpoint
+file, so an interrupted run picks up where it stopped. A chunk that was
+committed just before a crash and is redone on resume inserts nothing: the
+anti-join sees its rows.
+
+Tables are independent and run on separate worker threads. Their reads
+overlap; SQLite still serializes the writes, so each chunk waits its turn
+for the write lock.
 
 This script is defensive: it will skip strategies that are not present in the database schema.
 """
 import argparse
 import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
-from Backend.db import engine, SessionLocal
-from Backend import models
-from datetime import datetime, timedelta
+from Backend.db import engine
+from Backend.migrations import migrate
+from Backend.schema import table_columns
+from Backend.traces import LOCATION_MIN_DISTANCE_M, worth_storing
 
-
-def table_columns(conn, table_name: str):
-    res = conn.execute(text(f"PRAGMA table_info('{table_name}')")).fetchall()
-    return [r[1] for r in res]
+# derived from the check-ins themselves, never a source of history
+SKIP_TABLES = ('Attendance', 'StudentLocations', 'StudentCurrentLocations')
+CSV_KEYS = ['source_table', 'source_id', 'StudentId', 'Lat', 'Lng', 'CheckInUtc']
+# workers queue on SQLite's single write lock; wait for it rather than fail
+WRITE_LOCK_WAIT_MS = 600000
 
 
 def find_tables_with_latlng(conn):
@@ -38,182 +73,280 @@ def find_tables_with_latlng(conn):
     return matches
 
 
-def is_duplicate(session, sid, when, window_seconds: int):
-    if window_seconds and window_seconds > 0:
-        start = when - timedelta(seconds=window_seconds)
-        end = when + timedelta(seconds=window_seconds)
-        exists = session.query(models.StudentLocation).filter(
-            models.StudentLocation.StudentId == sid,
-            models.StudentLocation.CheckInUtc >= start,
-            models.StudentLocation.CheckInUtc <= end,
-        ).first()
-    else:
-        exists = session.query(models.StudentLocation).filter(
-            models.StudentLocation.StudentId == sid,
-            models.StudentLocation.CheckInUtc == when,
-        ).first()
-    return exists is not None
+def normalized_ts(expr: str) -> str:
+    """
+    SQL for `expr` as 'YYYY-MM-DD HH:MM:SS.ffffff', the format SQLAlchemy
+    stores DateTime in, so string comparison against StudentLocations
+    matches time order. Older rows written as ISO strings ('T', fewer
+    fraction digits) are brought to the same shape; NULL or unparseable
+    values become :now.
+    """
+    return (
+        f"COALESCE(strftime('%Y-%m-%d %H:%M:%S', {expr}) || '.' || "
+        f"CASE WHEN substr({expr}, 20, 1) = '.' THEN substr(substr({expr}, 21, 6) || '000000', 1, 6) "
+        f"ELSE '000000' END, :now)"
+    )
+
 
+def shifted(ts: str, seconds: int) -> str:
+    """SQL for a normalized timestamp moved by whole seconds, fraction kept."""
+    if not seconds:
+        return ts
+    return f"(strftime('%Y-%m-%d %H:%M:%S', {ts}, '{seconds:+d} seconds') || substr({ts}, 20))"
 
-def collect_candidates_from_attendance(conn):
+
+def find_sources(conn):
+    """
+    One entry per table to backfill from: name, and the SELECT producing
+    its candidates (rowid, source_id, StudentId, Lat, Lng, CheckInUtc)
+    for the rows in (:after, :upto].
+    """
+    sources = []
     cols = table_columns(conn, 'Attendance')
-    candidates = []
-    if 'Lat' not in cols or 'Lng' not in cols:
-        return candidates
-
-    if 'StudentId' in cols:
-        rows = conn.execute(text("SELECT AttendanceId, StudentId, Lat, Lng, CreatedAtUtc FROM Attendance WHERE Lat IS NOT NULL AND Lng IS NOT NULL")).fetchall()
-        for r in rows:
-            m = r._mapping
-            candidates.append({
-                'source_table': 'Attendance',
-                'source_id': m.get('AttendanceId'),
-                'StudentId': m.get('StudentId'),
-                'Lat': m.get('Lat'),
-                'Lng': m.get('Lng'),
-                'CheckInUtc': m.get('CreatedAtUtc') or datetime.utcnow(),
-            })
-        return candidates
-
-    if 'AssignmentId' in cols:
-        rows = conn.execute(text(
-            "SELECT a.AttendanceId, a.AssignmentId, a.Lat, a.Lng, a.CreatedAtUtc, sa.StudentId "
-            "FROM Attendance a JOIN StudentAssignments sa ON a.AssignmentId = sa.AssignmentId "
-            "WHERE a.Lat IS NOT NULL AND a.Lng IS NOT NULL"
-        )).fetchall()
-        for r in rows:
-            m = r._mapping
-            candidates.append({
-                'source_table': 'Attendance',
-                'source_id': m.get('AttendanceId'),
-                'StudentId': m.get('StudentId'),
-                'Lat': m.get('Lat'),
-                'Lng': m.get('Lng'),
-                'CheckInUtc': m.get('CreatedAtUtc') or datetime.utcnow(),
-            })
-    return candidates
-
-
-def collect_candidates_from_other_tables(conn):
-    matches = find_tables_with_latlng(conn)
-    candidates = []
-    for t, cols in matches:
-        if t in ('Attendance', 'StudentLocations'):
-            continue
+    if 'Lat' in cols and 'Lng' in cols:
         if 'StudentId' in cols:
-            rows = conn.execute(text(f"SELECT * FROM {t} WHERE Lat IS NOT NULL AND Lng IS NOT NULL")).fetchall()
-            for r in rows:
-                m = r._mapping
-                candidates.append({
-                    'source_table': t,
-                    'source_id': m.get(next(iter(m.keys()), None)),
-                    'StudentId': m.get('StudentId'),
-                    'Lat': m.get('Lat'),
-                    'Lng': m.get('Lng'),
-                    'CheckInUtc': m.get('CreatedAtUtc') or m.get('CheckInUtc') or datetime.utcnow(),
-                })
+            sources.append(('Attendance', _candidate_sql('Attendance', 'AttendanceId', ['CreatedAtUtc'], False)))
         elif 'AssignmentId' in cols:
-            rows = conn.execute(text(
-                f"SELECT t.*, sa.StudentId FROM {t} t JOIN StudentAssignments sa ON t.AssignmentId = sa.AssignmentId WHERE t.Lat IS NOT NULL AND t.Lng IS NOT NULL"
-            )).fetchall()
-            for r in rows:
-                m = r._mapping
-                candidates.append({
-                    'source_table': t,
-                    'source_id': m.get(next(iter(m.keys()), None)),
-                    'StudentId': m.get('StudentId'),
-                    'Lat': m.get('Lat'),
-                    'Lng': m.get('Lng'),
-                    'CheckInUtc': m.get('CreatedAtUtc') or m.get('CheckInUtc') or datetime.utcnow(),
-                })
-    return candidates
-
-
-def write_csv(candidates, csv_path):
-    if not candidates:
-        print("No candidate rows to write to CSV")
-        return
-    keys = ['source_table', 'source_id', 'StudentId', 'Lat', 'Lng', 'CheckInUtc']
-    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=keys)
-        writer.writeheader()
-        for c in candidates:
-            row = {k: c.get(k) for k in keys}
-            # format datetime
-            if isinstance(row.get('CheckInUtc'), datetime):
-                row['CheckInUtc'] = row['CheckInUtc'].isoformat()
-            writer.writerow(row)
-    print(f"Wrote {len(candidates)} candidate rows to {csv_path}")
-
-
-def perform_insert(candidates, session, dedupe_window):
-    inserted = 0
-    for c in candidates:
-        sid = c.get('StudentId')
-        if sid is None:
+            sources.append(('Attendance', _candidate_sql('Attendance', 'AttendanceId', ['CreatedAtUtc'], True)))
+
+    for t, cols in find_tables_with_latlng(conn):
+        if t in SKIP_TABLES:
             continue
-        when = c.get('CheckInUtc') or datetime.utcnow()
-        if isinstance(when, str):
-            try:
-                when = datetime.fromisoformat(when)
-            except Exception:
-                when = datetime.utcnow()
-
-        if is_duplicate(session, sid, when, dedupe_window):
+        # PRAGMA order: the first column is the table's own id
+        first = conn.execute(text(f"PRAGMA table_info('{t}')")).fetchone()[1]
+        ts_cols = [c for c in ('CreatedAtUtc', 'CheckInUtc') if c in cols]
+        if 'StudentId' in cols:
+            sources.append((t, _candidate_sql(t, first, ts_cols, False)))
+        elif 'AssignmentId' in cols:
+            sources.append((t, _candidate_sql(t, first, ts_cols, True)))
+    return sources
+
+
+def _candidate_sql(table: str, id_col: str, ts_cols, via_assignment: bool) -> str:
+    raw_ts = f"COALESCE({', '.join(f't.{c}' for c in ts_cols)})" if len(ts_cols) > 1 else (
+        f"t.{ts_cols[0]}" if ts_cols else "NULL"
+    )
+    student = "sa.StudentId" if via_assignment else "t.StudentId"
+    join = "JOIN StudentAssignments sa ON t.AssignmentId = sa.AssignmentId " if via_assignment else ""
+    return (
+        f"SELECT t.rowid AS _rowid, t.{id_col} AS source_id, {student} AS StudentId, t.Lat AS Lat, t.Lng AS Lng, "
+        f"{normalized_ts(raw_ts)} AS CheckInUtc "
+        f"FROM {table} t {join}"
+        f"WHERE t.rowid > :after AND t.rowid <= :upto "
+        f"AND t.Lat IS NOT NULL AND t.Lng IS NOT NULL AND {student} IS NOT NULL"
+    )
+
+
+INSERT_SQL = (
+    "INSERT INTO StudentLocations (StudentId, Lat, Lng, CheckInUtc, CreatedAtUtc) "
+    "VALUES (:StudentId, :Lat, :Lng, :CheckInUtc, :now)"
+)
+
+
+def select_sql(candidates: str, window: int) -> str:
+    """
+    One chunk's new candidates, by student and time. `prev` is the previous
+    candidate of the same student in the chunk; a candidate within the
+    window of it is a duplicate, as is one within the window of a row
+    already stored, or one on a day already packed into LocationTraces.
+    """
+    return (
+        "SELECT c.source_id, c.StudentId, c.Lat, c.Lng, c.CheckInUtc FROM ("
+        "  SELECT *, LAG(CheckInUtc) OVER (PARTITION BY StudentId ORDER BY CheckInUtc, _rowid) AS prev"
+        f"  FROM ({candidates})"
+        ") c "
+        f"WHERE (c.prev IS NULL OR c.prev < {shifted('c.CheckInUtc', -window)}) "
+        "AND NOT EXISTS (SELECT 1 FROM StudentLocations sl WHERE sl.StudentId = c.StudentId "
+        f"AND sl.CheckInUtc BETWEEN {shifted('c.CheckInUtc', -window)} AND {shifted('c.CheckInUtc', window)}) "
+        "AND NOT EXISTS (SELECT 1 FROM LocationTraces lt WHERE lt.StudentId = c.StudentId "
+        "AND lt.Day = date(c.CheckInUtc)) "
+        "ORDER BY c.StudentId, c.CheckInUtc"
+    )
+
+
+def stored_sql(candidates: str) -> str:
+    """
+    Rows already in StudentLocations the chunk's candidates are thinned
+    against: each student's last one before :lo, and all of [:lo, :hi].
+    """
+    students = f"SELECT DISTINCT StudentId FROM ({candidates})"
+    return (
+        "SELECT StudentId, Lat, Lng, CheckInUtc FROM StudentLocations WHERE StudentLocationId IN ("
+        "  SELECT (SELECT x.StudentLocationId FROM StudentLocations x WHERE x.StudentId = s.StudentId "
+        "          AND x.CheckInUtc < :lo ORDER BY x.CheckInUtc DESC LIMIT 1)"
+        f"  FROM ({students}) s) "
+        "UNION ALL "
+        "SELECT StudentId, Lat, Lng, CheckInUtc FROM StudentLocations "
+        f"WHERE StudentId IN ({students}) AND CheckInUtc BETWEEN :lo AND :hi"
+    )
+
+
+def chunk_rows(conn, candidates: str, window: int, params: dict) -> list:
+    """The candidates of one chunk to insert, after dedupe and thinning."""
+    rows = [dict(r._mapping) for r in conn.execute(text(select_sql(candidates, window)), params)]
+    if not rows or LOCATION_MIN_DISTANCE_M <= 0:
+        return rows
+    bounds = {"lo": min(r["CheckInUtc"] for r in rows), "hi": max(r["CheckInUtc"] for r in rows)}
+    stored = conn.execute(text(stored_sql(candidates)), {**params, **bounds})
+    # stored rows sort before candidates at the same time: they are kept already
+    timeline = sorted(
+        [(r.StudentId, r.CheckInUtc, 0, r._mapping) for r in stored]
+        + [(r["StudentId"], r["CheckInUtc"], 1, r) for r in rows],
+        key=lambda e: e[:3],
+    )
+    kept, last = [], {}
+    for student_id, at, is_candidate, r in timeline:
+        at = datetime.fromisoformat(at)
+        if is_candidate and not worth_storing(last.get(student_id), r["Lat"], r["Lng"], at):
             continue
+        if is_candidate:
+            kept.append(r)
+        last[student_id] = (r["Lat"], r["Lng"], at)
+    return kept
+
+
+def next_bound(conn, table: str, after: int, chunk_size: int):
+    """rowid ending the chunk that starts after `after`, None when the table is done."""
+    return conn.execute(
+        text(f"SELECT max(rowid) FROM (SELECT rowid FROM {table} WHERE rowid > :after ORDER BY rowid LIMIT :n)"),
+        {"after": after, "n": chunk_size},
+    ).scalar()
+
+
+class Checkpoint:
+    """Last finished rowid per source table, saved to a JSON file after every chunk."""
+
+    def __init__(self, path: str, restart: bool):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done = {}
+        if restart and os.path.exists(path):
+            os.remove(path)
+        elif os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.done = json.load(f)
+
+    def get(self, table: str) -> int:
+        return self.done.get(table, 0)
+
+    def set(self, table: str, rowid: int) -> None:
+        with self._lock:
+            self.done[table] = rowid
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.done, f)
+            os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
 
-        loc = models.StudentLocation(
-            StudentId=sid,
-            Lat=c.get('Lat') or 0.0,
-            Lng=c.get('Lng') or 0.0,
-            CheckInUtc=when,
-            CreatedAtUtc=datetime.utcnow(),
-        )
-        session.add(loc)
-        inserted += 1
-    session.commit()
+class Progress:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+
+    def report(self, table: str, scanned: int, total: int, inserted: int) -> None:
+        elapsed = time.perf_counter() - self.started
+        pct = 100.0 * scanned / total if total else 100.0
+        with self._lock:
+            print(f"  {table}: {scanned}/{total} rows ({pct:.1f}%), {inserted} inserted, {elapsed:.1f}s", flush=True)
+
+
+def backfill_table(table: str, candidates: str, args, checkpoint: Checkpoint, progress: Progress) -> int:
+    inserted = 0
+    with engine.connect() as conn:
+        conn.exec_driver_sql(f"PRAGMA busy_timeout = {WRITE_LOCK_WAIT_MS}")
+        after = checkpoint.get(table)
+        total = conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+        scanned = conn.execute(text(f"SELECT count(*) FROM {table} WHERE rowid <= :after"), {"after": after}).scalar()
+        while (upto := next_bound(conn, table, after, args.chunk_size)) is not None:
+            params = {"after": after, "upto": upto, "now": datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')}
+            # read and write in one transaction: BEGIN IMMEDIATE, so no other
+            # writer changes StudentLocations between the thinning and the insert
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            rows = chunk_rows(conn, candidates, args.dedupe_window, params)
+            if rows:
+                conn.execute(text(INSERT_SQL), [{**r, "now": params["now"]} for r in rows])
+                inserted += len(rows)
+            conn.commit()
+            checkpoint.set(table, upto)
+            scanned += conn.execute(
+                text(f"SELECT count(*) FROM {table} WHERE rowid > :after AND rowid <= :upto"),
+                {"after": after, "upto": upto},
+            ).scalar()
+            after = upto
+            progress.report(table, scanned, total, inserted)
+        conn.commit()
     return inserted
 
 
+def write_csv(sources, csv_path, chunk_size, window):
+    written = 0
+    now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+    with engine.connect() as conn, open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_KEYS)
+        for table, candidates in sources:
+            after = 0
+            while (upto := next_bound(conn, table, after, chunk_size)) is not None:
+                # nothing is inserted, so thinning only sees one chunk at a time
+                for r in chunk_rows(conn, candidates, window, {"after": after, "upto": upto, "now": now}):
+                    writer.writerow([table, r["source_id"], r["StudentId"], r["Lat"], r["Lng"], r["CheckInUtc"]])
+                    written += 1
+                after = upto
+    if not written:
+        print("No candidate rows to write to CSV")
+    else:
+        print(f"Wrote {written} candidate rows to {csv_path}")
+    return written
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--dry-run', action='store_true', help='Do not insert rows; write candidates to CSV')
     parser.add_argument('--csv', default='Backend/scripts/backfill_candidates.csv', help='CSV output path for dry-run')
     parser.add_argument('--dedupe-window', type=int, default=0, help='Seconds window to dedupe inserts')
+    parser.add_argument('--chunk-size', type=int, default=20000, help='Source rows per chunk/transaction')
+    parser.add_argument('--workers', type=int, default=4, help='Source tables processed in parallel')
+    parser.add_argument('--checkpoint', default='Backend/scripts/backfill_checkpoint.json', help='Resume file')
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start over')
     args = parser.parse_args()
+    if args.dedupe_window < 0:
+        parser.error('--dedupe-window must be >= 0')
 
     print("Backfill: starting")
-    conn = engine.connect()
-    session = SessionLocal()
-    total_candidates = []
-    total_inserted = 0
     try:
-        models.Base.metadata.create_all(bind=engine)
-
-        c1 = collect_candidates_from_attendance(conn)
-        print(f"Found {len(c1)} candidates in Attendance")
-        total_candidates.extend(c1)
-
-        c2 = collect_candidates_from_other_tables(conn)
-        print(f"Found {len(c2)} candidates in other tables")
-        total_candidates.extend(c2)
+        migrate(engine)
+        with engine.connect() as conn:
+            sources = find_sources(conn)
+        print(f"Found {len(sources)} source tables: {', '.join(t for t, _ in sources) or 'none'}")
 
         if args.dry_run:
-            write_csv(total_candidates, args.csv)
-            print(f"Dry-run complete: {len(total_candidates)} candidates written. No inserts performed.")
+            count = write_csv(sources, args.csv, args.chunk_size, args.dedupe_window)
+            print(f"Dry-run complete: {count} candidates written. No inserts performed.")
             return
 
-        if total_candidates:
-            inserted = perform_insert(total_candidates, session, args.dedupe_window)
-            total_inserted += inserted
-            print(f"Inserted {inserted} rows into StudentLocations")
+        checkpoint = Checkpoint(args.checkpoint, args.restart)
+        if checkpoint.done:
+            print(f"Resuming from {args.checkpoint}: {checkpoint.done}")
+        progress = Progress()
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            futures = {
+                table: pool.submit(backfill_table, table, candidates, args, checkpoint, progress)
+                for table, candidates in sources
+            }
+            counts = {table: f.result() for table, f in futures.items()}
 
-        print(f"Backfill: finished, total inserted = {total_inserted}")
+        for table, inserted in counts.items():
+            print(f"Inserted {inserted} rows into StudentLocations from {table}")
+        checkpoint.clear()
+        print(f"Backfill: finished, total inserted = {sum(counts.values())} "
+              f"in {time.perf_counter() - progress.started:.2f}s")
     except SQLAlchemyError as e:
         print("Backfill failed:", e)
-    finally:
-        session.close()
-        conn.close()
+        print("Run again to resume from the last finished chunk.")
 
 
 if __name__ == '__main__':
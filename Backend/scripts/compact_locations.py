@@ -0,0 +1,57 @@
+"""Pack past days of StudentLocations into LocationTraces (Backend/traces.py).
+
+Usage: run from repository root with the virtualenv active:
+  python -m Backend.scripts.compact_locations [--older-than-days 7] [--tolerance 10]
+                                              [--batch-size 10000] [--no-vacuum]
+
+Safe to run while the API is serving: one student per transaction, and an
+interrupted run is finished by running it again. Also deletes the 0.0/0.0
+placeholder rows older versions wrote for check-ins without coordinates,
+--batch-size ids per transaction.
+Prints the rows packed and the size of the data before and after.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from Backend.archive import compact
+from Backend.db import engine
+from Backend.migrations import migrate
+from Backend.traces import LOCATION_COMPACT_AFTER_DAYS, LOCATION_SIMPLIFY_TOLERANCE_M, compact_traces
+
+
+def used_bytes(conn) -> int:
+    page_size = conn.exec_driver_sql("PRAGMA main.page_size").scalar()
+    pages = conn.exec_driver_sql("PRAGMA main.page_count").scalar()
+    free = conn.exec_driver_sql("PRAGMA main.freelist_count").scalar()
+    return (pages - free) * page_size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--older-than-days", type=int, default=LOCATION_COMPACT_AFTER_DAYS, help="leave this many recent days raw")
+    parser.add_argument("--tolerance", type=float, default=LOCATION_SIMPLIFY_TOLERANCE_M, help="Douglas-Peucker tolerance in metres")
+    parser.add_argument("--batch-size", type=int, default=10000, help="ids per placeholder delete transaction")
+    parser.add_argument("--no-vacuum", action="store_true", help="skip VACUUM (ANALYZE still runs)")
+    args = parser.parse_args()
+
+    migrate(engine)
+    before = datetime.utcnow().date() - timedelta(days=args.older_than_days)
+    with engine.connect() as conn:
+        size_before = used_bytes(conn)
+
+    started = time.perf_counter()
+    print(f"Packing StudentLocations rows before {before} (tolerance {args.tolerance} m)")
+    stats = compact_traces(engine, before, tolerance_m=args.tolerance, batch_size=args.batch_size, log=print)
+    compact(engine, vacuum=not args.no_vacuum, log=print)
+    with engine.connect() as conn:
+        size_after = used_bytes(conn)
+
+    raw = stats.get("raw_rows", 0)
+    print(f"{raw} rows of {stats.get('students', 0)} students packed into {stats.get('traces', 0)} day traces")
+    if raw:
+        print(f"  {stats['points']} points kept ({stats['points'] / raw:.1%}), {stats['trace_bytes']} bytes of traces")
+    print(f"Data {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Apply pending schema migrations (Backend/migrations) to the database.
+
+Usage: run from repository root with the virtualenv active:
+  python -m Backend.scripts.migrate [--status] [--to VERSION] [--batch-size 5000]
+
+Safe to run while the API is serving: tables that need reshaping are
+copied in batches next to the live ones and swapped in at the end. An
+interrupted run is resumed by running it again.
+"""
+import argparse
+import time
+from sqlalchemy import text
+from Backend.db import engine
+from Backend.migrations import current_version, head_version, migrate, pending
+from Backend.migrations.runner import MIGRATION_BATCH_SIZE
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--status", action="store_true", help="show the applied and pending versions, change nothing")
+    parser.add_argument("--to", type=int, default=None, help="stop after this version")
+    parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE, help="rows per copy transaction")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        version = current_version(conn)
+        history = []
+        if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'SchemaVersions'")).first():
+            history = conn.execute(text("SELECT Version, Name, AppliedAtUtc FROM SchemaVersions ORDER BY Version")).all()
+
+    if args.status:
+        print(f"Schema version {version} of {head_version()}")
+        for number, name, applied_at in history:
+            print(f"  {number:04d} {name}  applied {applied_at}")
+        for number, name in pending(engine):
+            print(f"  {number:04d} {name}  pending")
+        return
+
+    started = time.perf_counter()
+    applied = migrate(engine, target=args.to, batch_size=args.batch_size, log=print)
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if applied:
+        print(f"Applied {len(applied)} migrations in {time.perf_counter() - started:.2f}s, now at version {version}")
+    else:
+        print(f"Nothing to do, schema is at version {version}")
+
+
+if __name__ == "__main__":
+    main()
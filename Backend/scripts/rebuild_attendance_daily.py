@@ -0,0 +1,24 @@
+"""Rebuild the AttendanceDaily rollup from the raw Attendance rows.
+
+Usage: run from repository root with the virtualenv active:
+  python -m Backend.scripts.rebuild_attendance_daily
+
+Safe to run at any time; the rebuild happens in a single transaction, so
+readers see either the old or the new rollup.
+"""
+import time
+from Backend.db import engine
+from Backend.rollups import rebuild
+from Backend.migrations import migrate
+
+
+def main() -> None:
+    migrate(engine)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        rows = rebuild(conn)
+    print(f"AttendanceDaily rebuilt: {rows} rows in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
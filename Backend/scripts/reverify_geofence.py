@@ -0,0 +1,64 @@
+"""Re-classify historical check-ins against the Positions sites.
+
+Usage: run from repository root with the virtualenv active:
+  python -m Backend.scripts.reverify_geofence [--chunk-size 5000] [--only-missing]
+                                              [--checkpoint file] [--restart]
+
+Run it after site coordinates or radii change, or once after upgrading so
+rows written before geofencing get a GeoStatus. --only-missing skips rows
+that already have one.
+
+Safe to run while the API is serving: every chunk is its own write
+transaction, so live check-ins wait for one chunk at most. After each
+chunk commits its last AttendanceId goes to the checkpoint file, and an
+interrupted run picks up where it stopped; --restart starts over.
+"""
+import argparse
+import time
+from sqlalchemy.exc import SQLAlchemyError
+from Backend.db import engine, SessionLocal
+from Backend.geofence import refresh_site_index, reverify
+from Backend.migrations import migrate
+from Backend.scripts.backfill_locations import Checkpoint
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-size", type=int, default=5000, help="rows per transaction")
+    parser.add_argument("--only-missing", action="store_true", help="only rows without a GeoStatus")
+    parser.add_argument("--checkpoint", default="Backend/scripts/reverify_checkpoint.json", help="resume file")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    args = parser.parse_args()
+
+    migrate(engine)
+    db = SessionLocal()
+    try:
+        refresh_site_index(db)
+    finally:
+        db.close()
+
+    checkpoint = Checkpoint(args.checkpoint, args.restart)
+    after = checkpoint.get("Attendance")
+    if after:
+        print(f"Resuming after AttendanceId {after} ({args.checkpoint})")
+    started = time.perf_counter()
+    try:
+        counts = reverify(
+            engine,
+            chunk_size=args.chunk_size,
+            only_missing=args.only_missing,
+            after=after,
+            on_chunk=lambda last_id: checkpoint.set("Attendance", last_id),
+        )
+    except SQLAlchemyError as e:
+        print("Re-verify failed:", e)
+        print("Run again to resume from the last finished chunk.")
+        return
+    checkpoint.clear()
+    total = sum(counts.values())
+    summary = ", ".join(f"{k}={v}" for k, v in sorted(counts.items())) or "nothing to do"
+    print(f"Re-verified {total} check-ins in {time.perf_counter() - started:.2f}s ({summary})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Full-text search over students, users, positions and feedback (SQLite FTS5).
+
+One FTS5 table, SearchIndex, holds a row per searchable entity:
+
+  Kind   "student" | "user" | "position" | "feedback"; searched only
+         when the caller filters on it, which keeps the filter in the index
+  Title  names and titles, weighted SEARCH_TITLE_WEIGHT times the body
+  Body   the other searchable columns (emails, program, company, text)
+
+Its rowid is the entity id times four plus the kind's slot in SOURCES, so
+a trigger finds an entity's row by rowid, never by a scan. Triggers on the
+base tables keep it current in the same transaction as every write, ORM
+or raw SQL alike; install() creates the table and triggers and rebuild()
+refills it (migration 6 does both).
+
+search() turns free text into a query with one term per word, all
+required, the last one a prefix: "john smi" matches "John Smith". Hits come ordered by bm25, best
+first, and are paged with a cursor on (rank, rowid). bm25 has to score
+every match before the first page can be cut, so queries broader than
+SEARCH_RANK_MAX_MATCHES are returned in id order instead.
+"""
+import re
+from typing import List, NamedTuple, Optional
+from sqlalchemy import select, text
+from Backend.models import Feedback
+from Backend.pagination import decode_cursor, encode_cursor
+from Backend.settings import env
+
+# How much more a match in the name/title counts than one in the rest
+SEARCH_TITLE_WEIGHT = env("SEARCH_TITLE_WEIGHT", 10.0)
+# Queries matching more entities than this are not ranked (see search)
+SEARCH_RANK_MAX_MATCHES = env("SEARCH_RANK_MAX_MATCHES", 2000)
+
+
+class Source(NamedTuple):
+    kind: str
+    table: str
+    key: str
+    title: List[str]
+    body: List[str]
+
+
+SOURCES = [
+    Source("student", "Students", "StudentId", ["FirstName", "LastName"], ["UniversityId", "Email", "Program"]),
+    Source("user", "Users", "UserId", ["FirstName", "LastName"], ["Email", "Role"]),
+    Source("position", "Positions", "PositionId", ["Title"], ["Company", "SiteLocation", "SupervisorName", "SupervisorEmail"]),
+    Source("feedback", "Feedback", "FeedbackId", [], ["FeedbackText"]),
+]
+KINDS = [s.kind for s in SOURCES]
+SLOTS = len(SOURCES)
+
+WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _text(row: str, columns: List[str]) -> str:
+    if not columns:
+        return "''"
+    return " || ' ' || ".join(f"coalesce({row}.\"{c}\", '')" for c in columns)
+
+
+def _values(source: Source, slot: int, row: str) -> str:
+    return f"{row}.\"{source.key}\" * {SLOTS} + {slot}, '{source.kind}', {_text(row, source.title)}, {_text(row, source.body)}"
+
+
+def ddl() -> List[str]:
+    """The FTS table and the triggers on the base tables."""
+    statements = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS SearchIndex USING fts5("
+        "Kind, Title, Body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+        f"INSERT INTO SearchIndex (SearchIndex, rank) VALUES ('rank', 'bm25(0.0, {float(SEARCH_TITLE_WEIGHT)}, 1.0)')",
+    ]
+    for slot, s in enumerate(SOURCES):
+        columns = ", ".join(f'"{c}"' for c in s.title + s.body)
+        statements += [
+            f'DROP TRIGGER IF EXISTS "SearchIndex_{s.table}_ins"',
+            f'DROP TRIGGER IF EXISTS "SearchIndex_{s.table}_upd"',
+            f'DROP TRIGGER IF EXISTS "SearchIndex_{s.table}_del"',
+            f'CREATE TRIGGER "SearchIndex_{s.table}_ins" AFTER INSERT ON "{s.table}" BEGIN '
+            f"INSERT INTO SearchIndex (rowid, Kind, Title, Body) VALUES ({_values(s, slot, 'NEW')}); END",
+            # only the indexed columns: GPA or IsActive updates leave the index alone
+            f'CREATE TRIGGER "SearchIndex_{s.table}_upd" AFTER UPDATE OF {columns} ON "{s.table}" BEGIN '
+            f'DELETE FROM SearchIndex WHERE rowid = OLD."{s.key}" * {SLOTS} + {slot}; '
+            f"INSERT INTO SearchIndex (rowid, Kind, Title, Body) VALUES ({_values(s, slot, 'NEW')}); END",
+            f'CREATE TRIGGER "SearchIndex_{s.table}_del" AFTER DELETE ON "{s.table}" BEGIN '
+            f'DELETE FROM SearchIndex WHERE rowid = OLD."{s.key}" * {SLOTS} + {slot}; END',
+        ]
+    return statements
+
+
+def install(conn) -> None:
+    for statement in ddl():
+        conn.exec_driver_sql(statement)
+
+
+def rebuild(conn) -> int:
+    """Refill SearchIndex from the base tables. Returns the row count."""
+    conn.exec_driver_sql("DELETE FROM SearchIndex")
+    for slot, s in enumerate(SOURCES):
+        conn.exec_driver_sql(
+            f'INSERT INTO SearchIndex (rowid, Kind, Title, Body) SELECT {_values(s, slot, "t")} FROM "{s.table}" t'
+        )
+    conn.exec_driver_sql("INSERT INTO SearchIndex (SearchIndex) VALUES ('optimize')")
+    return conn.exec_driver_sql("SELECT count(*) FROM SearchIndex").scalar()
+
+
+def match_expression(q: str, kinds: Optional[List[str]] = None) -> Optional[str]:
+    """
+    'john smi' -> '{Title Body} : ("john" AND "smi"*)'. Only the last word
+    is a prefix, as in a search box: the words before it are complete.
+    Single letters are dropped, as a prefix one matches nearly everything.
+    None when q has no word of two or more characters.
+    """
+    words = [w for w in WORD.findall(q) if len(w) > 1]
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words[:-1]] + [f'"{words[-1]}"*']
+    expression = "{Title Body} : (" + " AND ".join(terms) + ")"
+    if kinds:
+        unknown = set(kinds) - set(KINDS)
+        if unknown:
+            raise ValueError(f"Unknown kind(s) {sorted(unknown)}")
+        expression += " AND {Kind} : (" + " OR ".join(kinds) + ")"
+    return expression
+
+
+def search(db, q: str, kinds: Optional[List[str]] = None, limit: int = 20, cursor: Optional[str] = None):
+    """
+    Returns (hits, next cursor or None). A hit is a dict with Type, Id,
+    Title, Snippet (the rest of the indexed text, matched terms in
+    [brackets]) and Score; feedback hits also carry TargetType and
+    TargetId. Up to SEARCH_RANK_MAX_MATCHES matches are ranked by bm25;
+    a broader query comes back in id order with Score None, since scoring
+    every match is what would make it slow.
+    """
+    params = {"q": match_expression(q, kinds), "n": limit + 1, "cap": SEARCH_RANK_MAX_MATCHES + 1}
+    if cursor:
+        # the first page decides the order, later pages keep it
+        after_rank, params["after_id"] = decode_cursor(cursor, 2)
+        ranked = after_rank is not None
+    else:
+        # stops counting at the cap, unlike count(*) over all matches
+        matches = db.execute(
+            text("SELECT count(*) FROM (SELECT rowid FROM SearchIndex WHERE SearchIndex MATCH :q LIMIT :cap)"), params
+        ).scalar()
+        after_rank, ranked = None, matches <= SEARCH_RANK_MAX_MATCHES
+    where = "SearchIndex MATCH :q"
+    if ranked:
+        order, score = "rank, rowid", "rank"
+        if cursor:
+            params["after_rank"] = after_rank
+            where += " AND (rank > :after_rank OR (rank = :after_rank AND rowid > :after_id))"
+    else:
+        order, score = "rowid", "NULL"
+        if cursor:
+            where += " AND rowid > :after_id"
+    rows = db.execute(
+        text(
+            "SELECT rowid, Kind, Title, snippet(SearchIndex, 2, '[', ']', '...', 12) AS Snippet, "
+            f"{score} AS Score FROM SearchIndex WHERE {where} ORDER BY {order} LIMIT :n"
+        ),
+        params,
+    ).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].Score, rows[-1].rowid])
+    hits = [
+        {
+            "Type": r.Kind,
+            "Id": r.rowid // SLOTS,
+            "Title": r.Title,
+            "Snippet": r.Snippet,
+            # bm25 is lower-is-better and negative; flip it for readers
+            "Score": round(-r.Score, 4) if r.Score is not None else None,
+        }
+        for r in rows
+    ]
+    feedback = {h["Id"]: h for h in hits if h["Type"] == "feedback"}
+    if feedback:
+        for fid, target_type, target_id in db.execute(
+            select(Feedback.FeedbackId, Feedback.TargetType, Feedback.TargetId).where(Feedback.FeedbackId.in_(list(feedback)))
+        ):
+            feedback[fid].update(TargetType=target_type, TargetId=target_id)
+    return hits, next_cursor
@@ -0,0 +1,14 @@
+import os
+
+
+def env(name: str, default):
+    """
+    Read STUDENT_TRACKER_<name> from the environment, converted to the
+    type of `default`. Returns `default` when the variable is not set.
+    """
+    value = os.getenv(f"STUDENT_TRACKER_{name}")
+    if value is None:
+        return default
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return type(default)(value)
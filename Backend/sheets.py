@@ -0,0 +1,60 @@
+"""Set-based write path for the teacher attendance sheet.
+
+A sheet is one Status per student for one day. It is written as a single
+executemany of INSERT ... ON CONFLICT (StudentId, SheetDay) DO UPDATE, so
+submitting the same sheet again changes the Status of the rows it wrote
+the first time instead of adding new ones. Check-ins made through the
+other routes have no SheetDay and are never touched.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Set, Tuple
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from Backend.models import Attendance, Student
+
+
+def unknown_students(bind, student_ids: Iterable[int]) -> Set[int]:
+    """StudentIds that have no Students row, with one IN query."""
+    wanted = set(student_ids)
+    if not wanted:
+        return set()
+    found = bind.execute(select(Student.StudentId).where(Student.StudentId.in_(wanted))).scalars()
+    return wanted - set(found)
+
+
+def _sheet_upsert():
+    table = Attendance.__table__
+    stmt = sqlite_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.StudentId, table.c.SheetDay],
+        index_where=table.c.SheetDay.isnot(None),
+        set_={"Status": stmt.excluded.Status},
+    )
+
+
+def save_sheet(bind, statuses: Dict[int, str], check_in: datetime) -> Tuple[int, int]:
+    """
+    statuses: StudentId -> Status. Nothing is committed here.
+    Returns (created, updated).
+    """
+    if not statuses:
+        return 0, 0
+    day = check_in.date()
+    existing = set(bind.execute(
+        select(Attendance.StudentId)
+        .where(Attendance.SheetDay == day, Attendance.StudentId.in_(statuses))
+    ).scalars())
+
+    now = datetime.utcnow()
+    bind.execute(_sheet_upsert(), [
+        {
+            "StudentId": student_id,
+            "Status": status,
+            "CheckInUtc": check_in,
+            "IsApproved": False,
+            "CreatedAtUtc": now,
+            "SheetDay": day,
+        }
+        for student_id, status in statuses.items()
+    ])
+    return len(statuses) - len(existing), len(existing)
@@ -0,0 +1,34 @@
+"""
+Every test runs against throwaway databases in a temp directory, never
+Backend/student_tracker.db. The settings are read when Backend.db is
+imported, so the environment is set here, before any test imports it.
+
+  python -m pytest Backend/tests
+"""
+import os
+import tempfile
+
+import pytest
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["STUDENT_TRACKER_DB_PATH"] = os.path.join(_tmpdir.name, "test.db")
+os.environ["STUDENT_TRACKER_ARCHIVE_PATH"] = os.path.join(_tmpdir.name, "test_archive.db")
+
+
+@pytest.fixture(scope="session")
+def engine():
+    from Backend.db import engine
+    from Backend.migrations import migrate
+
+    migrate(engine, log=lambda _: None)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    from Backend.db import SessionLocal
+
+    session = SessionLocal()
+    yield session
+    session.close()
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete
+
+from Backend.approvals import approve_attendance
+from Backend.models import Attendance, AttendanceDaily, StudentAssignment
+
+
+@pytest.fixture
+def two_positions(engine):
+    # student 1 is placed at positions 7 and 8
+    with engine.begin() as conn:
+        conn.execute(
+            StudentAssignment.__table__.insert(),
+            [{"StudentId": 1, "UserId": 3, "PositionId": 7}, {"StudentId": 1, "UserId": 3, "PositionId": 8}],
+        )
+        conn.execute(
+            Attendance.__table__.insert(),
+            [
+                {"AttendanceId": 1, "StudentId": 1, "CheckInUtc": datetime(2026, 3, 2, 9), "GeoPositionId": 7},
+                {"AttendanceId": 2, "StudentId": 1, "CheckInUtc": datetime(2026, 3, 3, 9), "GeoPositionId": 8},
+                {"AttendanceId": 3, "StudentId": 1, "CheckInUtc": datetime(2026, 3, 4, 9), "GeoPositionId": None},
+            ],
+        )
+    yield
+    with engine.begin() as conn:
+        conn.execute(delete(AttendanceDaily))
+        conn.execute(delete(Attendance))
+        conn.execute(delete(StudentAssignment))
+
+
+def test_position_filter_skips_check_ins_at_another_position(engine, two_positions):
+    with engine.begin() as conn:
+        approved = approve_attendance(conn, position_id=7)
+
+    # the row at position 8 stays pending; the one without a site goes with the assignment
+    assert sorted(r["AttendanceId"] for r in approved) == [1, 3]
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from Backend import archive
+from Backend.models import ArchiveRun, Attendance, Student
+
+
+@pytest.fixture
+def attendance(engine):
+    """Three old sessions and one recent one for one student."""
+    old = datetime.combine(datetime.utcnow().date() - timedelta(days=90), datetime.min.time())
+    with engine.begin() as conn:
+        conn.execute(
+            Student.__table__.insert().values(
+                StudentId=1, UniversityId=90010001, FirstName="Ada", LastName="Byron", Email="ada@example.edu"
+            )
+        )
+        conn.execute(
+            Attendance.__table__.insert(),
+            [
+                {"StudentId": 1, "CheckInUtc": old + timedelta(days=d, hours=9), "CheckOutUtc": old + timedelta(days=d, hours=17)}
+                for d in range(3)
+            ]
+            + [{"StudentId": 1, "CheckInUtc": datetime.utcnow(), "CheckOutUtc": None}],
+        )
+    yield old + timedelta(days=10)
+    archive.archive_metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in (Attendance.__table__, archive.COLD[Attendance], ArchiveRun.__table__, Student.__table__):
+            conn.execute(delete(table))
+
+
+def _count(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(table)).scalar()
+
+
+def _killed_after_copy(*args, **kwargs):
+    raise RuntimeError("killed after the copy")
+
+
+def test_interrupted_run_is_finished_by_rerunning_it(engine, attendance, monkeypatch):
+    cutoff = attendance
+    monkeypatch.setattr(archive, "_delete", _killed_after_copy)
+    with pytest.raises(RuntimeError):
+        archive.archive_before(engine, cutoff, log=lambda _: None)
+    monkeypatch.undo()
+
+    with engine.connect() as conn:
+        run = conn.execute(select(ArchiveRun)).one()
+    assert run.FinishedAtUtc is None
+    assert run.AttendanceRows == 3
+    assert _count(engine, Attendance.__table__) == 4  # copied, not deleted yet
+
+    result = archive.archive_before(engine, cutoff, log=lambda _: None)
+
+    assert result["AttendanceRows"] == 3
+    with engine.connect() as conn:
+        runs = conn.execute(select(ArchiveRun)).all()
+    assert len(runs) == 1 and runs[0].FinishedAtUtc is not None
+    assert _count(engine, archive.COLD[Attendance]) == 3
+    # the highest archived id stays behind, see archive._delete; here the
+    # recent session has the highest id, so every old row is gone
+    assert _count(engine, Attendance.__table__) == 1
+
+
+def test_finished_cutoff_is_refused(engine, attendance):
+    archive.archive_before(engine, attendance, log=lambda _: None)
+    with pytest.raises(ValueError, match="archived already"):
+        archive.archive_before(engine, attendance, log=lambda _: None)
+
+
+def test_older_cutoff_than_an_interrupted_run_is_refused_with_a_hint(engine, attendance, monkeypatch):
+    monkeypatch.setattr(archive, "_delete", _killed_after_copy)
+    with pytest.raises(RuntimeError):
+        archive.archive_before(engine, attendance, log=lambda _: None)
+    monkeypatch.undo()
+    with pytest.raises(ValueError, match="interrupted"):
+        archive.archive_before(engine, attendance - timedelta(days=1), log=lambda _: None)
+
+
+def test_write_during_a_run_is_refused_not_lost(engine, db, attendance, monkeypatch):
+    from fastapi import HTTPException
+
+    from Backend.routes.attendance import approve
+
+    first = db.execute(select(Attendance.AttendanceId).order_by(Attendance.AttendanceId)).scalars().first()
+    outcome = []
+
+    def approve_meanwhile(engine, model, *args, **kwargs):
+        # a teacher approves an old row after it was copied, before it is deleted
+        if model is Attendance:
+            try:
+                approve(first, db)
+                outcome.append(200)
+            except HTTPException as e:
+                db.rollback()
+                outcome.append(e.status_code)
+        return delete_rows(engine, model, *args, **kwargs)
+
+    delete_rows = archive._delete
+    monkeypatch.setattr(archive, "_delete", approve_meanwhile)
+    archive.archive_before(engine, attendance, log=lambda _: None)
+
+    assert outcome == [409]
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).where(archive.COLD[Attendance].c.IsApproved.is_(True))).scalar() == 0
@@ -0,0 +1,59 @@
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import delete, select
+
+from Backend.models import Attendance, LocationTrace, StudentLocation
+from Backend.scripts.backfill_locations import Checkpoint, Progress, backfill_table, find_sources
+
+SITE = (36.3134, -82.3535)
+ELSEWHERE = (36.3234, -82.3535)  # about 1.1 km north
+
+
+@pytest.fixture
+def history(engine):
+    def ping(at, where=SITE):
+        return {"StudentId": 1, "CheckInUtc": at, "CreatedAtUtc": at, "Lat": where[0], "Lng": where[1]}
+
+    with engine.begin() as conn:
+        conn.execute(
+            Attendance.__table__.insert(),
+            [
+                # packed by compact_locations already
+                ping(datetime(2026, 3, 1, 9)),
+                # standing at the site, then one heartbeat later, then gone
+                ping(datetime(2026, 3, 2, 9, 0)),
+                ping(datetime(2026, 3, 2, 9, 1)),
+                ping(datetime(2026, 3, 2, 9, 2)),
+                ping(datetime(2026, 3, 2, 9, 10)),
+                ping(datetime(2026, 3, 2, 9, 11), ELSEWHERE),
+            ],
+        )
+        conn.execute(
+            LocationTrace.__table__.insert().values(
+                StudentId=1, Day=date(2026, 3, 1), StartUtc=datetime(2026, 3, 1, 9), EndUtc=datetime(2026, 3, 1, 9),
+                PointCount=1, RawPointCount=1, Trace=b"\x01",
+            )
+        )
+    yield
+    with engine.begin() as conn:
+        for model in (StudentLocation, LocationTrace, Attendance):
+            conn.execute(delete(model))
+
+
+def _run(engine, tmp_path):
+    with engine.connect() as conn:
+        (table, candidates), = [s for s in find_sources(conn) if s[0] == "Attendance"]
+    args = SimpleNamespace(dedupe_window=0, chunk_size=2)
+    return backfill_table(table, candidates, args, Checkpoint(str(tmp_path / "checkpoint.json"), True), Progress())
+
+
+def test_backfill_thins_and_skips_packed_days(engine, history, tmp_path):
+    assert _run(engine, tmp_path) == 3
+    with engine.connect() as conn:
+        stored = conn.execute(select(StudentLocation.CheckInUtc).order_by(StudentLocation.CheckInUtc)).scalars().all()
+    assert stored == [datetime(2026, 3, 2, 9, 0), datetime(2026, 3, 2, 9, 10), datetime(2026, 3, 2, 9, 11)]
+
+    # a rerun brings back neither the thinned pings nor the packed day
+    assert _run(engine, tmp_path) == 0
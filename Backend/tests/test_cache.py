@@ -0,0 +1,51 @@
+from Backend.cache import CountCache, DashboardMetricsCache
+
+TOTALS = {"total_students": 10, "total_assignments": 4, "gpa_sum": 30.0, "gpa_count": 10}
+
+
+def test_delta_during_a_load_discards_the_snapshot():
+    cache = DashboardMetricsCache(ttl_seconds=300)
+
+    def slow_loader():
+        # a student is added after the loader's query, before it returns
+        cache.student_added(4.0)
+        return TOTALS
+
+    assert cache.get(slow_loader)["total_students"] == 10
+    assert not cache.stats()["cached"]
+    # the next read loads again and sees the new student
+    assert cache.get(lambda: dict(TOTALS, total_students=11))["total_students"] == 11
+    assert cache.stats()["cached"]
+
+
+def test_deltas_after_a_load_are_applied():
+    cache = DashboardMetricsCache(ttl_seconds=300)
+    cache.get(lambda: TOTALS)
+    cache.student_added(4.0)
+    cache.assignment_added()
+
+    assert cache.get(lambda: TOTALS) == {"total_students": 11, "total_assignments": 5, "average_gpa": 3.09}
+
+
+def test_load_between_commit_and_delta_is_not_stored():
+    cache = DashboardMetricsCache(ttl_seconds=300)
+    with cache.writing():
+        # committed: a load now already counts the new student ...
+        assert cache.get(lambda: dict(TOTALS, total_students=11))["total_students"] == 11
+        cache.student_added(None)
+
+    # ... so it was not stored for the delta to be added on top
+    assert not cache.stats()["cached"]
+    assert cache.get(lambda: dict(TOTALS, total_students=11))["total_students"] == 11
+
+
+def test_count_overtaken_by_invalidate_is_not_stored():
+    cache = CountCache(ttl_seconds=30)
+
+    def slow_count():
+        # a student is added and the route invalidates while the count runs
+        cache.invalidate("Students")
+        return 10
+
+    assert cache.get_or_set(("Students",), slow_count) == 10
+    assert cache.get_or_set(("Students",), lambda: 11) == 11
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from Backend.models import Attendance, AttendanceCreate, AttendanceDaily, Student, StudentCurrentLocation, StudentLocation
+from Backend.routes.async_routes import check_in_with_location_async
+from Backend.routes.student import check_in_with_location
+
+PAYLOAD = AttendanceCreate(StudentId=1, Lat=36.3134, Lng=-82.3535)
+
+
+@pytest.fixture
+def student(engine):
+    with engine.begin() as conn:
+        conn.execute(
+            Student.__table__.insert().values(
+                StudentId=1, UniversityId=90010001, FirstName="Ada", LastName="Byron", Email="ada@example.edu"
+            )
+        )
+    yield
+    with engine.begin() as conn:
+        for model in (StudentCurrentLocation, AttendanceDaily, StudentLocation, Attendance, Student):
+            conn.execute(delete(model))
+
+
+def _sync(db):
+    return check_in_with_location(PAYLOAD, db)
+
+
+def _async(engine):
+    async def run():
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{engine.url.database}")
+        async with async_sessionmaker(async_engine, expire_on_commit=False)() as session:
+            result = await check_in_with_location_async(PAYLOAD, session)
+        await async_engine.dispose()
+        return result
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("route", ["sync", "async"])
+def test_both_routes_write_the_same_check_in(engine, db, student, route):
+    result = _sync(db) if route == "sync" else _async(engine)
+
+    with engine.connect() as conn:
+        row = conn.execute(select(Attendance)).one()
+        location = conn.execute(select(StudentLocation)).one()
+        day = conn.execute(select(AttendanceDaily)).one()
+    assert result == {
+        "attendance_id": row.AttendanceId,
+        "location_id": location.StudentLocationId,
+        "geo_status": row.GeoStatus,
+        "geo_distance_m": row.GeoDistanceM,
+    }
+    # one timestamp for the row, its ping and its rollup day
+    assert row.CheckInUtc == row.CreatedAtUtc == location.CheckInUtc == day.FirstCheckInUtc
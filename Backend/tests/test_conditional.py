@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+
+from Backend.models import User
+
+
+@pytest.fixture
+def client(engine):
+    from Backend.main import app
+
+    with TestClient(app) as c:
+        yield c
+    with engine.begin() as conn:
+        conn.execute(delete(User))
+
+
+def _add_user(engine, email):
+    # a plain sqlite3 connection, as another worker process or a script would write
+    conn = sqlite3.connect(engine.url.database)
+    conn.execute(
+        "INSERT INTO Users (FirstName, LastName, Email, Role, CreatedAtUtc, IsActive) VALUES ('A', 'B', ?, 'ADMIN', '2026-01-01', 1)",
+        (email,),
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_write_from_another_connection_changes_the_etag(engine, client):
+    first = client.get("/admin/users")
+    tag = first.headers["ETag"]
+    assert client.get("/admin/users", headers={"If-None-Match": tag}).status_code == 304
+
+    _add_user(engine, "elsewhere@example.edu")
+
+    second = client.get("/admin/users", headers={"If-None-Match": tag})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != tag
+    assert [u["Email"] for u in second.json()] == ["elsewhere@example.edu"]
+
+
+def test_async_check_uses_the_async_session(engine):
+    from fastapi import FastAPI
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from Backend.conditional import CacheHeadersMiddleware, conditional_async
+    from Backend.db import get_async_db, get_db
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{engine.url.database}")
+    sessions = async_sessionmaker(async_engine)
+
+    async def async_db():
+        async with sessions() as db:
+            yield db
+
+    def no_sync_db():
+        raise AssertionError("the async check took a sync session")
+
+    app = FastAPI()
+    app.add_middleware(CacheHeadersMiddleware)
+
+    @app.get("/users", dependencies=[conditional_async("Users")])
+    async def users():
+        return []
+
+    app.dependency_overrides = {get_async_db: async_db, get_db: no_sync_db}
+    with TestClient(app) as c:
+        tag = c.get("/users").headers["ETag"]
+        assert c.get("/users", headers={"If-None-Match": tag}).status_code == 304
@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import delete, update
+
+from Backend.entity_cache import ENTITY_CACHE_MAX_ENTRIES, EntityCache, MemoryBackend
+from Backend.models import Student
+
+
+@pytest.fixture
+def cache(engine):
+    with engine.begin() as conn:
+        conn.execute(
+            Student.__table__.insert().values(
+                StudentId=1, UniversityId=90010001, FirstName="Ada", LastName="Byron", Email="ada@example.edu"
+            )
+        )
+    yield EntityCache(Student, MemoryBackend(ENTITY_CACHE_MAX_ENTRIES), 300.0)
+    with engine.begin() as conn:
+        conn.execute(delete(Student))
+
+
+def _rename(engine, name):
+    # as another worker would: its invalidate() never reaches this process
+    with engine.begin() as conn:
+        conn.execute(update(Student).where(Student.StudentId == 1).values(FirstName=name))
+
+
+def test_load_reads_past_a_stale_entry_and_refreshes_it(engine, db, cache):
+    assert cache.get(db, 1)["FirstName"] == "Ada"
+    _rename(engine, "Augusta")
+    db.rollback()
+
+    assert cache.get(db, 1)["FirstName"] == "Ada"
+    assert cache.load(db, 1)["FirstName"] == "Augusta"
+    assert cache.get(db, 1)["FirstName"] == "Augusta"
+
+
+def test_load_overtaken_by_invalidate_is_not_stored(engine, db, cache):
+    execute = db.execute
+
+    def write_during_load(*args, **kwargs):
+        result = execute(*args, **kwargs)
+        cache.invalidate(1)
+        return result
+
+    db.execute = write_during_load
+    assert cache.get(db, 1)["FirstName"] == "Ada"
+    db.execute = execute
+    assert cache.backend.get(f"{cache.prefix}1") is None
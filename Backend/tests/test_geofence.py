@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete, select
+
+from Backend.geofence import ON_SITE, UNKNOWN, SiteIndex, reverify
+from Backend.models import Attendance, Positions, Student, StudentAssignment
+
+SITE = (36.3134, -82.3535, 150.0)
+
+
+@pytest.fixture
+def located(engine):
+    with engine.begin() as conn:
+        conn.execute(
+            Student.__table__.insert().values(
+                StudentId=1, UniversityId=90010001, FirstName="Ada", LastName="Byron", Email="ada@example.edu"
+            )
+        )
+        conn.execute(
+            Attendance.__table__.insert(),
+            [{"StudentId": 1, "CheckInUtc": datetime(2026, 3, 2, 9), "Lat": SITE[0], "Lng": SITE[1]} for _ in range(5)],
+        )
+    index = SiteIndex()
+    index.build({7: SITE}, {1: {7}})
+    yield index
+    with engine.begin() as conn:
+        conn.execute(delete(Attendance))
+        conn.execute(delete(Student))
+
+
+def _statuses(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(Attendance.GeoStatus).order_by(Attendance.AttendanceId)).scalars().all()
+
+
+def test_each_chunk_is_committed_and_a_rerun_resumes(engine, located):
+    checkpoints = []
+
+    def crash_after_first_chunk(last_id):
+        checkpoints.append(last_id)
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        reverify(engine, chunk_size=2, index=located, on_chunk=crash_after_first_chunk)
+    assert _statuses(engine) == [ON_SITE, ON_SITE, None, None, None]
+
+    counts = reverify(engine, chunk_size=2, index=located, after=checkpoints[0], on_chunk=checkpoints.append)
+
+    assert counts == {ON_SITE: 3}
+    assert _statuses(engine) == [ON_SITE] * 5
+    assert checkpoints == sorted(checkpoints) and len(checkpoints) == 3
+
+
+def test_index_follows_writes_made_elsewhere(engine, db):
+    index = SiteIndex()
+    index.load(db)
+    db.rollback()
+    assert index.classify(1, *SITE[:2])[0] == UNKNOWN
+
+    # another worker adds the site and the placement; nothing tells this one
+    with engine.begin() as conn:
+        conn.execute(
+            Positions.__table__.insert().values(
+                PositionId=7, Title="Clinical Intern", Company="Ballad Health", SiteLocation="JCMC",
+                SupervisorName="S", SupervisorEmail="s@example.com", TermStart=datetime(2026, 1, 12),
+                TermEnd=datetime(2026, 5, 8), SiteLat=SITE[0], SiteLng=SITE[1], SiteRadiusM=SITE[2],
+            )
+        )
+        conn.execute(StudentAssignment.__table__.insert().values(StudentId=1, UserId=3, PositionId=7))
+    try:
+        index.ensure_current(db)
+        assert index.classify(1, *SITE[:2]) == (ON_SITE, 0.0, 7)
+    finally:
+        with engine.begin() as conn:
+            conn.execute(delete(StudentAssignment))
+            conn.execute(delete(Positions))
@@ -0,0 +1,54 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import delete
+
+from Backend.hours import hours_for_range
+from Backend.models import Attendance, AttendanceDaily, AttendanceSheet, Student
+from Backend.routes.teacher import post_attendance_sheet
+
+
+@pytest.fixture
+def sessions(engine):
+    with engine.begin() as conn:
+        conn.execute(
+            Student.__table__.insert().values(
+                StudentId=1, UniversityId=90010001, FirstName="Ada", LastName="Byron", Email="ada@example.edu"
+            )
+        )
+        conn.execute(
+            Attendance.__table__.insert(),
+            [
+                # an overnight placement shift of three days, checked out on the 10th
+                {"StudentId": 1, "CheckInUtc": datetime(2026, 3, 7, 8), "CheckOutUtc": datetime(2026, 3, 10, 8)},
+                # ended before the range
+                {"StudentId": 1, "CheckInUtc": datetime(2026, 3, 2, 8), "CheckOutUtc": datetime(2026, 3, 2, 16)},
+                # forgotten check-out long ago: never more than the open-session cap
+                {"StudentId": 1, "CheckInUtc": datetime(2026, 1, 5, 8), "CheckOutUtc": None},
+            ],
+        )
+    yield
+    with engine.begin() as conn:
+        conn.execute(delete(AttendanceDaily))
+        conn.execute(delete(Attendance))
+        conn.execute(delete(Student))
+
+
+def test_session_started_long_before_the_range_counts(db, sessions):
+    totals = hours_for_range(db, date(2026, 3, 9), date(2026, 3, 15), now=datetime(2026, 3, 20))
+
+    # 9th 00:00 to 10th 08:00
+    assert totals[1]["total_hours"] == 32.0
+    assert totals[1]["open_sessions"] == 0
+
+
+def test_attendance_sheet_adds_no_hours(db, sessions):
+    sheet = AttendanceSheet(Date=datetime(2026, 3, 11, 9), students=[{"StudentId": 1, "Status": "ABSENT"}])
+    post_attendance_sheet(sheet, db)
+    assert hours_for_range(db, date(2026, 3, 9), date(2026, 3, 15), now=datetime(2026, 3, 20))[1]["total_hours"] == 32.0
+
+    sheet.students[0].Status = "PRESENT"
+    post_attendance_sheet(sheet, db)
+    totals = hours_for_range(db, date(2026, 3, 9), date(2026, 3, 15), now=datetime(2026, 3, 20))
+    assert totals[1]["total_hours"] == 32.0
+    assert totals[1]["open_sessions"] == 0
@@ -0,0 +1,62 @@
+import io
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from Backend.importer import import_records
+
+# Students as created by the original schema script: UniversityId is TEXT,
+# so SQLite hands it back as a str
+LEGACY_STUDENTS = """
+CREATE TABLE Students (
+    StudentId      INTEGER PRIMARY KEY AUTOINCREMENT,
+    UniversityId   TEXT NOT NULL UNIQUE,
+    FirstName      TEXT NOT NULL,
+    LastName       TEXT NOT NULL,
+    Email          TEXT NOT NULL UNIQUE,
+    PhoneE164      TEXT,
+    Program        TEXT,
+    Year           TEXT,
+    Status         TEXT NOT NULL DEFAULT 'Active',
+    CreatedAtUtc   TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    GPA REAL
+)
+"""
+
+CSV = b"""UniversityId,FirstName,LastName,Email,Program,Year
+90010001,Ada,Lovelace,ada@example.edu,Nursing,Senior
+90010002,Grace,Hopper,grace@example.edu,Education,Junior
+"""
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(LEGACY_STUDENTS)
+        conn.execute(
+            text("INSERT INTO Students (UniversityId, FirstName, LastName, Email) VALUES ('90010001', 'Ada', 'Byron', 'ada@example.edu')")
+        )
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+@pytest.mark.parametrize("dry_run", [True, False])
+def test_reimport_on_text_university_id(legacy_db, dry_run):
+    report = import_records(legacy_db, "students", io.BytesIO(CSV), "csv", dry_run=dry_run)
+
+    assert report["errors"] == []
+    assert (report["created"], report["updated"], report["failed"]) == (1, 1, 0)
+    if not dry_run:
+        rows = legacy_db.execute(text("SELECT UniversityId, LastName FROM Students ORDER BY UniversityId")).all()
+        assert [tuple(r) for r in rows] == [("90010001", "Lovelace"), ("90010002", "Hopper")]
+
+
+def test_email_of_another_student_is_reported(legacy_db):
+    csv = b"UniversityId,FirstName,LastName,Email,Program,Year\n90010003,Eve,Other,ada@example.edu,Nursing,Senior\n"
+    report = import_records(legacy_db, "students", io.BytesIO(csv), "csv")
+
+    assert report["failed"] == 1
+    assert report["errors"] == [{"row": 2, "errors": ["Email: already used by UniversityId 90010001"]}]
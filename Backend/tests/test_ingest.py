@@ -0,0 +1,29 @@
+import pytest
+
+from Backend.ingest import CheckInBatcher, IngestQueueFull
+
+
+def test_flusher_finishing_first_keeps_the_final_status(engine):
+    batcher = CheckInBatcher(max_queue=10, bind=engine)
+    put_nowait = batcher._queue.put_nowait
+
+    def put_and_flush(item):
+        # the flusher thread takes and writes the item before submit() returns
+        put_nowait(item)
+        batcher.flush(batcher._take_batch(block=False))
+
+    batcher._queue.put_nowait = put_and_flush
+    ticket = batcher.submit(404, "PRESENT", None, None)
+
+    assert batcher.ticket_status(ticket)["status"] == "rejected"
+    assert batcher.accepted == 1
+
+
+def test_full_queue_leaves_no_ticket(engine):
+    batcher = CheckInBatcher(max_queue=1, bind=engine)
+    batcher.submit(1, "PRESENT", None, None)
+    with pytest.raises(IngestQueueFull):
+        batcher.submit(1, "PRESENT", None, None)
+
+    assert batcher.ticket_status("ci-2") is None
+    assert batcher.rejected_full == 1
@@ -0,0 +1,17 @@
+import asyncio
+
+from Backend.live import LiveHub
+
+
+def test_assignment_added_replaces_the_student_set():
+    async def run():
+        hub = LiveHub()
+        sub = hub.subscribe(teacher_id=3, student_ids=[1, 2])
+        # what a snapshot load on a worker thread would be iterating
+        in_use = sub.student_ids
+        hub.assignment_added(3, 7)
+        return in_use, sub.student_ids
+
+    in_use, current = asyncio.run(run())
+    assert in_use == {1, 2}
+    assert current == {1, 2, 7}
@@ -0,0 +1,13 @@
+import pytest
+from fastapi import HTTPException
+
+from Backend.locations import bounding_box
+
+
+def test_inverted_bounding_box_is_rejected():
+    assert bounding_box(None, None, None, None) is None
+    assert bounding_box(36.2, -82.5, 36.4, -82.2) == (36.2, -82.5, 36.4, -82.2)
+    for box in [(36.4, -82.5, 36.2, -82.2), (36.2, -82.2, 36.4, -82.5), (36.2, None, 36.4, -82.2)]:
+        with pytest.raises(HTTPException) as e:
+            bounding_box(*box)
+        assert e.value.status_code == 400
@@ -0,0 +1,81 @@
+"""The hot route queries are answered from an index, on a database built
+by the migrations: no full scan of Attendance or the location tables, no
+separate sort pass for ORDER BY."""
+from datetime import datetime, time
+
+import pytest
+from sqlalchemy import text
+
+from Backend.models import Attendance, Student, StudentCurrentLocation, StudentLocation
+
+TABLES = ("Attendance", "StudentLocations", "StudentCurrentLocations")
+
+
+def build_queries(db):
+    day = datetime.utcnow().date()
+    start = datetime.combine(day, time.min)
+    end = datetime.combine(day, time.max)
+
+    return {
+        # teacher.get_attendance_sheet
+        "teacher.get_attendance_sheet": db.query(Attendance)
+        .filter(Attendance.CheckInUtc >= start, Attendance.CheckInUtc <= end),
+        # attendance.get_student_attendance
+        "attendance.get_student_attendance": db.query(Attendance)
+        .filter(Attendance.StudentId == 1),
+        # teacher.get_check_in
+        "teacher.get_check_in": db.query(Attendance)
+        .filter(Attendance.StudentId == 1)
+        .order_by(Attendance.CheckInUtc.desc()),
+        # teacher.get_today_locations (Backend/locations.current_locations)
+        "teacher.get_today_locations": db.query(
+            StudentCurrentLocation.StudentId,
+            Student.FirstName,
+            Student.LastName,
+            StudentCurrentLocation.Lat,
+            StudentCurrentLocation.Lng,
+            StudentCurrentLocation.UpdatedAtUtc.label("CheckInTime"),
+        )
+        .join(Student, Student.StudentId == StudentCurrentLocation.StudentId)
+        .filter(StudentCurrentLocation.UpdatedAtUtc >= start),
+        # StudentLocations by day
+        "StudentLocations by day": db.query(
+            StudentLocation.StudentId,
+            StudentLocation.Lat,
+            StudentLocation.Lng,
+        )
+        .filter(StudentLocation.CheckInUtc >= start, StudentLocation.CheckInUtc <= end),
+        # per-student location history
+        "StudentLocations by student": db.query(StudentLocation)
+        .filter(StudentLocation.StudentId == 1)
+        .order_by(StudentLocation.CheckInUtc.desc()),
+    }
+
+
+def full_scans(plan_rows) -> list:
+    found = []
+    for row in plan_rows:
+        detail = row[-1]
+        for t in TABLES:
+            # "SCAN Attendance" without "USING ... INDEX" is a full table scan
+            if detail.startswith(f"SCAN {t}") and "INDEX" not in detail:
+                found.append(detail)
+        # ORDER BY that needs a separate sort pass
+        if "USE TEMP B-TREE FOR ORDER BY" in detail:
+            found.append(detail)
+    return found
+
+
+@pytest.mark.parametrize("name", [
+    "teacher.get_attendance_sheet",
+    "attendance.get_student_attendance",
+    "teacher.get_check_in",
+    "teacher.get_today_locations",
+    "StudentLocations by day",
+    "StudentLocations by student",
+])
+def test_query_uses_an_index(engine, db, name):
+    query = build_queries(db)[name]
+    sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    plan = db.execute(text("EXPLAIN QUERY PLAN " + sql)).fetchall()
+    assert full_scans(plan) == [], "\n".join(row[-1] for row in plan)
@@ -0,0 +1,71 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import delete, func, select
+
+from Backend.geofence import METERS_PER_DEG_LAT
+from Backend.models import LocationTrace, Student, StudentLocation
+from Backend.traces import LOCATION_HEARTBEAT_S, compact_traces, simplify, trace_points
+
+SITE = (36.3134, -82.3535)
+
+
+def _dwell(start: datetime, hours: int, jitter_m: float = 3.0):
+    """Heartbeat points of a student standing at SITE, as thin() stores them."""
+    rng = np.random.default_rng(4)
+    steps = hours * 3600 // LOCATION_HEARTBEAT_S
+    return [
+        (
+            start + timedelta(seconds=i * LOCATION_HEARTBEAT_S),
+            SITE[0] + rng.uniform(-jitter_m, jitter_m) / METERS_PER_DEG_LAT,
+            SITE[1] + rng.uniform(-jitter_m, jitter_m) / METERS_PER_DEG_LAT,
+        )
+        for i in range(steps + 1)
+    ]
+
+
+def test_simplify_by_position_alone_collapses_a_dwell():
+    points = _dwell(datetime(2026, 3, 2, 9), hours=2)
+    keep = simplify(np.array([p[1] for p in points]), np.array([p[2] for p in points]), 10.0)
+    assert keep.sum() == 2
+
+
+def test_simplify_keeps_a_point_per_heartbeat_when_given_times():
+    points = _dwell(datetime(2026, 3, 2, 9), hours=2)
+    seconds = np.array([(p[0] - points[0][0]).total_seconds() for p in points])
+    keep = simplify(
+        np.array([p[1] for p in points]), np.array([p[2] for p in points]), 10.0,
+        seconds=seconds, max_gap_s=LOCATION_HEARTBEAT_S,
+    )
+    assert keep.all()
+    # denser pings are still thinned to one per heartbeat
+    dense = np.arange(0, 7201, 30.0)
+    keep = simplify(np.full(len(dense), SITE[0]), np.full(len(dense), SITE[1]), 10.0, seconds=dense, max_gap_s=300)
+    assert np.diff(dense[keep]).max() <= 300
+    assert keep.sum() == 25
+
+
+def test_compacted_day_keeps_the_dwell_and_drops_placeholders(engine, db):
+    points = _dwell(datetime(2026, 3, 2, 9), hours=2)
+    with engine.begin() as conn:
+        conn.execute(
+            Student.__table__.insert().values(
+                StudentId=1, UniversityId=90010001, FirstName="Ada", LastName="Byron", Email="ada@example.edu"
+            )
+        )
+        conn.execute(
+            StudentLocation.__table__.insert(),
+            [{"StudentId": 1, "CheckInUtc": at, "Lat": lat, "Lng": lng} for at, lat, lng in points]
+            + [{"StudentId": 1, "CheckInUtc": datetime(2026, 3, 3, 9), "Lat": 0.0, "Lng": 0.0}] * 5,
+        )
+    try:
+        stats = compact_traces(engine, date(2026, 3, 4), batch_size=2, log=lambda _: None)
+
+        assert stats["placeholders"] == 5
+        packed = trace_points(db, 1, datetime(2026, 3, 2), datetime(2026, 3, 3))
+        assert [p[0] for p in packed] == [p[0] for p in points]
+        assert db.execute(select(func.count()).select_from(StudentLocation)).scalar() == 0
+    finally:
+        with engine.begin() as conn:
+            for model in (LocationTrace, StudentLocation, Student):
+                conn.execute(delete(model))
@@ -0,0 +1,350 @@
+"""Location traces: write-time thinning, simplification and compact storage.
+
+Every located check-in used to append a StudentLocations row, with 0.0/0.0
+placeholders when the device sent no coordinates. Three things keep the
+table small:
+
+  thin()            at write time, drops pings without coordinates and
+                    pings within LOCATION_MIN_DISTANCE_M of the student's
+                    last stored point and less than LOCATION_HEARTBEAT_S
+                    after it. A student who stays put still gets a point
+                    per heartbeat, so today's trace shows the dwell.
+  compact_traces()  packs the rows of every student-day before a cutoff
+                    into one LocationTraces row: simplified with
+                    Douglas-Peucker (the kept track is nowhere more than
+                    LOCATION_SIMPLIFY_TOLERANCE_M off the original, and
+                    never more than LOCATION_HEARTBEAT_S between points
+                    where the raw rows had none, so dwells survive) and
+                    delta-encoded (encode_trace). The raw rows are deleted
+                    in the same transaction, one student at a time, so a
+                    rerun after a crash picks up where it stopped.
+  trace_points()    reads a student's track over any range from both.
+
+Compaction only touches the hot table: run it before
+Backend/scripts/archive_attendance.py moves a term to the archive.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import bindparam, delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from Backend.archive import read_source
+from Backend.geofence import METERS_PER_DEG_LAT, haversine_m
+from Backend.migrations.runner import immediate
+from Backend.models import LocationTrace, Student, StudentLocation
+from Backend.settings import env
+
+# Write-time filter. 0 stores every located ping.
+LOCATION_MIN_DISTANCE_M = env("LOCATION_MIN_DISTANCE_M", 10.0)
+# ... but never less than one point per this many seconds (0: no heartbeat)
+LOCATION_HEARTBEAT_S = env("LOCATION_HEARTBEAT_S", 300)
+# Douglas-Peucker tolerance of compact_traces
+LOCATION_SIMPLIFY_TOLERANCE_M = env("LOCATION_SIMPLIFY_TOLERANCE_M", 10.0)
+# Days kept as raw rows before compaction
+LOCATION_COMPACT_AFTER_DAYS = env("LOCATION_COMPACT_AFTER_DAYS", 7)
+
+logger = logging.getLogger("Backend.traces")
+
+TRACE_FORMAT = 1
+COORD_SCALE = 1e6  # 1e-6 degrees, about 11 cm
+
+Point = Tuple[datetime, float, float]  # (CheckInUtc, Lat, Lng)
+
+
+# ---------------------------------------------------------
+# Write-time thinning
+# ---------------------------------------------------------
+def last_points(bind, student_ids: Iterable[int]) -> dict:
+    """StudentId -> (Lat, Lng, CheckInUtc) of the newest stored point, one index probe per student."""
+    newest = (
+        select(StudentLocation.StudentLocationId)
+        .where(StudentLocation.StudentId == Student.StudentId)
+        .order_by(StudentLocation.CheckInUtc.desc())
+        .limit(1)
+        .correlate(Student)
+        .scalar_subquery()
+    )
+    rows = bind.execute(
+        select(StudentLocation.StudentId, StudentLocation.Lat, StudentLocation.Lng, StudentLocation.CheckInUtc)
+        .where(StudentLocation.StudentLocationId.in_(select(newest).where(Student.StudentId.in_(list(student_ids)))))
+    )
+    return {sid: (lat, lng, at) for sid, lat, lng, at in rows}
+
+
+def worth_storing(last: Optional[tuple], lat: float, lng: float, at: datetime) -> bool:
+    """thin()'s rule for one point, given the student's last stored (Lat, Lng, CheckInUtc)."""
+    if last is None:
+        return True
+    last_lat, last_lng, last_at = last
+    if LOCATION_HEARTBEAT_S and last_at is not None and (at - last_at).total_seconds() >= LOCATION_HEARTBEAT_S:
+        return True
+    return haversine_m(last_lat, last_lng, lat, lng) >= LOCATION_MIN_DISTANCE_M
+
+
+def thin(bind, points: List[dict]) -> List[dict]:
+    """
+    points: dicts with StudentId, Lat, Lng, CheckInUtc, in arrival order.
+    Returns the ones to store in StudentLocations. Nothing is written here.
+    """
+    located = [p for p in points if p["Lat"] is not None and p["Lng"] is not None]
+    if not located or LOCATION_MIN_DISTANCE_M <= 0:
+        return located
+    last = last_points(bind, {p["StudentId"] for p in located})
+    kept = []
+    for p in located:
+        if worth_storing(last.get(p["StudentId"]), p["Lat"], p["Lng"], p["CheckInUtc"]):
+            kept.append(p)
+            last[p["StudentId"]] = (p["Lat"], p["Lng"], p["CheckInUtc"])
+    return kept
+
+
+# ---------------------------------------------------------
+# Douglas-Peucker
+# ---------------------------------------------------------
+def simplify(
+    lat: np.ndarray,
+    lng: np.ndarray,
+    tolerance_m: float,
+    seconds: Optional[np.ndarray] = None,
+    max_gap_s: float = 0,
+) -> np.ndarray:
+    """
+    Keep-mask of a Douglas-Peucker simplification of the track; the first
+    and last point are always kept. Distances are measured on a local
+    equirectangular projection, which is exact enough at city scale.
+
+    Position alone drops a student standing at a site down to two points.
+    With `seconds` (time of each point) and max_gap_s, a point is also
+    kept whenever dropping it would leave more than max_gap_s between
+    kept points, so the heartbeats thin() stored still show the dwell.
+    """
+    n = len(lat)
+    keep = np.zeros(n, dtype=bool)
+    if n < 3 or tolerance_m <= 0:
+        keep[:] = True
+        return keep
+    y = np.asarray(lat, dtype=float) * METERS_PER_DEG_LAT
+    x = np.asarray(lng, dtype=float) * METERS_PER_DEG_LAT * np.cos(np.radians(np.mean(lat)))
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        px, py = x[i + 1:j], y[i + 1:j]
+        dx, dy = x[j] - x[i], y[j] - y[i]
+        length2 = dx * dx + dy * dy
+        if length2 == 0.0:
+            dist = np.hypot(px - x[i], py - y[i])
+        else:
+            # distance to the segment, not the line: tracks double back
+            t = np.clip(((px - x[i]) * dx + (py - y[i]) * dy) / length2, 0.0, 1.0)
+            dist = np.hypot(px - (x[i] + t * dx), py - (y[i] + t * dy))
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance_m:
+            k += i + 1
+            keep[k] = True
+            stack.append((i, k))
+            stack.append((k, j))
+    if seconds is not None and max_gap_s > 0:
+        last = 0
+        for i in range(1, n - 1):
+            if keep[i]:
+                last = i
+            elif seconds[i + 1] - seconds[last] > max_gap_s:
+                keep[i] = True
+                last = i
+    return keep
+
+
+# ---------------------------------------------------------
+# Delta encoding
+# ---------------------------------------------------------
+def _put_varint(out: bytearray, value: int) -> None:
+    value = value * 2 if value >= 0 else -value * 2 - 1  # zigzag
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_trace(start: datetime, points: List[Point]) -> bytes:
+    """
+    A format byte, then per point three zigzag varints: the change in
+    whole seconds since `start` and in Lat and Lng (1e-6 degrees) against
+    the previous point. A ping a few metres and seconds from the last
+    takes 4 to 6 bytes instead of a ~60 byte row plus two index entries.
+    Times are kept to the second.
+    """
+    out = bytearray([TRACE_FORMAT])
+    prev_t = prev_lat = prev_lng = 0
+    for at, lat, lng in points:
+        t = int((at - start).total_seconds())
+        q_lat, q_lng = round(lat * COORD_SCALE), round(lng * COORD_SCALE)
+        _put_varint(out, t - prev_t)
+        _put_varint(out, q_lat - prev_lat)
+        _put_varint(out, q_lng - prev_lng)
+        prev_t, prev_lat, prev_lng = t, q_lat, q_lng
+    return bytes(out)
+
+
+def decode_trace(start: datetime, blob: bytes) -> List[Point]:
+    if not blob or blob[0] != TRACE_FORMAT:
+        raise ValueError(f"Unknown trace format {blob[:1]!r}")
+    values, value, shift = [], 0, 0
+    for byte in blob[1:]:
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            values.append((value >> 1) if not value & 1 else -((value + 1) >> 1))
+            value, shift = 0, 0
+    points = []
+    t = q_lat = q_lng = 0
+    for i in range(0, len(values) - 2, 3):
+        t += values[i]
+        q_lat += values[i + 1]
+        q_lng += values[i + 2]
+        points.append((start + timedelta(seconds=t), q_lat / COORD_SCALE, q_lng / COORD_SCALE))
+    return points
+
+
+# ---------------------------------------------------------
+# Compaction
+# ---------------------------------------------------------
+def _pack_day(student_id: int, day: date, points: List[Point], raw_count: int, tolerance_m: float) -> dict:
+    keep = simplify(
+        np.array([p[1] for p in points]),
+        np.array([p[2] for p in points]),
+        tolerance_m,
+        seconds=np.array([(p[0] - points[0][0]).total_seconds() for p in points]),
+        max_gap_s=LOCATION_HEARTBEAT_S,
+    )
+    kept = [p for p, k in zip(points, keep) if k]
+    return {
+        "StudentId": student_id,
+        "Day": day,
+        "StartUtc": kept[0][0],
+        "EndUtc": kept[-1][0],
+        "PointCount": len(kept),
+        "RawPointCount": raw_count,
+        "Trace": encode_trace(kept[0][0], kept),
+        "UpdatedAtUtc": datetime.utcnow(),
+    }
+
+
+def _delete_placeholders(engine, batch_size: int) -> int:
+    """The 0.0/0.0 rows of coordinate-less check-ins, batch_size ids per transaction."""
+    pk = StudentLocation.StudentLocationId
+    page = select(pk.label("id")).where(pk > bindparam("after")).order_by(pk).limit(bindparam("n")).subquery()
+    bound = select(func.max(page.c.id))
+    deleted, after = 0, 0
+    while True:
+        with engine.begin() as conn:
+            upto = conn.execute(bound, {"after": after, "n": batch_size}).scalar()
+            if upto is None:
+                return deleted
+            deleted += conn.execute(
+                delete(StudentLocation).where(
+                    pk > after, pk <= upto, StudentLocation.Lat == 0.0, StudentLocation.Lng == 0.0
+                )
+            ).rowcount
+        after = upto
+
+
+def compact_traces(
+    engine,
+    before: date,
+    tolerance_m: float = LOCATION_SIMPLIFY_TOLERANCE_M,
+    batch_size: int = 10000,
+    log=logger.info,
+) -> dict:
+    """
+    Move the StudentLocations rows checked in before `before` into
+    LocationTraces, merging with traces already packed for those days.
+    Returns {"placeholders", "students", "traces", "raw_rows", "points", "trace_bytes"}.
+    """
+    cutoff = datetime.combine(before, time.min)
+    stats = defaultdict(int)
+    stats["placeholders"] = _delete_placeholders(engine, batch_size)
+    log(f"  {stats['placeholders']} 0.0/0.0 placeholder rows deleted")
+
+    with engine.connect() as conn:
+        students = conn.execute(
+            select(StudentLocation.StudentId).where(StudentLocation.CheckInUtc < cutoff).distinct()
+        ).scalars().all()
+
+    for n, student_id in enumerate(sorted(students), 1):
+        with immediate(engine) as conn:
+            in_range = (StudentLocation.StudentId == student_id, StudentLocation.CheckInUtc < cutoff)
+            days = defaultdict(list)
+            for at, lat, lng in conn.execute(
+                select(StudentLocation.CheckInUtc, StudentLocation.Lat, StudentLocation.Lng)
+                .where(*in_range)
+                .order_by(StudentLocation.CheckInUtc)
+            ):
+                days[at.date()].append((at, lat, lng))
+            packed = {
+                r.Day: r
+                for r in conn.execute(
+                    select(LocationTrace.Day, LocationTrace.StartUtc, LocationTrace.RawPointCount, LocationTrace.Trace)
+                    .where(LocationTrace.StudentId == student_id, LocationTrace.Day.in_(list(days)))
+                )
+            }
+            values = []
+            for day, points in days.items():
+                raw = len(points)
+                stats["raw_rows"] += raw
+                old = packed.get(day)
+                if old is not None:
+                    points = sorted(decode_trace(old.StartUtc, old.Trace) + points)
+                    raw += old.RawPointCount
+                values.append(_pack_day(student_id, day, points, raw, tolerance_m))
+            if values:
+                stmt = sqlite_insert(LocationTrace)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[LocationTrace.StudentId, LocationTrace.Day],
+                    set_={c: stmt.excluded[c] for c in values[0] if c not in ("StudentId", "Day")},
+                )
+                conn.execute(stmt, values)
+            conn.execute(delete(StudentLocation).where(*in_range))
+        stats["students"] += 1
+        stats["traces"] += len(values)
+        stats["points"] += sum(v["PointCount"] for v in values)
+        stats["trace_bytes"] += sum(len(v["Trace"]) for v in values)
+        if n % 500 == 0 or n == len(students):
+            log(f"  {n}/{len(students)} students, {stats['raw_rows']} rows packed into {stats['points']} points")
+    return dict(stats)
+
+
+# ---------------------------------------------------------
+# Reading
+# ---------------------------------------------------------
+def trace_points(db, student_id: int, start: datetime, end: datetime) -> List[Point]:
+    """The student's points in [start, end], packed and raw, in time order."""
+    points = [
+        p
+        for row in db.execute(
+            select(LocationTrace.StartUtc, LocationTrace.Trace).where(
+                LocationTrace.StudentId == student_id,
+                LocationTrace.Day >= start.date(),
+                LocationTrace.Day <= end.date(),
+            )
+        )
+        for p in decode_trace(row.StartUtc, row.Trace)
+        if start <= p[0] <= end
+    ]
+    src = read_source(db, StudentLocation, start)
+    points.extend(
+        (at, lat, lng)
+        for at, lat, lng in db.execute(
+            select(src.c.CheckInUtc, src.c.Lat, src.c.Lng).where(
+                src.c.StudentId == student_id, src.c.CheckInUtc >= start, src.c.CheckInUtc <= end
+            )
+        )
+        # placeholders written before thin() existed
+        if (lat, lng) != (0.0, 0.0)
+    )
+    points.sort(key=lambda p: p[0])
+    return points
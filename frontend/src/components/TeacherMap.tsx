@@ -1,7 +1,6 @@
 // src/components/TeacherMap.tsx
-import React, { useEffect, useState } from "react";
+import React from "react";
 import { MapContainer, TileLayer, Marker, Popup } from "react-leaflet";
-import api from "../api";
 import "leaflet/dist/leaflet.css";
 
 interface StudentLocation {
@@ -13,29 +12,12 @@ interface StudentLocation {
   CheckInTime: string;
 }
 
-const TeacherMap: React.FC = () => {
-  const [locs, setLocs] = useState<StudentLocation[]>([]);
-  const [error, setError] = useState("");
-
-  useEffect(() => {
-    api
-      .get<StudentLocation[]>("/teacher/locations/today")
-      .then((res) => {
-        const data = Array.isArray(res.data)
-          ? res.data
-          : (res.data as any).value || [];
-        setLocs(data);
-      })
-      .catch((err) => {
-        console.error("Failed to load map locations:", err);
-        setError("Failed to load map locations.");
-      });
-  }, []);
-
-  if (error) {
-    return <p className="error-text">{error}</p>;
-  }
+interface TeacherMapProps {
+  // kept current by TeacherView's location stream
+  locations: StudentLocation[];
+}
 
+const TeacherMap: React.FC<TeacherMapProps> = ({ locations: locs }) => {
   if (!locs.length) {
     return <p className="teacher-muted">No check-ins yet.</p>;
   }
@@ -52,7 +34,7 @@ const TeacherMap: React.FC = () => {
       >
         <TileLayer url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png" />
         {locs.map((l) => (
-          <Marker key={`${l.StudentId}-${l.CheckInTime}`} position={[l.Lat, l.Lng]}>
+          <Marker key={l.StudentId} position={[l.Lat, l.Lng]}>
             <Popup>
               {l.FirstName} {l.LastName}
               <br />
@@ -32,7 +32,24 @@ interface StudentLocation {
   CheckInTime: string;
 }
 
-const TeacherView: React.FC = () => {
+interface TeacherViewProps {
+  // when set, only students assigned to this instructor are streamed
+  teacherId?: number;
+}
+
+// newest location per student, newest first
+const mergeLocation = (
+  prev: StudentLocation[],
+  loc: StudentLocation
+): StudentLocation[] => {
+  const current = prev.find((l) => l.StudentId === loc.StudentId);
+  if (current && new Date(current.CheckInTime) > new Date(loc.CheckInTime)) {
+    return prev;
+  }
+  return [loc, ...prev.filter((l) => l.StudentId !== loc.StudentId)];
+};
+
+const TeacherView: React.FC<TeacherViewProps> = ({ teacherId }) => {
   const [students, setStudents] = useState<TeacherStudent[]>([]);
   const [loadingStudents, setLoadingStudents] = useState(false);
   const [studentsError, setStudentsError] = useState("");
@@ -73,26 +90,51 @@ const TeacherView: React.FC = () => {
     loadStudents();
   }, []);
 
-  // ---- Load today's locations ----
-  const loadLocations = async () => {
+  // ---- Today's locations: live stream from /teacher/locations/stream ----
+  // The server sends a "snapshot" first, then only changes, so there is
+  // nothing to poll. EventSource reconnects by itself and gets a new snapshot.
+  const [streamKey, setStreamKey] = useState(0);
+
+  useEffect(() => {
     setLoadingLocations(true);
     setLocationsError("");
-    try {
-      const resp = await api.get<StudentLocation[]>("/teacher/locations/today");
-      setLocations(resp.data || []);
-    } catch (err: any) {
-      console.error("Failed to load locations:", err);
-      const detail =
-        err?.response?.data?.detail || err?.message || "Unknown error";
-      setLocationsError(`Failed to load locations: ${detail}`);
-    } finally {
+
+    const query = teacherId !== undefined ? `?teacher_id=${teacherId}` : "";
+    const source = new EventSource(
+      `${api.defaults.baseURL}/teacher/locations/stream${query}`
+    );
+
+    source.addEventListener("snapshot", (e) => {
+      setLocations(JSON.parse((e as MessageEvent).data) || []);
+      setLocationsError("");
       setLoadingLocations(false);
-    }
-  };
+    });
+
+    source.addEventListener("location", (e) => {
+      const loc: StudentLocation = JSON.parse((e as MessageEvent).data);
+      setLocations((prev) => mergeLocation(prev, loc));
+    });
+
+    source.addEventListener("approved", (e) => {
+      const { AttendanceId } = JSON.parse((e as MessageEvent).data);
+      setCheckins((prev) =>
+        prev.map((c) =>
+          c.CheckInId === AttendanceId ? { ...c, Approved: true } : c
+        )
+      );
+    });
 
-  useEffect(() => {
-    loadLocations();
-  }, []);
+    source.onerror = () => {
+      setLoadingLocations(false);
+      if (source.readyState === EventSource.CLOSED) {
+        setLocationsError("Live location updates stopped.");
+      }
+    };
+
+    return () => source.close();
+  }, [teacherId, streamKey]);
+
+  const reconnectLocations = () => setStreamKey((k) => k + 1);
 
   // ---- Check-ins for a selected student ----
   const loadCheckIns = async (student: TeacherStudent) => {
@@ -175,8 +217,8 @@ const TeacherView: React.FC = () => {
       <div className="teacher-section">
         <div className="teacher-section-header">
           <h3 className="teacher-section-title">Student Locations (Today)</h3>
-          <button className="btn btn-secondary" onClick={loadLocations}>
-            Refresh locations
+          <button className="btn btn-secondary" onClick={reconnectLocations}>
+            Reconnect
           </button>
         </div>
 
@@ -366,7 +408,7 @@ const TeacherView: React.FC = () => {
       {/* -------- MAP SECTION -------- */}
       <div className="teacher-section">
         <h3 className="teacher-section-title">Today's Student Locations</h3>
-        <TeacherMap />
+        <TeacherMap locations={locations} />
       </div>
     </section>
   );